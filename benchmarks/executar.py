@@ -0,0 +1,349 @@
+"""
+Benchmarks do envio de e-mails, contra um servidor SMTP fake local (ver servidor_smtp_fake.py).
+
+Uso (a partir da raiz do repositório):
+
+> python -m benchmarks.executar
+> python -m benchmarks.executar --rapido --modos null start_tls
+> python -m benchmarks.executar --comparar benchmarks/resultados/20240101-120000.json
+
+Cada cenário varia uma dimensão (quantidade de mensagens, tamanho do anexo, quantidade de imagens inline ou
+de destinatários) a partir de um cenário base, e é executado em cada modo de criptografia do servidor ("null",
+"ssl_tls" e "start_tls") e por cada alvo ("enviar_lista": MailSender.enviar_lista; "enviar_emails": a função
+mail_cmd.enviar_emails, incluindo validação da entrada e criação do sender).
+
+Os resultados (vazão, latências p50/p95 do envio de cada mensagem, e pico de memória) são impressos, e salvos
+num arquivo JSON (por padrão, em benchmarks/resultados/), que pode ser comparado com execuções posteriores.
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from benchmarks.servidor_smtp_fake import ServidorSMTPFake, criar_contexto_ssl_servidor
+from mail_sender_util import mail_cmd
+from mail_sender_util.mail_sender import CryptMethod, MailSender, TLSVersion
+from mail_sender_util.metricas import FASE_ENVIO, AgregadorMetricas
+from typing import Any, Callable, Dict, List
+
+MODOS = ['null', 'ssl_tls', 'start_tls']
+ALVOS = ['enviar_lista', 'enviar_emails']
+
+CENARIO_BASE = {
+    'qtd_msgs': 200,
+    'tamanho_anexo': 0,
+    'qtd_imagens': 0,
+    'qtd_destinatarios': 1
+}
+
+VARIACOES = {
+    'qtd_msgs': [50, 1000],
+    'tamanho_anexo': [100 * 1024, 1024 * 1024],
+    'qtd_imagens': [1, 5],
+    'qtd_destinatarios': [10, 50]
+}
+
+TAMANHO_IMAGEM = 20 * 1024
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Assinatura PNG, seguida do início do chunk IHDR (suficiente para a identificação do tipo da imagem)
+_CABECALHO_PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR'
+
+
+def listar_cenarios(rapido: bool) -> List[Dict[str, Any]]:
+    """
+    Retorna o cenário base, seguido das variações de uma dimensão por vez (reduzidas, no modo rápido).
+    """
+
+    escala = 10 if rapido else 1
+
+    base = dict(CENARIO_BASE)
+    base['qtd_msgs'] = max(1, base['qtd_msgs'] // escala)
+
+    cenarios = [dict(base, nome='base')]
+    for dimensao, valores in VARIACOES.items():
+        for valor in valores:
+            if dimensao == 'qtd_msgs':
+                valor = max(1, valor // escala)
+            cenarios.append(dict(base, **{dimensao: valor, 'nome': f'{dimensao}={valor}'}))
+
+    return cenarios
+
+
+def gerar_arquivos(diretorio: str, cenarios: List[Dict[str, Any]]) -> None:
+    """
+    Gera os anexos e imagens (conteúdo aleatório) usados pelos cenários.
+    """
+
+    for tamanho in set(cenario['tamanho_anexo'] for cenario in cenarios):
+        path = os.path.join(diretorio, f'anexo_{tamanho}.bin')
+        if tamanho > 0 and not os.path.exists(path):
+            with open(path, 'wb') as file:
+                file.write(os.urandom(tamanho))
+
+    for i in range(max(cenario['qtd_imagens'] for cenario in cenarios)):
+        path = os.path.join(diretorio, f'imagem_{i}.png')
+        if not os.path.exists(path):
+            with open(path, 'wb') as file:
+                file.write(_CABECALHO_PNG + os.urandom(TAMANHO_IMAGEM - len(_CABECALHO_PNG)))
+
+
+def criar_emails(cenario: Dict[str, Any], diretorio: str) -> List[Dict[str, Any]]:
+    imagens = [
+        {'id': f'imagem{i}', 'path': os.path.join(diretorio, f'imagem_{i}.png')}
+        for i in range(cenario['qtd_imagens'])
+    ]
+    html = 'Mensagem de teste. ' * 50 + ''.join(f'<img src="cid:{imagem["id"]}">' for imagem in imagens)
+
+    anexos = []
+    if cenario['tamanho_anexo'] > 0:
+        anexos.append({
+            'file_name': 'anexo.bin',
+            'path': os.path.join(diretorio, f'anexo_{cenario["tamanho_anexo"]}.bin')
+        })
+
+    return [
+        {
+            'assunto': f'Mensagem {i}',
+            'remetente': 'remetente@teste.com',
+            'destinatarios': [f'destinatario{d}@teste.com' for d in range(cenario['qtd_destinatarios'])],
+            'msg_html': html,
+            'imagens': imagens,
+            'anexos': anexos
+        }
+        for i in range(cenario['qtd_msgs'])
+    ]
+
+
+def executar_enviar_lista(porta: int, modo: str, emails: List[Dict[str, Any]], agregador: AgregadorMetricas) -> Dict[int, List[str]]:
+    sender = MailSender(
+        '127.0.0.1',
+        porta,
+        'usuario',
+        'senha',
+        CryptMethod(modo),
+        TLSVersion.TLS_1_2 if modo != 'null' else None,
+        observador=agregador
+    )
+
+    erros_msgs = {}
+    sender.enviar_lista(emails, erros_msgs)
+
+    return erros_msgs
+
+
+def executar_enviar_emails(porta: int, modo: str, emails: List[Dict[str, Any]], agregador: AgregadorMetricas) -> Dict[int, List[str]]:
+    entrada = {
+        'host': '127.0.0.1',
+        'port': porta,
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': modo,
+        'emails': emails
+    }
+    if modo != 'null':
+        entrada['tls_version'] = TLSVersion.TLS_1_2.value
+
+    # A função imprime o resultado (e as métricas, na saída de erro), e encerra com sys.exit
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            mail_cmd.enviar_emails(entrada, agregador)
+        except SystemExit:
+            pass
+
+    resultado = saida.getvalue().strip()
+    if resultado != 'ok':
+        return {-1: [resultado]}
+
+    return {}
+
+
+EXECUTORES: Dict[str, Callable[[int, str, List[Dict[str, Any]], AgregadorMetricas], Dict[int, List[str]]]] = {
+    'enviar_lista': executar_enviar_lista,
+    'enviar_emails': executar_enviar_emails
+}
+
+
+def medir(
+    servidor: ServidorSMTPFake,
+    modo: str,
+    alvo: str,
+    cenario: Dict[str, Any],
+    diretorio: str,
+    repeticoes: int
+) -> Dict[str, Any]:
+    """
+    Executa o cenário "repeticoes" vezes (medindo vazão e latências), e uma vez adicional sob o tracemalloc
+    (medindo o pico de memória, sem que o rastreamento interfira nos tempos).
+    """
+
+    executor = EXECUTORES[alvo]
+    agregador = AgregadorMetricas()
+    vazoes = []
+    erros = []
+
+    for _ in range(repeticoes):
+        emails = criar_emails(cenario, diretorio)
+        servidor.limpar()
+
+        inicio = time.perf_counter()
+        erros_msgs = executor(servidor.porta, modo, emails, agregador)
+        duracao = time.perf_counter() - inicio
+
+        recebidas = servidor.contadores.get('mensagens', 0)
+        vazoes.append(recebidas / duracao if duracao > 0 else 0.0)
+        if len(erros_msgs) > 0 or recebidas != cenario['qtd_msgs']:
+            erros.append(f'{recebidas} de {cenario["qtd_msgs"]} mensagens recebidas: {erros_msgs}')
+
+    emails = criar_emails(cenario, diretorio)
+    tracemalloc.start()
+    try:
+        executor(servidor.porta, modo, emails, AgregadorMetricas())
+        _, pico_memoria = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    envio = agregador.resumo()['fases'].get(FASE_ENVIO, {})
+
+    return {
+        'cenario': cenario['nome'],
+        'modo': modo,
+        'alvo': alvo,
+        'qtd_msgs': cenario['qtd_msgs'],
+        'tamanho_anexo': cenario['tamanho_anexo'],
+        'qtd_imagens': cenario['qtd_imagens'],
+        'qtd_destinatarios': cenario['qtd_destinatarios'],
+        'msgs_por_segundo': round(statistics.median(vazoes), 3),
+        'latencia_p50': envio.get('p50'),
+        'latencia_p95': envio.get('p95'),
+        'pico_memoria': pico_memoria,
+        'erros': erros
+    }
+
+
+def _chave(resultado: Dict[str, Any]):
+    return (resultado['cenario'], resultado['modo'], resultado['alvo'])
+
+
+def imprimir_resultado(resultado: Dict[str, Any], anterior: Dict[str, Any] = None) -> None:
+    linha = (
+        f'{resultado["cenario"]:<26} {resultado["modo"]:<10} {resultado["alvo"]:<14}'
+        f' {resultado["msgs_por_segundo"]:>10.1f} msg/s'
+        f' p50 {_ms(resultado["latencia_p50"]):>8} p95 {_ms(resultado["latencia_p95"]):>8}'
+        f' mem {resultado["pico_memoria"] / (1024 * 1024):>7.1f} MiB'
+    )
+
+    if anterior is not None and anterior['msgs_por_segundo'] > 0:
+        variacao = (resultado['msgs_por_segundo'] / anterior['msgs_por_segundo'] - 1) * 100
+        linha += f'  ({variacao:+.1f}% msg/s)'
+
+    if len(resultado['erros']) > 0:
+        linha += f'  ERROS: {resultado["erros"][0]}'
+
+    print(linha, flush=True)
+
+
+def _ms(segundos: float) -> str:
+    return '-' if segundos is None else f'{segundos * 1000:.2f}ms'
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks do envio de e-mails, contra um servidor SMTP fake local.')
+    parser.add_argument(
+        '--modos', nargs='+', choices=MODOS, default=MODOS,
+        help='Modos de criptografia do servidor (padrão: todos)')
+    parser.add_argument(
+        '--alvos', nargs='+', choices=ALVOS, default=ALVOS,
+        help='Funções medidas (padrão: todas)')
+    parser.add_argument(
+        '--cenarios', nargs='+', metavar='CENARIO',
+        help='Nomes dos cenários a executar (exemplo: base qtd_msgs=1000; padrão: todos)')
+    parser.add_argument(
+        '--repeticoes', type=int, default=3,
+        help='Quantidade de repetições de cada cenário (padrão: 3; a vazão reportada é a mediana)')
+    parser.add_argument(
+        '--latencia', type=float, default=0.0,
+        help='Latência artificial do servidor, em segundos, a cada ida e volta (padrão: 0)')
+    parser.add_argument(
+        '--rapido', action='store_true',
+        help='Reduz a quantidade de mensagens dos cenários (para verificações rápidas)')
+    parser.add_argument(
+        '--saida', metavar='ARQUIVO',
+        help='Arquivo JSON onde os resultados são salvos (padrão: benchmarks/resultados/<data-hora>.json)')
+    parser.add_argument(
+        '--comparar', metavar='ARQUIVO',
+        help='Arquivo JSON de uma execução anterior, com o qual os resultados são comparados')
+    args = parser.parse_args()
+
+    # O cliente usa as versões de TLS fixas do MailSender (depreciadas no Python recente)
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    anteriores = {}
+    if args.comparar is not None:
+        with open(args.comparar, 'r', encoding='utf-8') as file:
+            anteriores = {_chave(resultado): resultado for resultado in json.load(file)['resultados']}
+
+    cenarios = listar_cenarios(args.rapido)
+    if args.cenarios is not None:
+        cenarios = [cenario for cenario in cenarios if cenario['nome'] in args.cenarios]
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerar_arquivos(diretorio, cenarios)
+
+        for modo in args.modos:
+            contexto_ssl = criar_contexto_ssl_servidor() if modo != 'null' else None
+            with ServidorSMTPFake(modo, contexto_ssl, args.latencia) as servidor:
+                for cenario in cenarios:
+                    for alvo in args.alvos:
+                        resultado = medir(servidor, modo, alvo, cenario, diretorio, args.repeticoes)
+                        imprimir_resultado(resultado, anteriores.get(_chave(resultado)))
+                        resultados.append(resultado)
+
+    saida = args.saida
+    if saida is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+
+    with open(saida, 'w', encoding='utf-8') as file:
+        json.dump({
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_atual(),
+            'python': sys.version,
+            'plataforma': platform.platform(),
+            'parametros': {
+                'repeticoes': args.repeticoes,
+                'latencia': args.latencia,
+                'rapido': args.rapido
+            },
+            'resultados': resultados
+        }, file, indent=2)
+
+    print(f'Resultados salvos em: {saida}')
+
+
+if __name__ == '__main__':
+    main()
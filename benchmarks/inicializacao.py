@@ -0,0 +1,246 @@
+"""
+Benchmark do tempo de inicialização do utilitário de linha de comando (mail_cmd), medido por invocação.
+
+Uso (a partir da raiz do repositório):
+
+> python -m benchmarks.inicializacao
+> python -m benchmarks.inicializacao --repeticoes 20 --top 30
+> python -m benchmarks.inicializacao --executavel dist/mail_cmd.exe
+> python -m benchmarks.inicializacao --comparar benchmarks/resultados/inicializacao-20240101-120000.json
+
+Cada repetição executa, num processo novo, o envio de um único e-mail (entrada JSON Lines) contra um servidor
+SMTP fake local (ver servidor_smtp_fake.py), medindo o tempo total da invocação. Para comparação, é medido também
+o tempo de inicialização do próprio interpretador ("python -c pass").
+
+Na execução pelo interpretador, o relatório do "python -X importtime" é coletado em cada repetição, e são
+reportados o tempo de importação dos módulos (exceto os já importados na inicialização do próprio interpretador) e
+os módulos mais custosos (mediana do tempo próprio de cada módulo, sem contar os módulos importados por ele). No executável gerado pelo PyInstaller (parâmetro "--executavel"),
+apenas o tempo total é medido (incluindo a extração do executável).
+
+Os resultados são salvos num arquivo JSON (por padrão, em benchmarks/resultados/), que pode ser comparado com
+execuções posteriores.
+"""
+
+import argparse
+import compileall
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.servidor_smtp_fake import ServidorSMTPFake
+from typing import Any, Dict, List, Tuple
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_RESULTADOS = os.path.join(DIRETORIO_RAIZ, 'benchmarks', 'resultados')
+
+
+def criar_entrada(diretorio: str, porta: int) -> str:
+    """
+    Cria o arquivo JSON Lines de entrada do mail_cmd (um único e-mail, sem criptografia), retornando seu path.
+    """
+
+    path = os.path.join(diretorio, 'entrada.jsonl')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(json.dumps({
+            'host': '127.0.0.1',
+            'port': porta,
+            'user': 'usuario',
+            'password': 'senha',
+            'crypt_method': 'null'
+        }) + '\n')
+        file.write(json.dumps({
+            'assunto': 'Benchmark de inicialização',
+            'remetente': 'remetente@teste.com',
+            'destinatarios': ['destinatario@teste.com'],
+            'msg_html': '<p>Teste</p>'
+        }) + '\n')
+
+    return path
+
+
+def executar(comando: List[str]) -> Tuple[float, str]:
+    """
+    Executa o comando, retornando o tempo total (em segundos) e a saída de erro.
+    """
+
+    inicio = time.perf_counter()
+    processo = subprocess.run(comando, cwd=DIRETORIO_RAIZ, capture_output=True, text=True)
+    tempo = time.perf_counter() - inicio
+
+    if processo.returncode != 0:
+        raise RuntimeError(
+            f'Falha ao executar: {" ".join(comando)} (código {processo.returncode}): {processo.stdout} {processo.stderr}')
+
+    return tempo, processo.stderr
+
+
+def interpretar_importtime(saida: str) -> Dict[str, Tuple[int, int, bool]]:
+    """
+    Interpreta o relatório do "python -X importtime", retornando, por módulo, o tempo próprio e o tempo
+    acumulado (em microssegundos), e se o módulo foi importado diretamente pelo programa (isto é, não
+    por outro módulo).
+    """
+
+    modulos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+
+        partes = linha[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue
+
+        # A indentação do nome indica a profundidade da importação
+        modulos[partes[2].strip()] = (int(partes[0]), int(partes[1]), partes[2][1:2] != ' ')
+
+    return modulos
+
+
+def medir(comando: List[str], repeticoes: int, coletar_importtime: bool, ignorar: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Executa o comando "repeticoes" vezes, retornando os tempos medidos (e o relatório de importação, se coletado).
+
+    O tempo de importação ("tempo_importacao") soma os módulos importados diretamente pelo programa, exceto os
+    presentes no relatório "ignorar" (os módulos importados na inicialização do interpretador).
+    """
+
+    tempos = []
+    relatorios = []
+    for _ in range(repeticoes):
+        tempo, saida_erro = executar(comando)
+        tempos.append(tempo)
+        if coletar_importtime:
+            relatorios.append(interpretar_importtime(saida_erro))
+
+    resultado = {
+        'tempo_mediana': statistics.median(tempos),
+        'tempo_minimo': min(tempos)
+    }
+
+    if coletar_importtime:
+        ignorar = ignorar.get('modulos', {}) if ignorar is not None else {}
+        nomes = set().union(*relatorios)
+        resultado['modulos'] = {
+            nome: {
+                'proprio': statistics.median(relatorio.get(nome, (0, 0))[0] for relatorio in relatorios),
+                'acumulado': statistics.median(relatorio.get(nome, (0, 0))[1] for relatorio in relatorios)
+            }
+            for nome in nomes if nome not in ignorar
+        }
+        resultado['qtd_modulos'] = len(resultado['modulos'])
+        resultado['tempo_importacao'] = statistics.median(
+            sum(acumulado for nome, (_, acumulado, direto) in relatorio.items() if direto and nome not in ignorar) / 1e6
+            for relatorio in relatorios
+        )
+
+    return resultado
+
+
+def imprimir_resultado(interpretador: Dict[str, Any], mail_cmd: Dict[str, Any], top: int, anterior: Dict[str, Any] = None) -> None:
+    print(f'Interpretador (python -c pass): {_ms(interpretador["tempo_mediana"])} (mínimo {_ms(interpretador["tempo_minimo"])})')
+
+    linha = f'mail_cmd (envio de 1 e-mail):   {_ms(mail_cmd["tempo_mediana"])} (mínimo {_ms(mail_cmd["tempo_minimo"])})'
+    if anterior is not None and anterior['mail_cmd']['tempo_mediana'] > 0:
+        variacao = (mail_cmd['tempo_mediana'] / anterior['mail_cmd']['tempo_mediana'] - 1) * 100
+        linha += f'  ({variacao:+.1f}%)'
+    print(linha)
+
+    modulos = mail_cmd.get('modulos')
+    if modulos is None:
+        return
+
+    print(f'Importações do mail_cmd:         {_ms(mail_cmd["tempo_importacao"])} ({mail_cmd["qtd_modulos"]} módulos, além dos importados pelo interpretador)')
+
+    print(f'\nMódulos mais custosos (tempo próprio, e acumulado com os módulos importados por cada um):')
+    for nome, tempos in sorted(modulos.items(), key=lambda item: -item[1]['proprio'])[:top]:
+        print(f'  {nome:<40} {tempos["proprio"] / 1000:>7.2f}ms {tempos["acumulado"] / 1000:>8.2f}ms')
+
+
+def _ms(segundos: float) -> str:
+    return f'{segundos * 1000:.1f}ms'
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark do tempo de inicialização do mail_cmd, por invocação.')
+    parser.add_argument(
+        '--repeticoes', type=int, default=10,
+        help='Quantidade de invocações medidas (padrão: 10; são reportadas a mediana e o mínimo)')
+    parser.add_argument(
+        '--top', type=int, default=20,
+        help='Quantidade de módulos mais custosos listados (padrão: 20)')
+    parser.add_argument(
+        '--executavel', metavar='ARQUIVO',
+        help='Executável gerado pelo PyInstaller, medido no lugar de "python -m mail_sender_util.mail_cmd"')
+    parser.add_argument(
+        '--saida', metavar='ARQUIVO',
+        help='Arquivo JSON onde os resultados são salvos (padrão: benchmarks/resultados/inicializacao-<data-hora>.json)')
+    parser.add_argument(
+        '--comparar', metavar='ARQUIVO',
+        help='Arquivo JSON de uma execução anterior, com o qual os resultados são comparados')
+    args = parser.parse_args()
+
+    anterior = None
+    if args.comparar is not None:
+        with open(args.comparar, 'r', encoding='utf-8') as file:
+            anterior = json.load(file)['resultados']
+
+    # Compilando o pacote previamente (tal qual no executável), para que a compilação dos fontes não seja medida
+    compileall.compile_dir(os.path.join(DIRETORIO_RAIZ, 'mail_sender_util'), quiet=1)
+
+    with tempfile.TemporaryDirectory() as diretorio, ServidorSMTPFake() as servidor:
+        entrada = criar_entrada(diretorio, servidor.porta)
+
+        if args.executavel is not None:
+            comando = [args.executavel, '--jsonl', entrada]
+        else:
+            comando = [sys.executable, '-X', 'importtime', '-m', 'mail_sender_util.mail_cmd', '--jsonl', entrada]
+
+        interpretador = medir([sys.executable, '-X', 'importtime', '-c', 'pass'], args.repeticoes, True)
+        resultados = {
+            'interpretador': interpretador,
+            'mail_cmd': medir(comando, args.repeticoes, args.executavel is None, interpretador)
+        }
+
+    imprimir_resultado(resultados['interpretador'], resultados['mail_cmd'], args.top, anterior)
+
+    saida = args.saida
+    if saida is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(
+            DIRETORIO_RESULTADOS, 'inicializacao-' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+
+    with open(saida, 'w', encoding='utf-8') as file:
+        json.dump({
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_atual(),
+            'python': sys.version,
+            'plataforma': platform.platform(),
+            'parametros': {
+                'repeticoes': args.repeticoes,
+                'executavel': args.executavel
+            },
+            'resultados': resultados
+        }, file, indent=2)
+
+    print(f'\nResultados salvos em: {saida}')
+
+
+if __name__ == '__main__':
+    main()
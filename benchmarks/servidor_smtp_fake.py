@@ -0,0 +1,333 @@
+import os
+import socket
+import socketserver
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+from typing import Dict, Iterable, List, Tuple
+
+
+class _ManipuladorSMTP(socketserver.BaseRequestHandler):
+    """
+    Trata uma conexão SMTP, aceitando (e descartando) as mensagens recebidas.
+
+    A latência configurada é aplicada uma vez a cada ida e volta do cliente (isto é, comandos enviados juntos,
+    por meio de PIPELINING, pagam uma única latência).
+    """
+
+    def setup(self):
+        # Respostas pequenas, e aguardadas pelo cliente: o algoritmo de Nagle apenas distorceria as medições
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = self.request
+        self.buffer = bytearray()
+        self.posicao = 0
+        self.aguardando_cliente = True
+
+    def _responder(self, *linhas: str):
+        self.sock.sendall(''.join(linha + '\r\n' for linha in linhas).encode('ascii'))
+        self.aguardando_cliente = True
+
+    def _ler_linha(self) -> bytes:
+        while True:
+            fim = self.buffer.find(b'\n', self.posicao)
+            if fim >= 0:
+                linha = bytes(self.buffer[self.posicao:fim + 1])
+                self.posicao = fim + 1
+                return linha
+
+            # Descartando as linhas já lidas, antes de receber mais dados
+            del self.buffer[:self.posicao]
+            self.posicao = 0
+
+            dados = self.sock.recv(256 * 1024)
+            if not dados:
+                return b''
+
+            # Primeiros dados após uma resposta: nova ida e volta do cliente
+            if self.aguardando_cliente:
+                self.aguardando_cliente = False
+                self._atrasar()
+
+            self.buffer += dados
+
+    def _atrasar(self):
+        latencia = self.server.servidor_fake.latencia
+        if latencia > 0:
+            time.sleep(latencia)
+
+    def _ehlo(self):
+        servidor = self.server.servidor_fake
+
+        extensoes = ['fake.local']
+        if servidor.pipelining:
+            extensoes.append('PIPELINING')
+        if servidor.tamanho_maximo is not None:
+            extensoes.append(f'SIZE {servidor.tamanho_maximo}')
+        extensoes.append('8BITMIME')
+        extensoes.append('AUTH PLAIN LOGIN')
+        if servidor.modo == 'start_tls' and not self.tls:
+            extensoes.append('STARTTLS')
+
+        self._responder(
+            *['250-' + extensao for extensao in extensoes[:-1]], '250 ' + extensoes[-1])
+
+    def _receber_conteudo(self) -> Tuple[int, bytes]:
+        tamanho = 0
+        conteudo = bytearray() if self.server.servidor_fake.registrar_conteudo else None
+        while True:
+            linha = self._ler_linha()
+            if not linha or linha == b'.\r\n':
+                return tamanho, bytes(conteudo) if conteudo is not None else None
+            tamanho += len(linha)
+
+            if conteudo is not None:
+                # Desfazendo o "dot-stuffing" (RFC 5321, seção 4.5.2)
+                conteudo += linha[1:] if linha.startswith(b'.') else linha
+
+    def handle(self):
+        servidor = self.server.servidor_fake
+        servidor._contar('conexoes')
+
+        self.tls = servidor.modo == 'ssl_tls'
+        if self.tls:
+            self.sock.do_handshake()
+            if self.sock.session_reused:
+                servidor._contar('sessoes_tls_retomadas')
+
+        self._atrasar()
+        self._responder('220 fake.local ESMTP')
+
+        remetente = None
+        destinatarios = []
+        while True:
+            linha = self._ler_linha()
+            if not linha:
+                return
+
+            comando = linha.decode('utf-8', 'replace').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+
+            if verbo in ('EHLO', 'HELO'):
+                self._ehlo()
+            elif verbo == 'STARTTLS':
+                self._responder('220 pronto para TLS')
+                self.sock = servidor.contexto_ssl.wrap_socket(self.sock, server_side=True)
+                self.tls = True
+                if self.sock.session_reused:
+                    servidor._contar('sessoes_tls_retomadas')
+            elif verbo == 'AUTH':
+                self._responder('235 autenticado')
+            elif verbo == 'MAIL':
+                remetente = comando[10:].split('>')[0].strip('<')
+                destinatarios = []
+                if remetente in servidor.recusar:
+                    remetente = None
+                    self._responder('553 remetente recusado')
+                else:
+                    self._responder('250 ok')
+            elif verbo == 'RCPT':
+                destinatario = comando[8:].split('>')[0].strip('<')
+                if remetente is None:
+                    self._responder('503 faltando comando MAIL')
+                elif destinatario in servidor.recusar:
+                    self._responder(f'550 destinatario recusado: {destinatario}')
+                else:
+                    destinatarios.append(destinatario)
+                    self._responder('250 ok')
+            elif verbo == 'DATA':
+                if len(destinatarios) <= 0:
+                    self._responder('554 sem destinatarios validos')
+                    continue
+
+                self._responder('354 envie os dados')
+                tamanho, conteudo = self._receber_conteudo()
+
+                falha = servidor._sortear_falha()
+                if falha == 'derrubar':
+                    # Conexão derrubada antes da confirmação (a mensagem não é contabilizada)
+                    return
+                elif falha == 'transitoria':
+                    self._responder('451 falha temporaria, tente novamente')
+                    continue
+
+                servidor._registrar(remetente, destinatarios, tamanho, conteudo)
+                self._responder('250 mensagem aceita')
+            elif verbo == 'RSET':
+                remetente = None
+                destinatarios = []
+                self._responder('250 ok')
+            elif verbo == 'NOOP':
+                self._responder('250 ok')
+            elif verbo == 'QUIT':
+                self._responder('221 tchau')
+                return
+            else:
+                self._responder('502 comando nao implementado')
+
+
+class _ServidorThreads(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def get_request(self):
+        conexao, endereco = super().get_request()
+
+        contexto_ssl = self.servidor_fake.contexto_ssl
+        if self.servidor_fake.modo == 'ssl_tls':
+            # O handshake é feito na thread da conexão (e não na thread que aceita as conexões)
+            conexao = contexto_ssl.wrap_socket(conexao, server_side=True, do_handshake_on_connect=False)
+
+        return conexao, endereco
+
+
+class ServidorSMTPFake:
+    """
+    Servidor SMTP mínimo, executado em threads do próprio processo, que aceita e descarta as mensagens
+    (registrando apenas o envelope e o tamanho de cada uma).
+
+    :modo: Criptografia do servidor: "null", "ssl_tls" (TLS implícito) ou "start_tls"
+    :contexto_ssl: Contexto SSL do servidor (obrigatório nos modos "ssl_tls" e "start_tls"; ver "criar_contexto_ssl_servidor")
+    :latencia: Atraso artificial (em segundos) aplicado a cada ida e volta do cliente (simulando a latência de rede)
+    :pipelining: Indica se a extensão PIPELINING é anunciada no EHLO
+    :tamanho_maximo: Tamanho máximo das mensagens, anunciado na extensão SIZE (None para não anunciar)
+    :recusar: Endereços recusados pelo servidor (nos comandos MAIL e RCPT)
+    :registrar_mensagens: Indica se o envelope e tamanho de cada mensagem devem ser guardados (por padrão, apenas os totais são contabilizados, para não interferir nas medições de memória)
+    :registrar_conteudo: Indica se o conteúdo de cada mensagem deve ser guardado (em "conteudos", na ordem de recebimento, já sem o "dot-stuffing"; usado pelos testes)
+    :falha_transitoria_a_cada: Responde com erro transitório (451) ao conteúdo de uma a cada N mensagens recebidas (simulando um servidor instável)
+    :derrubar_a_cada: Derruba a conexão, sem confirmar o recebimento, a cada N mensagens recebidas
+    """
+
+    modo: str
+    contexto_ssl: ssl.SSLContext
+    latencia: float
+    pipelining: bool
+    tamanho_maximo: int
+    mensagens: List[Tuple[str, List[str], int]]
+    conteudos: List[bytes]
+    contadores: Dict[str, int]
+
+    def __init__(
+        self,
+        modo: str = 'null',
+        contexto_ssl: ssl.SSLContext = None,
+        latencia: float = 0.0,
+        pipelining: bool = True,
+        tamanho_maximo: int = None,
+        recusar: Iterable[str] = (),
+        registrar_mensagens: bool = False,
+        registrar_conteudo: bool = False,
+        falha_transitoria_a_cada: int = None,
+        derrubar_a_cada: int = None
+    ):
+        if modo != 'null' and contexto_ssl is None:
+            raise ValueError(f'Faltando contexto SSL para o modo: {modo}')
+
+        self.modo = modo
+        self.contexto_ssl = contexto_ssl
+        self.latencia = latencia
+        self.pipelining = pipelining
+        self.tamanho_maximo = tamanho_maximo
+        self.recusar = set(recusar)
+        self.registrar_mensagens = registrar_mensagens
+        self.registrar_conteudo = registrar_conteudo
+        self.falha_transitoria_a_cada = falha_transitoria_a_cada
+        self.derrubar_a_cada = derrubar_a_cada
+        self.mensagens = []
+        self.conteudos = []
+        self.contadores = {'conexoes': 0}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _contar(self, nome: str):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + 1
+
+    def _sortear_falha(self) -> str:
+        with self._lock:
+            recebidas = self.contadores.get('recebidas', 0) + 1
+            self.contadores['recebidas'] = recebidas
+
+        if self.derrubar_a_cada is not None and recebidas % self.derrubar_a_cada == 0:
+            self._contar('derrubadas')
+            return 'derrubar'
+        if self.falha_transitoria_a_cada is not None and recebidas % self.falha_transitoria_a_cada == 0:
+            self._contar('falhas_transitorias')
+            return 'transitoria'
+        return None
+
+    def _registrar(self, remetente: str, destinatarios: List[str], tamanho: int, conteudo: bytes = None):
+        with self._lock:
+            self.contadores['mensagens'] = self.contadores.get('mensagens', 0) + 1
+            self.contadores['bytes'] = self.contadores.get('bytes', 0) + tamanho
+            if self.registrar_mensagens:
+                self.mensagens.append((remetente, list(destinatarios), tamanho))
+            if self.registrar_conteudo:
+                self.conteudos.append(conteudo)
+
+    def iniciar(self) -> int:
+        """
+        Inicia o servidor, numa porta livre da interface local, retornando a porta escolhida.
+        """
+
+        self._servidor = _ServidorThreads(('127.0.0.1', 0), _ManipuladorSMTP)
+        self._servidor.servidor_fake = self
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+        return self._servidor.server_address[1]
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def limpar(self):
+        with self._lock:
+            self.mensagens = []
+            self.conteudos = []
+            self.contadores = {'conexoes': 0}
+
+    def __enter__(self) -> 'ServidorSMTPFake':
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.parar()
+
+    @property
+    def porta(self) -> int:
+        return self._servidor.server_address[1]
+
+
+def criar_contexto_ssl_servidor(diretorio: str = None) -> ssl.SSLContext:
+    """
+    Cria o contexto SSL do servidor, com um certificado auto-assinado (gerado pelo executável "openssl").
+
+    Os arquivos do certificado são gerados no diretório indicado (ou num diretório temporário), e reaproveitados se já existirem.
+    """
+
+    if diretorio is None:
+        diretorio = os.path.join(tempfile.gettempdir(), 'mail_sender_util_benchmarks')
+    os.makedirs(diretorio, exist_ok=True)
+
+    certificado = os.path.join(diretorio, 'certificado.pem')
+    chave = os.path.join(diretorio, 'chave.pem')
+
+    if not os.path.exists(certificado) or not os.path.exists(chave):
+        subprocess.run(
+            [
+                'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                '-keyout', chave, '-out', certificado, '-days', '365', '-subj', '/CN=localhost'
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(certificado, chave)
+
+    return ctx
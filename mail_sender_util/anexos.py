@@ -0,0 +1,234 @@
+import html
+import os
+
+from email.header import decode_header, make_header
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import make_msgid, parseaddr
+from mail_sender_util.exception import MensagemExcedeTamanhoException
+from mail_sender_util.mime_stream import MIMEMultipartStream, tamanho_payload
+from typing import Dict, Iterable, List, Tuple
+
+# Extensões de formatos já compactados (que praticamente não diminuem ao serem compactados novamente)
+EXTENSOES_JA_COMPACTADAS = frozenset([
+    '7z', 'aac', 'avi', 'bz2', 'docx', 'gif', 'gz', 'jpeg', 'jpg', 'mkv', 'mov', 'mp3', 'mp4', 'odp', 'ods', 'odt',
+    'ogg', 'pdf', 'png', 'pptx', 'rar', 'tgz', 'webm', 'webp', 'xlsx', 'xz', 'zip'
+])
+
+# Acréscimo estimado, por parte MIME, do delimitador (boundary) e das quebras de linha que o cercam
+TAMANHO_DELIMITADOR = 80
+
+TEXTO_CONTINUACAO = '<p>Parte {parte} de {total} da mensagem: {assunto}</p>'
+
+
+class PoliticaAnexos:
+    """
+    Política de tratamento dos anexos e do tamanho das mensagens (ver parâmetro "politica_anexos" do MailSender).
+
+    :detectar_tipo_mime: Indica se o tipo MIME dos anexos deve ser identificado pela extensão do nome do arquivo (padrão: True). Caso contrário (ou caso a extensão não seja conhecida), os anexos são enviados como "application/octet-stream".
+    :compactar: Indica se os anexos devem ser compactados em zip (padrão: False), exceto os arquivos menores que "tamanho_minimo_compactacao", ou com as extensões de "extensoes_nao_compactadas". O anexo compactado recebe o nome original acrescido de ".zip".
+    :tamanho_minimo_compactacao: Tamanho mínimo (em bytes) dos arquivos compactados (padrão: 64 KB)
+    :extensoes_nao_compactadas: Extensões (sem o ponto) dos arquivos que não são compactados (padrão: formatos já compactados, como zip, jpg, pdf e docx)
+    :verificar_tamanho: Indica se o tamanho de cada mensagem deve ser verificado antes do envio (padrão: True), contra o limite anunciado pelo servidor (extensão SIZE, RFC 1870) e contra o "tamanho_maximo". A mensagem que excede o limite falha antes que qualquer conteúdo seja transmitido (e o tamanho é informado ao servidor no comando MAIL, quando suportado).
+    :tamanho_maximo: Tamanho máximo (em bytes) das mensagens, além do limite anunciado pelo servidor (padrão: apenas o limite do servidor)
+    :dividir_mensagens: Indica se as mensagens que excedem o limite devem ser divididas (padrão: False): os anexos são distribuídos entre várias mensagens, cada uma dentro do limite, com o assunto acrescido de " (parte k/n)". A primeira mensagem mantém o corpo (texto e imagens), e as demais contêm apenas um texto indicando a continuação.
+    """
+
+    __slots__ = (
+        'detectar_tipo_mime', 'compactar', 'tamanho_minimo_compactacao', 'extensoes_nao_compactadas',
+        'verificar_tamanho', 'tamanho_maximo', 'dividir_mensagens'
+    )
+
+    detectar_tipo_mime: bool
+    compactar: bool
+    tamanho_minimo_compactacao: int
+    extensoes_nao_compactadas: frozenset
+    verificar_tamanho: bool
+    tamanho_maximo: int
+    dividir_mensagens: bool
+
+    def __init__(
+        self,
+        detectar_tipo_mime: bool = True,
+        compactar: bool = False,
+        tamanho_minimo_compactacao: int = 64 * 1024,
+        extensoes_nao_compactadas: Iterable[str] = EXTENSOES_JA_COMPACTADAS,
+        verificar_tamanho: bool = True,
+        tamanho_maximo: int = None,
+        dividir_mensagens: bool = False
+    ):
+        self.detectar_tipo_mime = detectar_tipo_mime
+        self.compactar = compactar
+        self.tamanho_minimo_compactacao = tamanho_minimo_compactacao
+        self.extensoes_nao_compactadas = frozenset(extensao.lower().lstrip('.') for extensao in extensoes_nao_compactadas)
+        self.verificar_tamanho = verificar_tamanho
+        self.tamanho_maximo = tamanho_maximo
+        self.dividir_mensagens = dividir_mensagens
+
+    def deve_compactar(self, nome: str, tamanho: int) -> bool:
+        """
+        Indica se o anexo, com o nome (exibido no e-mail) e tamanho (em bytes) passados, deve ser compactado.
+        """
+
+        if not self.compactar or tamanho < self.tamanho_minimo_compactacao:
+            return False
+
+        return not os.path.splitext(nome)[1].lower().lstrip('.') in self.extensoes_nao_compactadas
+
+    def limite_tamanho(self, tamanho_servidor: int = None) -> int:
+        """
+        Retorna o tamanho máximo das mensagens (o menor entre o "tamanho_maximo" e o limite anunciado pelo servidor),
+        ou None, caso não haja limite.
+        """
+
+        limites = [limite for limite in (self.tamanho_maximo, tamanho_servidor) if limite]
+        return min(limites) if limites else None
+
+
+class MensagemDividida:
+    """
+    Mensagem dividida em partes (ver dividir_mensagem), enviadas em sequência, como mensagens independentes.
+
+    O atributo "enviadas" guarda a quantidade de partes já enviadas (de modo que as retentativas não reenviem as mesmas).
+    """
+
+    __slots__ = ('partes', 'enviadas')
+
+    partes: List[MIMEMultipart]
+    enviadas: int
+
+    def __init__(self, partes: List[MIMEMultipart]):
+        self.partes = partes
+        self.enviadas = 0
+
+
+def tipo_mime(nome: str) -> Tuple[str, str]:
+    """
+    Identifica o tipo MIME (tipo principal e subtipo) de um arquivo pela extensão do nome, retornando
+    "application/octet-stream" caso a extensão não seja conhecida.
+    """
+
+    # Importado apenas quando usada a detecção (a base de tipos é carregada do sistema no primeiro uso)
+    import mimetypes
+
+    tipo, codificacao = mimetypes.guess_type(nome, strict=False)
+
+    # Arquivos compactados (exemplo: ".tar.gz") são identificados pelo tipo do conteúdo descompactado
+    if tipo is None or codificacao is not None:
+        return 'application', 'octet-stream'
+
+    maintype, subtype = tipo.split('/', 1)
+    return maintype, subtype
+
+
+def tamanho_maximo_anunciado(esmtp_features: Dict[str, str]) -> int:
+    """
+    Retorna o tamanho máximo das mensagens anunciado pelo servidor no EHLO (extensão SIZE), ou 0, caso o servidor
+    não anuncie um limite.
+    """
+
+    try:
+        return int(esmtp_features.get('size') or 0)
+    except ValueError:
+        return 0
+
+
+def dividir_mensagem(msg: MIMEMultipart, limite: int) -> List[MIMEMultipart]:
+    """
+    Divide a mensagem em mensagens de até "limite" bytes (estimados, sem serializar a mensagem), distribuindo os
+    anexos, na ordem, entre as mesmas (ver parâmetro "dividir_mensagens" da PoliticaAnexos).
+
+    Retorna a própria mensagem (numa lista), caso a mesma caiba no limite. Lança MensagemExcedeTamanhoException caso
+    o corpo, ou algum dos anexos, não caiba sozinho numa mensagem.
+    """
+
+    corpo = []
+    anexos = []
+    for parte in msg.get_payload():
+        if parte.get_content_disposition() == 'attachment':
+            anexos.append(parte)
+        else:
+            corpo.append(parte)
+
+    tamanho_cabecalhos = _tamanho_cabecalhos(msg) + 2 * TAMANHO_DELIMITADOR
+    tamanho_corpo = sum(_tamanho_parte(msg, parte) for parte in corpo)
+    tamanhos_anexos = [_tamanho_parte(msg, parte) for parte in anexos]
+
+    if tamanho_cabecalhos + tamanho_corpo + sum(tamanhos_anexos) <= limite:
+        return [msg]
+
+    if tamanho_cabecalhos + tamanho_corpo > limite:
+        raise MensagemExcedeTamanhoException(
+            f'O corpo da mensagem ({tamanho_cabecalhos + tamanho_corpo} bytes) excede sozinho o limite de {limite} bytes por mensagem')
+
+    assunto = msg['Subject'] or ''
+    total_estimado = len(anexos) + 1
+    texto = TEXTO_CONTINUACAO.format(parte=total_estimado, total=total_estimado, assunto=html.escape(assunto))
+    # Texto de continuação das demais mensagens (codificado em base64, no pior caso)
+    tamanho_continuacao = 2 * len(texto.encode('utf-8')) + TAMANHO_DELIMITADOR + 128
+
+    # Distribuindo os anexos, na ordem: cada mensagem recebe anexos enquanto couberem
+    grupos = [[]]
+    disponivel = limite - tamanho_cabecalhos - tamanho_corpo
+    for parte, tamanho in zip(anexos, tamanhos_anexos):
+        if tamanho > disponivel:
+            disponivel = limite - tamanho_cabecalhos - tamanho_continuacao
+            if tamanho > disponivel:
+                raise MensagemExcedeTamanhoException(
+                    f'O anexo "{_nome_anexo(parte)}" ({tamanho} bytes, codificado) excede sozinho o limite de {limite} bytes por mensagem')
+            grupos.append([])
+
+        grupos[-1].append(parte)
+        disponivel -= tamanho
+
+    dominio = parseaddr(msg['From'] or '')[1].rpartition('@')[2]
+
+    partes = []
+    for k, grupo in enumerate(grupos, 1):
+        nova = msg.nova_mensagem() if isinstance(msg, MIMEMultipartStream) else MIMEMultipart()
+
+        # Os headers são copiados na ordem original (exceto os já criados pela própria MIMEMultipart)
+        for chave, valor in msg.items():
+            if chave == 'Subject':
+                valor = f'{assunto} (parte {k}/{len(grupos)})'
+            elif chave == 'Message-ID' and k > 1:
+                valor = make_msgid(domain=dominio)
+            elif chave in nova:
+                continue
+            nova[chave] = valor
+
+        if k == 1:
+            for parte in corpo:
+                nova.attach(parte)
+        else:
+            nova.attach(MIMEText(
+                TEXTO_CONTINUACAO.format(parte=k, total=len(grupos), assunto=html.escape(assunto)), 'html'))
+
+        for parte in grupo:
+            nova.attach(parte)
+
+        partes.append(nova)
+
+    return partes
+
+
+def _tamanho_cabecalhos(parte: Message) -> int:
+    return sum(len(chave) + len(str(valor)) + 4 for chave, valor in parte.items())
+
+
+def _tamanho_parte(msg: MIMEMultipart, parte: Message) -> int:
+    if isinstance(msg, MIMEMultipartStream):
+        tamanho = msg.tamanho_payload(parte)
+    else:
+        tamanho = tamanho_payload(parte.get_payload())
+
+    return tamanho + _tamanho_cabecalhos(parte) + TAMANHO_DELIMITADOR
+
+
+def _nome_anexo(parte: Message) -> str:
+    nome = parte.get_filename()
+    if nome is None:
+        return ''
+
+    return str(make_header(decode_header(nome)))
@@ -0,0 +1,663 @@
+import asyncio
+import base64
+import ssl
+import time
+
+from mail_sender_util.cache_mime import EntradaCacheMime
+from mail_sender_util.exception import TLSVersionNaoSuportadaException
+from mail_sender_util.mail import Mail
+from mail_sender_util.mail_sender import TAMANHO_BUFFER_ENVIO, CryptMethod, MailSender, _Lote, _mensagem_dividida
+from mail_sender_util.metricas import FASE_CONEXAO, FASE_ENVIO, FASE_LIMITE, FASE_LOGIN, FASE_STARTTLS
+from smtplib import SMTPAuthenticationError, SMTPDataError, SMTPException, SMTPNotSupportedError, SMTPRecipientsRefused, SMTPResponseException, SMTPSenderRefused, SMTPServerDisconnected, quoteaddr
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+# Tal qual no MailSender, o pacote email.mime e os módulos das funcionalidades opcionais (caixa de saída e política
+# de anexos) só são importados quando usados
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+    from mail_sender_util.anexos import MensagemDividida
+    from mail_sender_util.caixa_saida import CaixaSaida
+
+
+class ConexaoSMTPAsync:
+    """
+    Cliente SMTP mínimo, sobre sockets não bloqueantes (asyncio), com suporte a SSL/TLS implícito, STARTTLS e AUTH (PLAIN e LOGIN).
+
+    As falhas são reportadas com as mesmas exceções do módulo smtplib, para que o tratamento de erros seja idêntico ao do MailSender.
+    """
+
+    host: str
+    port: int
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    esmtp_features: Dict[str, str]
+    qtd_msgs: int
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = int(port)
+        self.reader = None
+        self.writer = None
+        self.esmtp_features = {}
+        self.qtd_msgs = 0
+
+    async def conectar(self, ctx: ssl.SSLContext = None) -> None:
+        """
+        Abre a conexão (criptografada desde o início, caso passado um contexto SSL), e lê a saudação do servidor.
+        """
+
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=ctx,
+            server_hostname=self.host if ctx is not None else None
+        )
+
+        code, msg = await self._ler_resposta()
+        if code != 220:
+            await self.fechar()
+            raise SMTPResponseException(code, msg)
+
+    async def _ler_resposta(self) -> Tuple[int, bytes]:
+        linhas = []
+        while True:
+            linha = await self.reader.readline()
+            if not linha:
+                raise SMTPServerDisconnected('Conexão encerrada inesperadamente pelo servidor')
+
+            linhas.append(linha[4:].strip())
+            try:
+                code = int(linha[:3])
+            except ValueError:
+                code = -1
+
+            if linha[3:4] != b'-':
+                return code, b'\n'.join(linhas)
+
+    async def comando(self, cmd: str) -> Tuple[int, bytes]:
+        self.writer.write(f'{cmd}\r\n'.encode('utf-8'))
+        await self.writer.drain()
+        return await self._ler_resposta()
+
+    async def ehlo(self) -> None:
+        code, msg = await self.comando('ehlo localhost')
+        if code != 250:
+            raise SMTPResponseException(code, msg)
+
+        # Interpretando as extensões suportadas (ignorando a primeira linha, que é a saudação)
+        self.esmtp_features = {}
+        for linha in msg.decode('latin-1').split('\n')[1:]:
+            partes = linha.split(' ', 1)
+            self.esmtp_features[partes[0].lower()] = partes[1] if len(partes) > 1 else ''
+
+    def has_extn(self, opt: str) -> bool:
+        return opt.lower() in self.esmtp_features
+
+    async def starttls(self, ctx: ssl.SSLContext) -> None:
+        if not self.has_extn('starttls'):
+            raise SMTPNotSupportedError('Extensão STARTTLS não suportada pelo servidor.')
+
+        code, msg = await self.comando('STARTTLS')
+        if code != 220:
+            raise SMTPResponseException(code, msg)
+
+        if hasattr(self.writer, 'start_tls'):
+            await self.writer.start_tls(ctx, server_hostname=self.host)
+        else:
+            # Python < 3.11: O upgrade do transporte precisa ser feito diretamente pelo loop
+            loop = asyncio.get_running_loop()
+            protocolo = self.writer.transport.get_protocol()
+            transporte = await loop.start_tls(
+                self.writer.transport, protocolo, ctx, server_hostname=self.host)
+            self.writer = asyncio.StreamWriter(
+                transporte, protocolo, self.reader, loop)
+
+        # A lista de extensões deve ser obtida novamente, após o início da criptografia
+        await self.ehlo()
+
+    async def login(self, user: str, password: str) -> Tuple[int, bytes]:
+        if not self.has_extn('auth'):
+            raise SMTPNotSupportedError('Extensão SMTP AUTH não suportada pelo servidor.')
+
+        metodos = self.esmtp_features['auth'].upper().split()
+        if 'PLAIN' in metodos:
+            credencial = base64.b64encode(
+                f'\0{user}\0{password}'.encode('utf-8')).decode('ascii')
+            code, msg = await self.comando(f'AUTH PLAIN {credencial}')
+        elif 'LOGIN' in metodos:
+            code, msg = await self.comando('AUTH LOGIN')
+            if code == 334:
+                code, msg = await self.comando(
+                    base64.b64encode(user.encode('utf-8')).decode('ascii'))
+            if code == 334:
+                code, msg = await self.comando(
+                    base64.b64encode(password.encode('utf-8')).decode('ascii'))
+        else:
+            raise SMTPException('Nenhum método de autenticação suportado (PLAIN ou LOGIN).')
+
+        if code not in (235, 503):
+            raise SMTPAuthenticationError(code, msg)
+
+        return code, msg
+
+    async def _encerrada_pelo_servidor(self, code: int, msg: bytes) -> None:
+        """
+        Trata a resposta 421 (o servidor está encerrando a conexão, RFC 5321 seção 3.8): a conexão é fechada (sem
+        RSET, que não seria respondido), e a desconexão é reportada, para que a mensagem seja reenviada por uma nova
+        conexão (tal qual a conexão fechada pelo MailSender, nos métodos "_enviar_envelope" e "_enviar_envelope_pipelining").
+        """
+
+        await self.fechar()
+        raise SMTPServerDisconnected(
+            f'Conexão encerrada pelo servidor ({code}): {msg.decode("utf-8", "replace")}')
+
+    async def _enviar_envelope(self, remetente: str, destinatarios: List[str], opcoes: List[str] = ()) -> None:
+        code, msg = await self.comando(f'MAIL FROM:{quoteaddr(remetente)}{"".join(" " + opcao for opcao in opcoes)}')
+        if code == 421:
+            await self._encerrada_pelo_servidor(code, msg)
+        if code != 250:
+            await self.comando('RSET')
+            raise SMTPSenderRefused(code, msg, remetente)
+
+        recusados = {}
+        for destinatario in destinatarios:
+            code, msg = await self.comando(f'RCPT TO:{quoteaddr(destinatario)}')
+            if code == 421:
+                await self._encerrada_pelo_servidor(code, msg)
+            if code not in (250, 251):
+                recusados[destinatario] = (code, msg)
+
+        if len(recusados) == len(destinatarios):
+            await self.comando('RSET')
+            raise SMTPRecipientsRefused(recusados)
+
+        code, msg = await self.comando('DATA')
+        if code == 421:
+            await self._encerrada_pelo_servidor(code, msg)
+        if code != 354:
+            await self.comando('RSET')
+            raise SMTPDataError(code, msg)
+
+    async def _enviar_envelope_pipelining(self, remetente: str, destinatarios: List[str], opcoes: List[str] = ()) -> None:
+        """
+        Envia os comandos MAIL, RCPT (de todos os destinatários) e DATA numa única escrita (RFC 2920), e só então
+        lê as respostas, na mesma ordem.
+        """
+
+        comandos = [f'MAIL FROM:{quoteaddr(remetente)}{"".join(" " + opcao for opcao in opcoes)}\r\n']
+        for destinatario in destinatarios:
+            comandos.append(f'RCPT TO:{quoteaddr(destinatario)}\r\n')
+        comandos.append('DATA\r\n')
+        self.writer.write(''.join(comandos).encode('utf-8'))
+        await self.writer.drain()
+
+        code, msg = await self._ler_resposta()
+        if code == 421:
+            await self._encerrada_pelo_servidor(code, msg)
+        recusa_remetente = (code, msg) if code != 250 else None
+
+        recusados = {}
+        for destinatario in destinatarios:
+            code, msg = await self._ler_resposta()
+            if code == 421:
+                await self._encerrada_pelo_servidor(code, msg)
+            if code not in (250, 251):
+                recusados[destinatario] = (code, msg)
+
+        code, msg = await self._ler_resposta()
+        if code == 421:
+            await self._encerrada_pelo_servidor(code, msg)
+
+        sem_transacao = recusa_remetente is not None or len(recusados) == len(destinatarios)
+        if code == 354 and sem_transacao:
+            # O servidor não deveria aceitar o DATA sem remetente ou destinatários válidos, mas, se o fizer, o conteúdo é encerrado vazio
+            await self.comando('.')
+
+        if recusa_remetente is not None:
+            await self.comando('RSET')
+            raise SMTPSenderRefused(recusa_remetente[0], recusa_remetente[1], remetente)
+
+        if len(recusados) == len(destinatarios):
+            await self.comando('RSET')
+            raise SMTPRecipientsRefused(recusados)
+
+        if code != 354:
+            await self.comando('RSET')
+            raise SMTPDataError(code, msg)
+
+    async def enviar(
+        self,
+        remetente: str,
+        destinatarios: List[str],
+        blocos: Iterable[bytes],
+        opcoes: List[str] = ()
+    ) -> Tuple[int, int]:
+        """
+        Envia uma mensagem serializada (conforme retornado pela função "serializar"), escrevendo o corpo bloco a bloco,
+        e aguardando o esvaziamento do buffer do socket entre os blocos. As "opcoes" são acrescidas ao comando MAIL.
+
+        Retorna a quantidade de bytes do conteúdo escritos no socket, e o código da resposta final do servidor.
+        """
+
+        # Envelope (agrupado numa única escrita, caso o servidor suporte PIPELINING)
+        if self.has_extn('pipelining'):
+            await self._enviar_envelope_pipelining(remetente, destinatarios, opcoes)
+        else:
+            await self._enviar_envelope(remetente, destinatarios, opcoes)
+
+        bytes_enviados = 0
+        loop = asyncio.get_running_loop()
+        blocos = iter(blocos)
+        try:
+            # Os blocos são agrupados antes da escrita no socket, evitando pacotes pequenos (e o atraso do algoritmo de Nagle).
+            # O agrupamento é feito fora do event loop, pois os blocos podem ser lidos e codificados de arquivos (no modo streaming)
+            while True:
+                buffer, fim = await loop.run_in_executor(None, _agrupar_blocos, blocos)
+                if fim:
+                    break
+
+                self.writer.write(buffer)
+                bytes_enviados += len(buffer)
+                await self.writer.drain()
+
+            if not buffer.endswith(b'\r\n'):
+                buffer += b'\r\n'
+            buffer += b'.\r\n'
+            self.writer.write(bytes(buffer))
+            bytes_enviados += len(buffer)
+            await self.writer.drain()
+        except Exception:
+            # A conexão fica inutilizada, caso o envio seja interrompido no meio do conteúdo
+            await self.fechar()
+            raise
+
+        code, msg = await self._ler_resposta()
+        if code == 421:
+            await self._encerrada_pelo_servidor(code, msg)
+        if code != 250:
+            raise SMTPDataError(code, msg)
+
+        self.qtd_msgs += 1
+
+        return bytes_enviados, code
+
+    async def quit(self) -> None:
+        try:
+            await self.comando('QUIT')
+        except Exception:
+            pass
+        await self.fechar()
+
+    async def fechar(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+
+
+def _agrupar_blocos(blocos: Iterator[bytes]) -> Tuple[bytearray, bool]:
+    """
+    Agrupa os próximos blocos do conteúdo (já com o "dot-stuffing"), até atingir o tamanho do buffer de envio,
+    retornando também se o conteúdo terminou (caso em que o grupo retornado é o último).
+    """
+
+    from mail_sender_util.mime_stream import quote_periods
+
+    buffer = bytearray()
+    for bloco in blocos:
+        buffer += quote_periods(bloco)
+        if len(buffer) >= TAMANHO_BUFFER_ENVIO:
+            return buffer, False
+
+    return buffer, True
+
+
+class _PoolConexoesAsync:
+    """
+    Conexões ociosas de uma chamada do método "enviar_lista" (limitadas pelo semáforo de mensagens em andamento).
+    """
+
+    def __init__(self):
+        self.ociosas = []
+        self.falha_conexao = False
+
+
+class AsyncMailSender(MailSender):
+
+    def __init__(self, *args, **kwargs):
+        """
+        Versão asyncio do MailSender, com o mesmo construtor, e a mesma semântica dos métodos "enviar" e "enviar_lista"
+        (porém, ambos são corrotinas, e não bloqueiam o event loop durante o envio).
+
+        O parâmetro "num_conexoes" limita a quantidade de mensagens em envio simultâneo (e, portanto, de conexões abertas).
+        A composição das mensagens (e demais operações com leitura de arquivos) é feita no executor padrão do event loop.
+
+        Os parâmetros "num_processos" e "manter_conexoes", e a caixa de saída, não são suportados.
+        """
+
+        super().__init__(*args, **kwargs)
+
+        if self.num_processos > 1:
+            raise ValueError('O AsyncMailSender não suporta múltiplos processos de envio (parâmetro "num_processos")')
+
+        if self.manter_conexoes:
+            raise ValueError('O AsyncMailSender não suporta manter as conexões entre os envios (parâmetro "manter_conexoes")')
+
+    async def enviar(
+        self,
+        erros_msgs: Dict[int, List[str]],
+        assunto: str,
+        remetente: str,
+        destinatarios: List[str],
+        msg_html: str,
+        dest_copia: List[str] = None,
+        dest_copia_oculta: List[str] = None,
+        imagens: List[Tuple[str, str]] = None,
+        anexos: List[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Corrotina equivalente ao método "enviar" do MailSender.
+        """
+
+        mail = self._converter_parametros(
+            assunto,
+            remetente,
+            destinatarios,
+            msg_html,
+            dest_copia,
+            dest_copia_oculta,
+            imagens,
+            anexos
+        )
+
+        await self.enviar_lista([mail], erros_msgs)
+
+    async def enviar_lista(
+        self,
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: 'CaixaSaida' = None
+    ) -> None:
+        """
+        Corrotina equivalente ao método "enviar_lista" do MailSender (com o mesmo formato de entrada e de registro dos erros).
+
+        Cada mensagem só é composta quando há vaga no semáforo, de modo que a entrada pode ser qualquer iterável
+        (inclusive um generator), sem que todas as mensagens sejam mantidas em memória.
+        """
+
+        self._verificar_caixa_saida(caixa_saida)
+        await self._enviar_lote(mail_msgs, erros_msgs, callback_resultado)
+
+    async def enviar_mala_direta(
+        self,
+        modelo: Dict[str, Any],
+        destinos: Iterable[Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: 'CaixaSaida' = None
+    ) -> None:
+        """
+        Corrotina equivalente ao método "enviar_mala_direta" do MailSender.
+        """
+
+        self._verificar_caixa_saida(caixa_saida)
+
+        # O modelo (e seus arquivos) é lido e codificado fora do event loop
+        loop = asyncio.get_running_loop()
+        mail_msgs, partes_compartilhadas = await loop.run_in_executor(
+            None, self._preparar_mala_direta, modelo, destinos, erros_msgs)
+        if mail_msgs is None:
+            return
+
+        await self._enviar_lote(mail_msgs, erros_msgs, callback_resultado, partes_compartilhadas)
+
+    def _verificar_caixa_saida(self, caixa_saida: 'CaixaSaida') -> None:
+        if caixa_saida is not None:
+            raise ValueError('O AsyncMailSender não suporta a caixa de saída (parâmetro "caixa_saida")')
+
+    async def _enviar_lote(
+        self,
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None
+    ) -> None:
+        # Resolvendo versão TLS
+        try:
+            ctx = self._obter_contexto_ssl()
+        except TLSVersionNaoSuportadaException as e:
+            erros = erros_msgs.setdefault(-1, [])
+            erros.append(str(e))
+            return
+
+        # Enviando as mensagens, limitadas pelo semáforo
+        lote = _Lote(ctx, erros_msgs, callback_resultado, retentativas_restantes=self.max_retentativas_lote)
+        semaforo = asyncio.Semaphore(max(1, self.num_conexoes))
+        pool = _PoolConexoesAsync()
+
+        loop = asyncio.get_running_loop()
+        itens = enumerate(mail_msgs)
+        tarefas = set()
+        try:
+            # Abrindo a primeira conexão antes da composição, caso o tamanho máximo do servidor seja necessário à mesma
+            if self._aguardar_tamanho_servidor():
+                conexao = await self._obter_conexao_async(lote)
+                if conexao is None:
+                    pool.falha_conexao = True
+                else:
+                    pool.ociosas.append(conexao)
+
+            for i, mail_msg in itens:
+                await semaforo.acquire()
+
+                # Interrompendo o envio, caso não seja possível conectar ao servidor (as mensagens restantes não são enviadas)
+                if pool.falha_conexao and len(pool.ociosas) <= 0:
+                    semaforo.release()
+                    if i in erros_msgs:
+                        lote.concluir(i)
+                    else:
+                        lote.registrar_falha_conexao(i)
+                    self._descartar_restantes(lote, itens)
+                    break
+
+                # A composição lê e codifica os arquivos das imagens e anexos (sendo feita fora do event loop)
+                inicio = time.perf_counter()
+                msg = await loop.run_in_executor(
+                    None, self._compor_mensagem, i, mail_msg, erros_msgs, partes_compartilhadas)
+                self._emitir_composicao(i, inicio, msg, erros_msgs)
+                if msg is None:
+                    semaforo.release()
+                    lote.concluir(i)
+                    continue
+
+                tarefa = asyncio.ensure_future(self._enviar_mensagem_async(
+                    semaforo, pool, lote, i, msg))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+            await asyncio.gather(*tarefas)
+        finally:
+            # Finalizando as conexões
+            for conexao in pool.ociosas:
+                await conexao.quit()
+
+    async def _enviar_mensagem_async(
+        self,
+        semaforo: asyncio.Semaphore,
+        pool: _PoolConexoesAsync,
+        lote: _Lote,
+        i: int,
+        msg: 'Union[MIMEMultipart, MensagemDividida]'
+    ) -> None:
+        """
+        Envia a mensagem, liberando a vaga do semáforo (adquirida pelo método "enviar_lista") ao final.
+
+        As partes de uma mensagem dividida são enviadas em sequência (tal qual no método "_enviar_mensagem").
+        """
+
+        from mail_sender_util.mime_stream import serializar_com_tamanho
+
+        partes = msg.partes if _mensagem_dividida(msg) else [msg]
+        enviadas = 0
+
+        # Identificação da parte nos eventos de medição (apenas nas mensagens divididas)
+        def parte_atual() -> Dict[str, int]:
+            if len(partes) == 1:
+                return {}
+            return {'parte': enviadas + 1, 'qtd_partes': len(partes)}
+
+        try:
+            tentativa = 1
+            while True:
+                # Obtendo uma conexão ociosa, ou abrindo uma nova
+                if len(pool.ociosas) > 0:
+                    conexao = pool.ociosas.pop()
+                elif pool.falha_conexao:
+                    lote.registrar_falha_conexao(i)
+                    return
+                else:
+                    conexao = await self._obter_conexao_async(lote)
+                    if conexao is None:
+                        pool.falha_conexao = True
+                        lote.registrar_falha_conexao(i)
+                        return
+
+                # Enviando o e-mail de fato (as partes já enviadas, em tentativas anteriores, não são reenviadas)
+                inicio = time.perf_counter()
+                try:
+                    while enviadas < len(partes):
+                        parte = partes[enviadas]
+                        espera = await self._reservar_limite_async(parte)
+                        if espera > 0:
+                            inicio = time.perf_counter()
+                            await asyncio.sleep(espera)
+                            self._emitir(FASE_LIMITE, i, inicio, **parte_atual())
+
+                        inicio = time.perf_counter()
+                        remetente, destinatarios, blocos, tamanho = serializar_com_tamanho(parte)
+                        opcoes = self._opcoes_envelope(conexao.esmtp_features, tamanho)
+                        bytes_enviados, code = await conexao.enviar(remetente, destinatarios, blocos, opcoes)
+                        self._emitir(FASE_ENVIO, i, inicio, bytes_enviados, code, **parte_atual())
+                        enviadas += 1
+
+                    lote.concluir(i)
+                    break
+                except Exception as e:
+                    # As exceções do smtplib derivam de OSError, mas apenas as demais (e a desconexão) inutilizam a conexão
+                    if conexao.writer is None or isinstance(e, SMTPServerDisconnected) or (isinstance(e, OSError) and not isinstance(e, SMTPException)):
+                        await conexao.fechar()
+                        conexao = None
+
+                    if self._deve_repetir(lote, e, tentativa):
+                        # Erro transitório: aguardando para tentar novamente (pela mesma conexão, ou por uma nova, caso a mesma tenha caído)
+                        self._emitir(
+                            FASE_ENVIO, i, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=str(e),
+                            **parte_atual())
+                        if conexao is not None:
+                            pool.ociosas.append(conexao)
+                        await asyncio.sleep(self._tempo_espera_retentativa(tentativa))
+                        tentativa += 1
+                        continue
+
+                    self._registrar_erro_envio(i, partes[enviadas], e, lote.erros_msgs)
+                    self._emitir(
+                        FASE_ENVIO, i, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=lote.erros_msgs[i][-1],
+                        **parte_atual())
+                    lote.concluir(i)
+                    if conexao is None:
+                        return
+                    break
+
+            # Devolvendo a conexão ao pool, ou finalizando-a, caso atingido o limite de mensagens da mesma
+            if self.max_msgs_por_conexao is not None and conexao.qtd_msgs >= self.max_msgs_por_conexao:
+                await conexao.quit()
+            else:
+                pool.ociosas.append(conexao)
+        finally:
+            semaforo.release()
+
+    async def _reservar_limite_async(self, msg: 'MIMEMultipart') -> float:
+        # Os limites compartilhados em arquivo bloqueiam (aguardando o lock do arquivo), sendo reservados fora do event loop
+        if self.arquivo_limite is not None:
+            return await asyncio.get_running_loop().run_in_executor(None, self._reservar_limite, msg)
+
+        return self._reservar_limite(msg)
+
+    async def _obter_conexao_async(self, lote: _Lote) -> ConexaoSMTPAsync:
+        """
+        Abre uma nova conexão, repetindo em caso de erros transitórios (tal qual o método "_obter_conexao").
+
+        Retorna None, em caso de erro (registrando o erro geral correspondente).
+        """
+
+        tentativa = 1
+        while True:
+            erros_conexao = {}
+            conexao, erro = await self._conectar_async(lote.ctx, erros_conexao)
+            if conexao is not None:
+                return conexao
+
+            if not self._deve_repetir(lote, erro, tentativa):
+                for erro_geral in erros_conexao.get(-1, []):
+                    self._registrar_erro_geral(lote.erros_msgs, erro_geral)
+                return None
+
+            await asyncio.sleep(self._tempo_espera_retentativa(tentativa))
+            tentativa += 1
+
+    async def _conectar_async(
+        self,
+        ctx: ssl.SSLContext,
+        erros_msgs: Dict[int, List[str]]
+    ) -> Tuple[ConexaoSMTPAsync, Exception]:
+        """
+        Equivalente assíncrono do método "_conectar" (retorna None e a exceção ocorrida, em caso de erro, registrando o erro geral correspondente).
+        """
+
+        conexao = ConexaoSMTPAsync(self.smtp_host, self.smtp_port)
+        fase = FASE_CONEXAO
+        inicio = time.perf_counter()
+        try:
+            if self.crypt_method is not None and self.crypt_method == CryptMethod.SSL_OR_TLS:
+                await conexao.conectar(ctx)
+            else:
+                await conexao.conectar()
+
+            await conexao.ehlo()
+            self._emitir(FASE_CONEXAO, None, inicio)
+
+            if self.crypt_method is not None and self.crypt_method == CryptMethod.START_TLS:
+                fase = FASE_STARTTLS
+                inicio = time.perf_counter()
+                await conexao.starttls(ctx)
+                self._emitir(FASE_STARTTLS, None, inicio)
+        except Exception as e:
+            await conexao.fechar()
+            self._emitir(fase, None, inicio, erro=str(e))
+            self._registrar_erro_geral(
+                erros_msgs, f"Erro estabelecendo conexão com o servidor. Verifique dados de conexão e criptografia. Mensagem original do erro: {e}")
+            return None, e
+
+        # Autenticando
+        inicio = time.perf_counter()
+        try:
+            code, _ = await conexao.login(self.smtp_user, self.smtp_pass)
+            self._emitir(FASE_LOGIN, None, inicio, codigo_resposta=code)
+        except Exception as e:
+            await conexao.quit()
+            self._emitir(FASE_LOGIN, None, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=str(e))
+            self._registrar_erro_geral(
+                erros_msgs, f"Erro de autenticação com o servidor de e-mail. Verifique o usuário e senha passados. Mensagem original do erro: {e}")
+            return None, e
+
+        # O tamanho máximo anunciado pelo servidor só é usado pela política de anexos (ver "_registrar_conexao")
+        if self.politica_anexos is not None:
+            from mail_sender_util.anexos import tamanho_maximo_anunciado
+            self._tamanho_maximo_servidor = tamanho_maximo_anunciado(conexao.esmtp_features)
+
+        return conexao, None
+
@@ -0,0 +1,164 @@
+import base64
+import io
+import os
+import threading
+
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+class EntradaCacheMime:
+    """
+    Conteúdo de um arquivo já codificado em base64 (em linhas de 76 caracteres, terminadas em CRLF).
+
+    O atributo "cabecalho" guarda os primeiros 32 bytes originais do arquivo (usados na identificação do tipo das imagens).
+    """
+
+    __slots__ = ('conteudo', 'cabecalho')
+
+    conteudo: bytes
+    cabecalho: bytes
+
+    def __init__(self, conteudo: bytes, cabecalho: bytes):
+        self.conteudo = conteudo
+        self.cabecalho = cabecalho
+
+
+class CacheMime:
+    """
+    Cache, em memória, das imagens e anexos já codificados em base64, compartilhado entre as mensagens de um
+    ou mais lotes (evitando ler e codificar repetidamente o mesmo arquivo).
+
+    As entradas são identificadas pelo path, data de modificação e tamanho do arquivo (de modo que um arquivo
+    alterado em disco não é servido a partir do cache), e pelo nome no zip, no caso dos arquivos compactados. Ao atingir o tamanho máximo, as entradas usadas há mais
+    tempo são descartadas (LRU).
+
+    :tamanho_maximo: Tamanho máximo (em bytes) ocupado pelo conteúdo codificado das entradas do cache
+    """
+
+    tamanho_maximo: int
+    tamanho_atual: int
+    acertos: int
+    falhas: int
+    descartes: int
+
+    def __init__(self, tamanho_maximo: int = 64 * 1024 * 1024):
+        self.tamanho_maximo = tamanho_maximo
+        self.tamanho_atual = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, path: str, nome_compactado: str = None) -> EntradaCacheMime:
+        """
+        Retorna o conteúdo codificado do arquivo, lendo-o do disco, se necessário.
+
+        Caso o parâmetro "nome_compactado" seja passado, retorna o arquivo compactado num zip (onde o arquivo
+        recebe o nome indicado; ver compactar_arquivo).
+
+        Retorna None se o arquivo não couber no cache (caso em que deve ser lido diretamente pelo chamador).
+        As exceções de acesso ao arquivo (FileNotFoundError e etc) são propagadas.
+        """
+
+        stat = os.stat(path)
+        chave = (path, stat.st_mtime_ns, stat.st_size, nome_compactado)
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada
+
+            self.falhas += 1
+
+        # Importado apenas na leitura (o módulo mime_stream carrega o pacote email.mime)
+        from mail_sender_util.mime_stream import tamanho_base64
+
+        # Arquivos que, codificados, excedem o tamanho do cache, não são armazenados
+        if tamanho_base64(stat.st_size) > self.tamanho_maximo:
+            return None
+
+        if nome_compactado is not None:
+            entrada = compactar_arquivo(path, nome_compactado)
+        else:
+            entrada = codificar_arquivo(path)
+
+        with self._lock:
+            if not chave in self._entradas:
+                self._entradas[chave] = entrada
+                self.tamanho_atual += len(entrada.conteudo)
+
+                while self.tamanho_atual > self.tamanho_maximo:
+                    _, descartada = self._entradas.popitem(last=False)
+                    self.tamanho_atual -= len(descartada.conteudo)
+                    self.descartes += 1
+
+        return entrada
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'descartes': self.descartes,
+                'entradas': len(self._entradas),
+                'tamanho_atual': self.tamanho_atual,
+                'tamanho_maximo': self.tamanho_maximo
+            }
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self.tamanho_atual = 0
+
+
+def codificar_arquivo(path: str) -> EntradaCacheMime:
+    """
+    Lê e codifica o arquivo em base64 (sem passar pelo cache).
+    """
+
+    from mail_sender_util.mime_stream import TAMANHO_BLOCO_ARQUIVO
+
+    blocos = []
+    cabecalho = b''
+    with open(path, 'rb') as file:
+        while True:
+            bloco = file.read(TAMANHO_BLOCO_ARQUIVO)
+            if not bloco:
+                break
+
+            if len(blocos) == 0:
+                cabecalho = bloco[:32]
+            blocos.append(base64.encodebytes(bloco).replace(b'\n', b'\r\n'))
+
+    return EntradaCacheMime(b''.join(blocos), cabecalho)
+
+
+def compactar_arquivo(path: str, nome: str) -> EntradaCacheMime:
+    """
+    Compacta o arquivo num zip (em memória, contendo apenas o arquivo, com o nome indicado), e codifica o zip
+    em base64 (sem passar pelo cache).
+
+    O arquivo é lido em blocos, de modo que apenas o conteúdo compactado é mantido em memória.
+    """
+
+    # Importado apenas quando usada a compactação (reduzindo o tempo de inicialização do utilitário)
+    import zipfile
+
+    from mail_sender_util.mime_stream import TAMANHO_BLOCO_ARQUIVO
+
+    with io.BytesIO() as buffer:
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            with open(path, 'rb') as file, arquivo_zip.open(nome, 'w', force_zip64=True) as destino:
+                while True:
+                    bloco = file.read(TAMANHO_BLOCO_ARQUIVO)
+                    if not bloco:
+                        break
+                    destino.write(bloco)
+
+        conteudo = buffer.getvalue()
+
+    return EntradaCacheMime(base64.encodebytes(conteudo).replace(b'\n', b'\r\n'), conteudo[:32])
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+
+from email.mime.multipart import MIMEMultipart
+from mail_sender_util.mail import Mail
+from mail_sender_util.mime_stream import TAMANHO_BLOCO_ARQUIVO, serializar
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+# Situações das mensagens na caixa de saída
+SITUACAO_PENDENTE = 'pendente'
+SITUACAO_ENVIADA = 'enviada'
+SITUACAO_ERRO = 'erro'
+
+ARQUIVO_ESTADO = 'caixa_saida.db'
+
+
+class MensagemCaixaSaida:
+    """
+    Mensagem já composta e serializada num arquivo da caixa de saída (enviada sem nova composição).
+    """
+
+    __slots__ = ('remetente', 'destinatarios', 'path')
+
+    remetente: str
+    destinatarios: List[str]
+    path: str
+
+    def __init__(self, remetente: str, destinatarios: List[str], path: str):
+        self.remetente = remetente
+        self.destinatarios = destinatarios
+        self.path = path
+
+    def serializar(self) -> Tuple[str, List[str], Iterator[bytes]]:
+        """
+        Retorna o envelope e o conteúdo da mensagem, no mesmo formato da função mime_stream.serializar.
+        """
+
+        return self.remetente, self.destinatarios, self._iter_blocos()
+
+    def tamanho(self) -> int:
+        """
+        Retorna o tamanho do conteúdo da mensagem (o tamanho do arquivo).
+        """
+
+        return os.path.getsize(self.path)
+
+    def _iter_blocos(self) -> Iterator[bytes]:
+        # Cada bloco termina numa quebra de linha (de modo que o bloco seguinte se inicie no começo de uma linha)
+        with open(self.path, 'rb') as file:
+            resto = b''
+            while True:
+                bloco = file.read(TAMANHO_BLOCO_ARQUIVO)
+                if not bloco:
+                    break
+
+                bloco = resto + bloco
+                fim = bloco.rfind(b'\n') + 1
+                if fim > 0:
+                    yield bloco[:fim]
+                resto = bloco[fim:]
+
+            if resto:
+                yield resto
+
+
+class CaixaSaida:
+    """
+    Caixa de saída em disco, que guarda as mensagens compostas de um lote (já serializadas, em arquivos ".eml"),
+    e a situação de envio de cada uma (num banco SQLite no mesmo diretório), permitindo retomar um lote interrompido
+    sem reenviar as mensagens já entregues, nem compor novamente as mensagens pendentes.
+
+    As mensagens são identificadas pelo índice no lote, e por uma assinatura do conteúdo de entrada (de modo que,
+    caso a entrada de um índice seja alterada, a mensagem é composta e enviada novamente). Os arquivos das mensagens
+    são removidos assim que as mesmas são enviadas.
+
+    Obs.: Caso o processo seja interrompido entre a aceitação de uma mensagem pelo servidor e o registro do envio,
+    a mensagem é reenviada ao retomar o lote.
+
+    :diretorio: Diretório da caixa de saída (criado, caso não exista)
+    :retomar: Indica se a situação de um lote anterior, guardada no diretório, deve ser mantida (por padrão, a caixa de saída é esvaziada)
+    """
+
+    diretorio: str
+    retomar: bool
+
+    def __init__(self, diretorio: str, retomar: bool = False):
+        # Importado apenas quando usada a caixa de saída (reduzindo o tempo de inicialização do utilitário)
+        import sqlite3
+
+        self.diretorio = diretorio
+        self.retomar = retomar
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(
+            os.path.join(diretorio, ARQUIVO_ESTADO), timeout=30, check_same_thread=False, isolation_level=None)
+
+        # WAL: a situação registrada sobrevive à interrupção do processo, sem o custo de um fsync por mensagem
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('PRAGMA synchronous=NORMAL')
+        self._conexao.execute(
+            'CREATE TABLE IF NOT EXISTS mensagens ('
+            'indice INTEGER PRIMARY KEY, assinatura TEXT NOT NULL, remetente TEXT NOT NULL, '
+            'destinatarios TEXT NOT NULL, situacao TEXT NOT NULL, erros TEXT)')
+
+        if not retomar:
+            self.limpar()
+
+    def obter(self, indice: int, mail_msg: Union[Mail, Dict[str, Any]]) -> Tuple[str, MensagemCaixaSaida]:
+        """
+        Retorna a situação e a mensagem guardada para o índice, caso corresponda à entrada "mail_msg"
+        (ou (None, None), caso a mensagem deva ser composta).
+        """
+
+        with self._lock:
+            registro = self._conexao.execute(
+                'SELECT assinatura, remetente, destinatarios, situacao FROM mensagens WHERE indice = ?', (indice,)).fetchone()
+
+        if registro is None or registro[0] != assinatura(mail_msg):
+            return None, None
+
+        if registro[3] == SITUACAO_ENVIADA:
+            return SITUACAO_ENVIADA, None
+
+        path = self._path_mensagem(indice)
+        if not os.path.exists(path):
+            return None, None
+
+        return registro[3], MensagemCaixaSaida(registro[1], json.loads(registro[2]), path)
+
+    def guardar(self, indice: int, mail_msg: Union[Mail, Dict[str, Any]], msg: MIMEMultipart) -> MensagemCaixaSaida:
+        """
+        Serializa a mensagem composta no arquivo do índice, registrando-a como pendente de envio.
+        """
+
+        remetente, destinatarios, blocos = serializar(msg)
+
+        path = self._path_mensagem(indice)
+        with open(path, 'wb') as file:
+            for bloco in blocos:
+                file.write(bloco)
+
+        # O registro é feito apenas após o arquivo completo (uma interrupção durante a escrita resulta em nova composição)
+        with self._lock:
+            self._conexao.execute(
+                'INSERT OR REPLACE INTO mensagens (indice, assinatura, remetente, destinatarios, situacao, erros) '
+                'VALUES (?, ?, ?, ?, ?, NULL)',
+                (indice, assinatura(mail_msg), remetente, json.dumps(destinatarios), SITUACAO_PENDENTE))
+
+        return MensagemCaixaSaida(remetente, destinatarios, path)
+
+    def registrar_envio(self, indice: int, erros: List[str] = None) -> None:
+        """
+        Registra o resultado do envio da mensagem do índice (enviada, caso não haja erros), removendo o arquivo
+        das mensagens enviadas.
+        """
+
+        situacao = SITUACAO_ENVIADA if not erros else SITUACAO_ERRO
+        with self._lock:
+            self._conexao.execute(
+                'UPDATE mensagens SET situacao = ?, erros = ? WHERE indice = ?',
+                (situacao, json.dumps(erros) if erros else None, indice))
+
+        if situacao == SITUACAO_ENVIADA:
+            try:
+                os.remove(self._path_mensagem(indice))
+            except FileNotFoundError:
+                pass
+
+    def situacoes(self) -> Dict[str, int]:
+        """
+        Retorna a quantidade de mensagens em cada situação.
+        """
+
+        with self._lock:
+            return dict(self._conexao.execute('SELECT situacao, COUNT(*) FROM mensagens GROUP BY situacao').fetchall())
+
+    def limpar(self) -> None:
+        """
+        Esvazia a caixa de saída (removendo os arquivos e a situação de todas as mensagens).
+        """
+
+        with self._lock:
+            self._conexao.execute('DELETE FROM mensagens')
+
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.eml'):
+                os.remove(os.path.join(self.diretorio, nome))
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._conexao.close()
+
+    def _path_mensagem(self, indice: int) -> str:
+        return os.path.join(self.diretorio, f'{indice}.eml')
+
+
+def assinatura(mail_msg: Union[Mail, Dict[str, Any]]) -> str:
+    """
+    Calcula a assinatura (hash) dos parâmetros de entrada de um e-mail (a mesma, seja o e-mail um Mail ou um dicionário).
+    """
+
+    if isinstance(mail_msg, Mail):
+        mail_msg = mail_msg.para_dict()
+
+    conteudo = json.dumps(mail_msg, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
@@ -2,4 +2,13 @@ class TLSVersionMissingExcpetion(Exception):
     pass
 
 class ParametrosGeraisIncorretosException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class TLSVersionNaoSuportadaException(Exception):
+    pass
+
+class MensagemExcedeTamanhoException(Exception):
+    pass
+
+class RotaNaoEncontradaException(Exception):
+    pass
@@ -0,0 +1,132 @@
+import os
+import struct
+import threading
+import time
+
+from typing import Callable
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Estado do limitador compartilhado: tokens disponíveis e instante (time.time) da última atualização
+_FORMATO_ESTADO = '<dd'
+_TAMANHO_ESTADO = struct.calcsize(_FORMATO_ESTADO)
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa do tipo "token bucket": a cada segundo, "taxa" tokens são acumulados, até o limite de
+    "capacidade" tokens (que define a rajada máxima, após um período ocioso).
+
+    Cada envio reserva os tokens necessários, ainda que não disponíveis (o saldo fica negativo), e recebe o tempo
+    que deve aguardar antes de prosseguir. Assim, os envios são espaçados na taxa configurada, na ordem das reservas,
+    mesmo quando a quantidade reservada excede a capacidade (exemplo: mensagem com muitos destinatários).
+
+    :taxa: Quantidade de tokens acumulados por segundo
+    :capacidade: Quantidade máxima de tokens acumulados (padrão: a taxa de um segundo, e no mínimo 1)
+    :relogio: Função que retorna o instante atual, em segundos (padrão: time.monotonic; substituível nos testes)
+    """
+
+    taxa: float
+    capacidade: float
+
+    def __init__(self, taxa: float, capacidade: float = None, relogio: Callable[[], float] = time.monotonic):
+        if taxa <= 0:
+            raise ValueError(f'Taxa inválida para o limitador: {taxa}')
+
+        self.taxa = taxa
+        self.capacidade = capacidade if capacidade is not None else max(1.0, taxa)
+        self._relogio = relogio
+        self._tokens = self.capacidade
+        self._atualizacao = relogio()
+        self._lock = threading.Lock()
+
+    def reservar(self, quantidade: float = 1) -> float:
+        """
+        Reserva a quantidade de tokens, retornando o tempo (em segundos) a aguardar antes de usá-los.
+        """
+
+        with self._lock:
+            agora = self._relogio()
+            self._tokens, espera = self._consumir(self._tokens, self._atualizacao, agora, quantidade)
+            self._atualizacao = agora
+
+        return espera
+
+    def aguardar(self, quantidade: float = 1) -> None:
+        """
+        Reserva a quantidade de tokens, aguardando até que possam ser usados.
+        """
+
+        espera = self.reservar(quantidade)
+        if espera > 0:
+            time.sleep(espera)
+
+    def _consumir(self, tokens: float, atualizacao: float, agora: float, quantidade: float):
+        tokens = min(self.capacidade, tokens + max(0.0, agora - atualizacao) * self.taxa) - quantidade
+        espera = -tokens / self.taxa if tokens < 0 else 0.0
+        return tokens, espera
+
+
+class LimitadorTaxaArquivo(LimitadorTaxa):
+    """
+    Limitador de taxa (ver LimitadorTaxa), cujo saldo de tokens é guardado num arquivo local, e compartilhado entre
+    todos os processos que usem o mesmo arquivo (inclusive execuções distintas do utilitário).
+
+    O acesso ao arquivo é serializado por meio de trava exclusiva do sistema operacional (fcntl no Linux, e msvcrt
+    no Windows). Os processos devem usar a mesma taxa e capacidade.
+
+    :path: Path do arquivo de estado do limitador (criado, caso não exista)
+    :relogio: Função que retorna o instante atual, em segundos (padrão: time.time, comum a todos os processos)
+    """
+
+    path: str
+
+    def __init__(self, path: str, taxa: float, capacidade: float = None, relogio: Callable[[], float] = time.time):
+        super().__init__(taxa, capacidade, relogio)
+        self.path = path
+
+    def reservar(self, quantidade: float = 1) -> float:
+        # A trava do arquivo não distingue as threads do mesmo processo (daí a trava adicional)
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o666)
+            try:
+                _travar(fd)
+                try:
+                    dados = os.read(fd, _TAMANHO_ESTADO)
+                    agora = self._relogio()
+                    if len(dados) == _TAMANHO_ESTADO:
+                        tokens, atualizacao = struct.unpack(_FORMATO_ESTADO, dados)
+                    else:
+                        tokens, atualizacao = self.capacidade, agora
+
+                    tokens, espera = self._consumir(tokens, atualizacao, agora, quantidade)
+
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, struct.pack(_FORMATO_ESTADO, tokens, agora))
+                finally:
+                    _destravar(fd)
+            finally:
+                os.close(fd)
+
+        return espera
+
+
+def _travar(fd: int) -> None:
+    if os.name == 'nt':
+        os.lseek(fd, 0, os.SEEK_SET)
+        # LK_LOCK repete a tentativa por até 10 segundos, antes de falhar
+        msvcrt.locking(fd, msvcrt.LK_LOCK, _TAMANHO_ESTADO)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    os.lseek(fd, 0, os.SEEK_SET)
+
+
+def _destravar(fd: int) -> None:
+    if os.name == 'nt':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, _TAMANHO_ESTADO)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
@@ -0,0 +1,159 @@
+from typing import Any, Dict, List, Tuple
+
+
+class Imagem:
+    """
+    Imagem enviada como parte do corpo da mensagem.
+
+    :id: ID da imagem (referido no HTML, por uma tag img similar a: <img src="cid:image1">)
+    :path: Path em disco da imagem
+    """
+
+    __slots__ = ('id', 'path')
+
+    id: str
+    path: str
+
+    def __init__(self, id: str, path: str):
+        self.id = id
+        self.path = path
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'path': self.path}
+
+
+class Anexo:
+    """
+    Arquivo anexado à mensagem.
+
+    :file_name: Nome do arquivo a ser exibido no e-mail
+    :path: Path em disco do anexo
+    """
+
+    __slots__ = ('file_name', 'path')
+
+    file_name: str
+    path: str
+
+    def __init__(self, file_name: str, path: str):
+        self.file_name = file_name
+        self.path = path
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {'file_name': self.file_name, 'path': self.path}
+
+
+class Mail:
+    """
+    Parâmetros de um e-mail (no mesmo formato dos dicionários aceitos pelo método "enviar_lista" do MailSender),
+    guardados em atributos fixos (sem o custo de um dicionário por mensagem, nos lotes grandes).
+
+    Os parâmetros opcionais não informados ficam como None. O parâmetro "rota" indica o servidor pelo qual o e-mail
+    deve ser enviado, quando enviado por um RoteadorMailSender.
+    """
+
+    __slots__ = ('assunto', 'remetente', 'destinatarios', 'msg_html', 'dest_copia', 'dest_copia_oculta', 'imagens', 'anexos', 'rota')
+
+    assunto: str
+    remetente: str
+    destinatarios: List[str]
+    msg_html: str
+    dest_copia: List[str]
+    dest_copia_oculta: List[str]
+    imagens: List[Imagem]
+    anexos: List[Anexo]
+    rota: str
+
+    def __init__(
+        self,
+        assunto: str,
+        remetente: str,
+        destinatarios: List[str],
+        msg_html: str,
+        dest_copia: List[str] = None,
+        dest_copia_oculta: List[str] = None,
+        imagens: List[Imagem] = None,
+        anexos: List[Anexo] = None,
+        rota: str = None
+    ):
+        self.assunto = assunto
+        self.remetente = remetente
+        self.destinatarios = destinatarios
+        self.msg_html = msg_html
+        self.dest_copia = dest_copia
+        self.dest_copia_oculta = dest_copia_oculta
+        self.imagens = imagens
+        self.anexos = anexos
+        self.rota = rota
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any], arquivos: Dict[Tuple[str, str, str], Any] = None) -> 'Mail':
+        """
+        Constrói o e-mail a partir do dicionário de entrada (exemplo: um item do parâmetro "emails" do JSON).
+
+        Lança KeyError caso falte algum parâmetro obrigatório.
+
+        O dicionário "arquivos", se passado, guarda as imagens e anexos já construídos, de modo que os arquivos
+        repetidos entre as mensagens sejam representados por uma única instância.
+        """
+
+        imagens = None
+        if 'imagens' in dados:
+            imagens = [_obter_arquivo(arquivos, Imagem, imagem['id'], imagem['path']) for imagem in dados['imagens']]
+
+        anexos = None
+        if 'anexos' in dados:
+            anexos = [_obter_arquivo(arquivos, Anexo, anexo['file_name'], anexo['path']) for anexo in dados['anexos']]
+
+        return cls(
+            dados['assunto'],
+            dados['remetente'],
+            dados['destinatarios'],
+            dados['msg_html'],
+            dados.get('dest_copia'),
+            dados.get('dest_copia_oculta'),
+            imagens,
+            anexos,
+            dados.get('rota')
+        )
+
+    def para_dict(self) -> Dict[str, Any]:
+        """
+        Retorna o e-mail no formato de dicionário (omitindo os parâmetros opcionais não informados).
+        """
+
+        dados = {
+            'assunto': self.assunto,
+            'remetente': self.remetente,
+            'destinatarios': self.destinatarios,
+            'msg_html': self.msg_html
+        }
+
+        if self.dest_copia is not None:
+            dados['dest_copia'] = self.dest_copia
+
+        if self.dest_copia_oculta is not None:
+            dados['dest_copia_oculta'] = self.dest_copia_oculta
+
+        if self.imagens is not None:
+            dados['imagens'] = [imagem.para_dict() for imagem in self.imagens]
+
+        if self.anexos is not None:
+            dados['anexos'] = [anexo.para_dict() for anexo in self.anexos]
+
+        if self.rota is not None:
+            dados['rota'] = self.rota
+
+        return dados
+
+
+def _obter_arquivo(arquivos: Dict[Tuple[str, str, str], Any], classe: type, nome: str, path: str) -> Any:
+    if arquivos is None:
+        return classe(nome, path)
+
+    chave = (classe.__name__, nome, path)
+    arquivo = arquivos.get(chave)
+    if arquivo is None:
+        arquivo = arquivos[chave] = classe(nome, path)
+
+    return arquivo
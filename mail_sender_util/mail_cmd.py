@@ -1,11 +1,39 @@
 import argparse
 import base64
+import io
+import json
+import os
+import stat
 import sys
+import threading
 
+from mail_sender_util.cache_mime import CacheMime
+from mail_sender_util.mail import Mail
 from mail_sender_util.mail_sender import CryptMethod, MailSender, TLSVersion
 from mail_sender_util.exception import TLSVersionMissingExcpetion, ParametrosGeraisIncorretosException
-from nsj_gcf_utils import json_util
-from typing import Any, Dict, List
+from email.utils import formataddr, getaddresses
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple
+
+# Os módulos das funcionalidades opcionais (roteamento, caixa de saída, política de anexos e métricas) são
+# importados apenas quando usados, reduzindo o tempo de inicialização de cada execução
+if TYPE_CHECKING:
+    from mail_sender_util.caixa_saida import CaixaSaida
+    from mail_sender_util.metricas import AgregadorMetricas, ObservadorEnvio
+    from mail_sender_util.roteador import RoteadorMailSender
+
+TAMANHO_CACHE_MIME_PADRAO = 64 * 1024 * 1024
+PORTA_DAEMON_PADRAO = 8025
+TEMPO_OCIOSO_PADRAO = 60.0
+ARQUIVO_TOKEN_PADRAO = os.path.join('~', '.mail_sender_util', 'daemon.token')
+
+CHAVES_DESTINATARIOS = ['destinatarios', 'dest_copia', 'dest_copia_oculta']
+
+PARAMETROS_POLITICA_ANEXOS_BOOL = ['detectar_tipo_mime', 'compactar', 'verificar_tamanho', 'dividir_mensagens']
+
+PARAMETROS_OBRIGATORIOS_CONEXAO = ['host', 'port', 'user', 'password', 'crypt_method']
+
+# Parâmetros da entrada que não são repassados às rotas (ver função "parametros_rota")
+CHAVES_ENVIO = ['rotas', 'dominios', 'rota_padrao', 'emails', 'mala_direta', 'modelo', 'caixa_saida']
 
 
 def formata_erros(erros_msg: Dict[int, List[str]]):
@@ -18,16 +46,100 @@ def formata_erros(erros_msg: Dict[int, List[str]]):
     if len(erros_msg) > 0:
         erros['erros_mensagens'] = erros_msg
 
-    return json_util.json_dumps(erros)
+    return json_dumps(erros)
+
+
+def json_dumps(valor: Any) -> str:
+    # Mantendo os caracteres não ASCII (tal qual o formato de saída anterior, do nsj_gcf_utils)
+    return json.dumps(valor, ensure_ascii=False)
+
+
+def json_loads(valor: str) -> Any:
+    return json.loads(valor)
 
 
 def validar_entrada(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]]):
+    """
+    Valida a entrada completa (numa única passagem, antes de qualquer conexão), registrando todos os erros
+    encontrados em cada mensagem.
+
+    Além dos parâmetros obrigatórios, os endereços de e-mail são interpretados (e os destinatários repetidos
+    de cada mensagem são removidos da entrada), e os arquivos das imagens e anexos são verificados (uma única
+    vez por path). Os e-mails válidos são convertidos em instâncias de Mail (na própria entrada).
+    """
+
     # Validando parâmetros de conexão
-    pars = ['host', 'port', 'user', 'password', 'crypt_method', 'emails']
+    validar_parametros_conexao(entrada, erros_msg)
+
+    # Validando parâmetros das mensagens (ou da mala direta)
+    arquivos = {}
+    if 'mala_direta' in entrada:
+        validar_mala_direta(entrada['mala_direta'], erros_msg, arquivos)
+        return
+
+    if not('emails' in entrada):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append('Faltando parâmetro: emails')
+        return
+
+    emails = entrada['emails']
+    partes = {}
+    for i in range(0, len(emails)):
+        validar_email(i, emails[i], erros_msg, arquivos)
+
+        # Os e-mails com erros são mantidos como recebidos (sendo apenas pulados no envio)
+        if not i in erros_msg:
+            emails[i] = Mail.de_dict(emails[i], partes)
+
+
+def validar_mala_direta(mala_direta: Dict[str, Any], erros_msg: Dict[int, List[str]], arquivos: Dict[str, Exception] = None):
+    for par in ['modelo', 'destinos']:
+        if not par in mala_direta:
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(f'Faltando parâmetro na mala direta: {par}')
+
+    if -1 in erros_msg:
+        return
+
+    validar_modelo(mala_direta['modelo'], erros_msg, arquivos)
+
+    for i in range(0, len(mala_direta['destinos'])):
+        validar_destino(i, mala_direta['destinos'][i], mala_direta['modelo'], erros_msg)
+
+
+def validar_modelo(modelo: Dict[str, Any], erros_msg: Dict[int, List[str]], arquivos: Dict[str, Exception] = None):
+    pars = ['assunto', 'remetente', 'msg_html']
     for par in pars:
-        if not par in entrada:
+        if not par in modelo:
             erros = erros_msg.setdefault(-1, [])
-            erros.append(f'Faltando parâmetro: {par}')
+            erros.append(
+                f'Faltando parâmetro no modelo da mala direta: {par}')
+
+    # Os erros do modelo afetam todas as mensagens (sendo registrados como erros gerais)
+    validar_enderecos(-1, modelo, erros_msg)
+    validar_arquivos(-1, modelo, erros_msg, arquivos)
+
+
+def validar_destino(i: int, destino: Dict[str, Any], modelo: Dict[str, Any], erros_msg: Dict[int, List[str]]):
+    if not 'destinatarios' in destino and not 'destinatarios' in modelo:
+        erros = erros_msg.setdefault(i, [])
+        erros.append(
+            'Faltando parâmetro: destinatarios')
+
+    # Os destinatários vazios (após a remoção dos repetidos) são mantidos, pois substituem os do modelo
+    validar_enderecos(i, destino, erros_msg, remover_vazios=False)
+
+
+def validar_parametros_conexao(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]], obrigatorios: bool = True):
+    # Com o parâmetro "rotas", os parâmetros obrigatórios são verificados em cada rota (e os demais
+    # parâmetros da entrada valem como padrão para todas as rotas)
+    if 'rotas' in entrada:
+        validar_rotas(entrada, erros_msg)
+    elif obrigatorios:
+        for par in PARAMETROS_OBRIGATORIOS_CONEXAO:
+            if not par in entrada:
+                erros = erros_msg.setdefault(-1, [])
+                erros.append(f'Faltando parâmetro: {par}')
 
     if 'crypt_method' in entrada:
         try:
@@ -45,23 +157,439 @@ def validar_entrada(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]]):
             erros.append(
                 f"Parâmetro tls_version inválido: {entrada.get('tls_version')}")
 
-    # Validando parâmetros das mensagens
-    if not('emails' in entrada):
+    for par in ['conexoes', 'processos', 'max_msgs_por_conexao', 'max_tentativas']:
+        if par in entrada and (not isinstance(entrada[par], int) or entrada[par] < 1):
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(
+                f"Parâmetro {par} inválido: {entrada.get(par)}")
+
+    if 'tamanho_cache_mime' in entrada and (not isinstance(entrada['tamanho_cache_mime'], int) or entrada['tamanho_cache_mime'] < 0):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro tamanho_cache_mime inválido: {entrada.get('tamanho_cache_mime')}")
+
+    if 'max_retentativas_lote' in entrada and (not isinstance(entrada['max_retentativas_lote'], int) or entrada['max_retentativas_lote'] < 0):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro max_retentativas_lote inválido: {entrada.get('max_retentativas_lote')}")
+
+    for par in ['limite_msgs_por_segundo', 'limite_destinatarios_por_segundo']:
+        if par in entrada and (not isinstance(entrada[par], (int, float)) or entrada[par] <= 0):
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(
+                f"Parâmetro {par} inválido: {entrada.get(par)}")
+
+    if 'tempo_espera_tentativa' in entrada and (not isinstance(entrada['tempo_espera_tentativa'], (int, float)) or entrada['tempo_espera_tentativa'] < 0):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro tempo_espera_tentativa inválido: {entrada.get('tempo_espera_tentativa')}")
+
+    for par in ['caixa_saida', 'arquivo_limite']:
+        if par in entrada and (not isinstance(entrada[par], str) or entrada[par] == ''):
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(
+                f"Parâmetro {par} inválido: {entrada.get(par)}")
+
+    if 'politica_anexos' in entrada:
+        validar_politica_anexos(entrada['politica_anexos'], erros_msg)
+
+
+def validar_rotas(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]]):
+    rotas = entrada['rotas']
+    if not isinstance(rotas, dict) or len(rotas) <= 0 or not all(isinstance(rota, dict) for rota in rotas.values()):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(f"Parâmetro rotas inválido: {rotas}")
         return
 
-    for i in range(0, len(entrada['emails'])):
-        email = entrada['emails'][i]
+    from mail_sender_util.roteador import nome_rota_valido
+
+    for nome, rota in rotas.items():
+        if not nome_rota_valido(nome):
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(f'Nome de rota inválido (não pode conter separadores de diretório): {nome}')
+            continue
+
+        erros_rota = {}
+        for par in rota:
+            if par in CHAVES_ENVIO:
+                erros = erros_rota.setdefault(-1, [])
+                erros.append(f'Parâmetro não permitido na rota: {par}')
+
+        parametros = parametros_rota(entrada, nome)
+        for par in PARAMETROS_OBRIGATORIOS_CONEXAO:
+            if not par in parametros:
+                erros = erros_rota.setdefault(-1, [])
+                erros.append(f'Faltando parâmetro: {par}')
+
+        # Os valores padrão (da própria entrada) já são validados na entrada
+        if not -1 in erros_rota:
+            validar_parametros_conexao(rota, erros_rota, obrigatorios=False)
+
+        if -1 in erros_rota:
+            erros = erros_msg.setdefault(-1, [])
+            erros.extend(f'Rota "{nome}": {erro}' for erro in erros_rota[-1])
+
+    dominios = entrada.get('dominios', {})
+    if not isinstance(dominios, dict) or not all(isinstance(dominio, str) for dominio in dominios):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(f"Parâmetro dominios inválido: {dominios}")
+    else:
+        for dominio, rota in dominios.items():
+            if not isinstance(rota, str) or not rota in rotas:
+                erros = erros_msg.setdefault(-1, [])
+                erros.append(f'Rota não configurada para o domínio {dominio}: {rota}')
+
+    if 'rota_padrao' in entrada and (not isinstance(entrada['rota_padrao'], str) or not entrada['rota_padrao'] in rotas):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(f"Parâmetro rota_padrao inválido: {entrada.get('rota_padrao')}")
+
+
+def validar_politica_anexos(politica: Dict[str, Any], erros_msg: Dict[int, List[str]]):
+    if not isinstance(politica, dict):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(f"Parâmetro politica_anexos inválido: {politica}")
+        return
+
+    for par in politica:
+        if not par in PARAMETROS_POLITICA_ANEXOS_BOOL + ['tamanho_minimo_compactacao', 'tamanho_maximo', 'extensoes_nao_compactadas']:
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(f"Parâmetro desconhecido em politica_anexos: {par}")
+
+    for par in PARAMETROS_POLITICA_ANEXOS_BOOL:
+        if par in politica and not isinstance(politica[par], bool):
+            erros = erros_msg.setdefault(-1, [])
+            erros.append(f"Parâmetro politica_anexos.{par} inválido: {politica.get(par)}")
+
+    if 'tamanho_minimo_compactacao' in politica and (not isinstance(politica['tamanho_minimo_compactacao'], int) or politica['tamanho_minimo_compactacao'] < 0):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro politica_anexos.tamanho_minimo_compactacao inválido: {politica.get('tamanho_minimo_compactacao')}")
+
+    if 'tamanho_maximo' in politica and (not isinstance(politica['tamanho_maximo'], int) or politica['tamanho_maximo'] < 1):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro politica_anexos.tamanho_maximo inválido: {politica.get('tamanho_maximo')}")
+
+    extensoes = politica.get('extensoes_nao_compactadas', [])
+    if not isinstance(extensoes, list) or not all(isinstance(extensao, str) for extensao in extensoes):
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Parâmetro politica_anexos.extensoes_nao_compactadas inválido: {extensoes}")
+
+
+def validar_email(i: int, email: Dict[str, Any], erros_msg: Dict[int, List[str]], arquivos: Dict[str, Exception] = None):
+    pars = ['assunto', 'remetente', 'destinatarios', 'msg_html']
+    for par in pars:
+        if not par in email:
+            erros = erros_msg.setdefault(i, [])
+            erros.append(
+                f'Faltando parâmetro: {par}')
+
+    if 'rota' in email and not isinstance(email['rota'], str):
+        erros = erros_msg.setdefault(i, [])
+        erros.append(
+            f"Parâmetro rota inválido: {email.get('rota')}")
+
+    validar_enderecos(i, email, erros_msg)
+    validar_arquivos(i, email, erros_msg, arquivos)
+
+
+def validar_enderecos(i: int, email: Dict[str, Any], erros_msg: Dict[int, List[str]], remover_vazios: bool = True):
+    """
+    Valida o remetente e os destinatários do e-mail (ou do modelo/destino da mala direta), removendo os
+    destinatários repetidos (inclusive entre cópias e cópias ocultas, mantendo a primeira ocorrência).
+
+    Cada item das listas de destinatários pode conter mais de um endereço (separados por vírgula ou ponto e vírgula),
+    validados individualmente e desmembrados em um item por endereço. Os itens com um único endereço são mantidos
+    tal qual informados (apenas sem espaços nas extremidades), e os endereços são comparados sem distinção de
+    maiúsculas e minúsculas. As listas que ficam vazias são removidas do e-mail (caso
+    "remover_vazios").
+    """
 
-        pars = ['assunto', 'remetente', 'destinatarios', 'msg_html']
-        for par in pars:
-            if not par in email:
+    if 'remetente' in email:
+        try:
+            analisar_endereco(email['remetente'])
+        except ValueError as e:
+            erros = erros_msg.setdefault(i, [])
+            erros.append(f'Parâmetro remetente inválido: {e}')
+
+    vistos = set()
+    for chave in CHAVES_DESTINATARIOS:
+        if not chave in email:
+            continue
+
+        valor = email[chave]
+        if not isinstance(valor, list):
+            erros = erros_msg.setdefault(i, [])
+            erros.append(f'Parâmetro {chave} inválido (deveria ser uma lista de endereços): {valor}')
+            continue
+
+        destinatarios = []
+        alterado = False
+        for destinatario in valor:
+            try:
+                enderecos = separar_enderecos(destinatario)
+            except ValueError as e:
                 erros = erros_msg.setdefault(i, [])
+                erros.append(f'Endereço inválido no parâmetro {chave}: {e}')
+                continue
+
+            novos = []
+            for nome, endereco in enderecos:
+                try:
+                    validar_endereco(endereco)
+                except ValueError as e:
+                    erros = erros_msg.setdefault(i, [])
+                    erros.append(f'Endereço inválido no parâmetro {chave}: {e}')
+                    continue
+
+                if endereco.lower() in vistos:
+                    continue
+
+                vistos.add(endereco.lower())
+                novos.append((nome, endereco))
+
+            if len(enderecos) == 1 and len(novos) == 1:
+                destinatarios.append(destinatario.strip())
+            else:
+                alterado = True
+                destinatarios.extend(formataddr(novo) for novo in novos)
+
+        if alterado and not i in erros_msg:
+            if len(destinatarios) <= 0 and remover_vazios:
+                del email[chave]
+            else:
+                email[chave] = destinatarios
+
+
+def separar_enderecos(valor: Any) -> List[Tuple[str, str]]:
+    """
+    Separa os endereços de e-mail contidos no valor (separados por vírgula ou ponto e vírgula), no formato
+    "usuario@dominio" ou "Nome <usuario@dominio>", retornando o nome e o endereço de cada um (sem validá-los).
+
+    Lança ValueError caso o valor não seja um texto, ou não contenha nenhum endereço.
+    """
+
+    if not isinstance(valor, str) or valor.strip() == '':
+        raise ValueError(f'{valor!r}')
+
+    # O ponto e vírgula (separador usado por alguns clientes de e-mail) não é aceito pelo getaddresses
+    enderecos = [(nome, endereco) for nome, endereco in getaddresses([valor.replace(';', ',')]) if nome or endereco]
+    if len(enderecos) <= 0:
+        raise ValueError(f'{valor!r}')
+
+    return enderecos
+
+
+def validar_endereco(endereco: str) -> None:
+    """
+    Lança ValueError caso o endereço (apenas "usuario@dominio", sem o nome) seja inválido.
+    """
+
+    usuario, arroba, dominio = endereco.rpartition('@')
+    if arroba == '' or usuario == '' or dominio == '' or any(c.isspace() for c in endereco):
+        raise ValueError(f'{endereco!r}')
+
+
+def analisar_endereco(valor: Any) -> str:
+    """
+    Interpreta um endereço de e-mail, no formato "usuario@dominio" ou "Nome <usuario@dominio>",
+    retornando apenas o endereço ("usuario@dominio").
+
+    Lança ValueError caso o valor não contenha exatamente um endereço válido.
+    """
+
+    enderecos = separar_enderecos(valor)
+    if len(enderecos) != 1:
+        raise ValueError(f'{valor!r} (deveria conter um único endereço)')
+
+    endereco = enderecos[0][1]
+    validar_endereco(endereco)
+
+    return endereco
+
+
+def validar_arquivos(i: int, email: Dict[str, Any], erros_msg: Dict[int, List[str]], arquivos: Dict[str, Exception] = None):
+    """
+    Verifica a existência dos arquivos das imagens e anexos do e-mail.
+
+    O dicionário "arquivos" guarda o resultado da verificação de cada path (o erro ocorrido, ou None), de modo que
+    os arquivos repetidos entre as mensagens sejam verificados uma única vez.
+    """
+
+    if arquivos is None:
+        arquivos = {}
+
+    for nao_encontrado, chave, par_nome in [('Imagem não encontrada', 'imagens', 'id'), ('Anexo não encontrado', 'anexos', 'file_name')]:
+        for arquivo in email.get(chave, []):
+            if not isinstance(arquivo, dict) or not 'path' in arquivo or not par_nome in arquivo:
+                erros = erros_msg.setdefault(i, [])
+                erros.append(f'Parâmetro {chave} inválido (faltando "path" ou "{par_nome}"): {arquivo}')
+                continue
+
+            path = arquivo['path']
+            if not isinstance(path, str):
+                erros = erros_msg.setdefault(i, [])
+                erros.append(f'Parâmetro {chave} inválido ("path" deveria ser um texto): {arquivo}')
+                continue
+
+            if not path in arquivos:
+                arquivos[path] = verificar_arquivo(path)
+
+            erro = arquivos[path]
+            if erro is None:
+                continue
+
+            erros = erros_msg.setdefault(i, [])
+            if isinstance(erro, FileNotFoundError):
+                erros.append(
+                    f"{nao_encontrado} no caminho: {path}. Mensagem original do erro: {erro}")
+            else:
                 erros.append(
-                    f'Faltando parâmetro: {par}')
+                    f"Erro de leitura do arquivo no caminho: {path}. Mensagem original do erro: {erro}")
+
+
+def verificar_arquivo(path: str) -> Exception:
+    """
+    Verifica se o path corresponde a um arquivo regular, retornando o erro encontrado (ou None).
+    """
+
+    # Um inteiro seria aceito pelo os.stat como descritor de arquivo (exemplo: 1 corresponde à saída padrão)
+    if not isinstance(path, str):
+        return TypeError(f'Path inválido (deveria ser um texto): {path}')
+
+    try:
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return IsADirectoryError(f'Não é um arquivo: {path}')
+    except Exception as e:
+        return e
+
+    return None
 
 
-def enviar_emails(entrada: Dict[str, Any]):
+def criar_sender(
+    entrada: Dict[str, Any],
+    manter_conexoes: bool = False,
+    observador: 'ObservadorEnvio' = None
+) -> MailSender:
+    """
+    Instancia o MailSender, de acordo com os parâmetros de conexão (já validados) da entrada.
+    """
+
+    tls_version = None
+    if 'tls_version' in entrada:
+        tls_version = TLSVersion(entrada.get('tls_version'))
+
+    # Cache das imagens e anexos repetidos entre as mensagens
+    cache_mime = None
+    tamanho_cache_mime = entrada.get('tamanho_cache_mime', TAMANHO_CACHE_MIME_PADRAO)
+    if tamanho_cache_mime > 0:
+        cache_mime = CacheMime(tamanho_cache_mime)
+
+    # Tratamento dos anexos e do tamanho das mensagens
+    politica_anexos = None
+    if 'politica_anexos' in entrada:
+        from mail_sender_util.anexos import PoliticaAnexos
+        politica_anexos = PoliticaAnexos(**entrada['politica_anexos'])
+
+    return MailSender(
+        entrada['host'],
+        entrada['port'],
+        entrada['user'],
+        entrada['password'],
+        CryptMethod(entrada.get('crypt_method')),
+        tls_version,
+        entrada.get('conexoes', 1),
+        entrada.get('max_msgs_por_conexao'),
+        entrada.get('streaming', False),
+        cache_mime,
+        manter_conexoes=manter_conexoes,
+        observador=observador,
+        num_processos=entrada.get('processos', 1),
+        max_tentativas=entrada.get('max_tentativas', 3),
+        tempo_espera_tentativa=entrada.get('tempo_espera_tentativa', 1.0),
+        max_retentativas_lote=entrada.get('max_retentativas_lote', 100),
+        limite_msgs_por_segundo=entrada.get('limite_msgs_por_segundo'),
+        limite_destinatarios_por_segundo=entrada.get('limite_destinatarios_por_segundo'),
+        arquivo_limite=entrada.get('arquivo_limite'),
+        politica_anexos=politica_anexos
+    )
+
+
+def parametros_rota(entrada: Dict[str, Any], nome: str) -> Dict[str, Any]:
+    """
+    Retorna os parâmetros de conexão da rota: os parâmetros da própria entrada (exceto os de envio, ver CHAVES_ENVIO),
+    substituídos pelos parâmetros da rota.
+    """
+
+    parametros = {chave: valor for chave, valor in entrada.items() if not chave in CHAVES_ENVIO}
+    parametros.update(entrada['rotas'][nome])
+    return parametros
+
+
+def criar_roteador(
+    entrada: Dict[str, Any],
+    obter_sender: Callable[[Dict[str, Any]], MailSender] = criar_sender
+) -> 'RoteadorMailSender':
+    """
+    Instancia o RoteadorMailSender, de acordo com os parâmetros "rotas", "dominios" e "rota_padrao" (já validados)
+    da entrada, obtendo o MailSender de cada rota por meio de "obter_sender".
+    """
+
+    from mail_sender_util.roteador import RoteadorMailSender
+
+    rotas = {nome: obter_sender(parametros_rota(entrada, nome)) for nome in entrada['rotas']}
+    return RoteadorMailSender(rotas, entrada.get('dominios'), entrada.get('rota_padrao'))
+
+
+def abrir_caixa_saida(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]], retomar: bool = False) -> 'CaixaSaida':
+    """
+    Abre a caixa de saída indicada no parâmetro "caixa_saida" da entrada (retornando None, caso não indicada).
+    """
+
+    if not 'caixa_saida' in entrada:
+        return None
+
+    from mail_sender_util.caixa_saida import CaixaSaida
+
+    try:
+        return CaixaSaida(entrada['caixa_saida'], retomar)
+    except Exception as e:
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f"Erro ao abrir a caixa de saída: {entrada['caixa_saida']}. Mensagem original do erro: {e}")
+        raise ParametrosGeraisIncorretosException()
+
+
+def enviar_emails(entrada: Dict[str, Any], agregador: 'AgregadorMetricas' = None, retomar: bool = False):
+    erros_msg = processar_entrada(
+        entrada, lambda entrada: criar_sender(entrada, observador=agregador), retomar)
+
+    imprimir_estatisticas(agregador)
+
+    if len(erros_msg) > 0:
+        print(formata_erros(erros_msg))
+        sys.exit(1)
+    else:
+        print('ok')
+        sys.exit(0)
+
+
+def processar_entrada(
+    entrada: Dict[str, Any],
+    obter_sender: Callable[[Dict[str, Any]], MailSender] = criar_sender,
+    retomar: bool = False
+) -> Dict[int, List[str]]:
+    """
+    Valida a entrada e envia os e-mails, retornando os erros ocorridos (no formato aceito pela função "formata_erros").
+
+    O parâmetro "obter_sender" permite reaproveitar instâncias do MailSender (e suas conexões) entre chamadas
+    (inclusive as de cada rota, com o parâmetro "rotas").
+    O parâmetro "retomar" indica se o envio registrado na caixa de saída (parâmetro "caixa_saida") deve ser retomado.
+    """
+
     erros_msg = {}
+    caixa_saida = None
     try:
         # Validando entrada
         validar_entrada(entrada, erros_msg)
@@ -69,22 +597,24 @@ def enviar_emails(entrada: Dict[str, Any]):
         if -1 in erros_msg:
             raise ParametrosGeraisIncorretosException()
 
-        # Instanciando o MailsSneder
-        tls_version = None
-        if 'tls_version' in entrada:
-            tls_version = TLSVersion(entrada.get('tls_version'))
+        # Nenhuma mensagem válida: não há o que enviar (evitando abrir conexões)
+        if todas_invalidas(entrada, erros_msg):
+            return erros_msg
 
-        sender = MailSender(
-            entrada['host'],
-            entrada['port'],
-            entrada['user'],
-            entrada['password'],
-            CryptMethod(entrada.get('crypt_method')),
-            tls_version
-        )
+        caixa_saida = abrir_caixa_saida(entrada, erros_msg, retomar)
+
+        # Instanciando o MailsSneder (ou o roteador, com um MailSender por rota)
+        if 'rotas' in entrada:
+            sender = criar_roteador(entrada, obter_sender)
+        else:
+            sender = obter_sender(entrada)
 
         # Enviando mensagem
-        sender.enviar_lista(entrada['emails'], erros_msg)
+        if 'mala_direta' in entrada:
+            mala_direta = entrada['mala_direta']
+            sender.enviar_mala_direta(mala_direta['modelo'], mala_direta['destinos'], erros_msg, caixa_saida=caixa_saida)
+        else:
+            sender.enviar_lista(entrada['emails'], erros_msg, caixa_saida=caixa_saida)
     except ParametrosGeraisIncorretosException as e:
         # Basta suprimir, pois é impresso a seguir
         pass
@@ -95,18 +625,153 @@ def enviar_emails(entrada: Dict[str, Any]):
         erros = erros_msg.setdefault(-1, [])
         erros.append(
             f'Erro desconhecido ao enviar e-mails. Mensagem original do erro: {e}')
+    finally:
+        if caixa_saida is not None:
+            caixa_saida.fechar()
+
+    return erros_msg
+
+
+def todas_invalidas(entrada: Dict[str, Any], erros_msg: Dict[int, List[str]]) -> bool:
+    """
+    Indica se todas as mensagens da entrada (já validada) têm erros de validação.
+    """
+
+    if 'mala_direta' in entrada:
+        qtd = len(entrada['mala_direta']['destinos'])
+    else:
+        qtd = len(entrada['emails'])
+
+    return qtd > 0 and all(i in erros_msg for i in range(qtd))
+
+
+def imprimir_estatisticas(agregador: 'AgregadorMetricas'):
+    """
+    Imprime o resumo das métricas de envio (se coletadas) na saída de erro, preservando a saída padrão
+    (interpretada pelo chamador).
+    """
+
+    if agregador is not None:
+        print(json_dumps(agregador.resumo()), file=sys.stderr, flush=True)
+
+
+def enviar_emails_jsonl(linhas: Iterable[str], agregador: 'AgregadorMetricas' = None, retomar: bool = False):
+    """
+    Envia os e-mails recebidos no formato JSON Lines, onde a primeira linha contém os parâmetros de conexão
+    (os mesmos da entrada JSON, exceto "emails"), e cada linha seguinte contém um e-mail.
+
+    Caso a primeira linha contenha também o parâmetro "modelo", os e-mails são enviados como mala direta,
+    e cada linha seguinte contém um destino (no formato de "mala_direta.destinos" da entrada JSON).
+
+    Os e-mails são lidos e enviados de modo incremental, e o resultado de cada e-mail é impresso (também como
+    JSON Lines) assim que o mesmo é concluído: {"indice": 0, "status": "ok"} ou {"indice": 0, "status": "erro", "erros": [...]}.
+    Caso ocorram erros gerais, estes são impressos ao final, na linha: {"erros_gerais": [...]}.
+    """
+
+    erros_msg = {}
+    caixa_saida = None
+    arquivos = {}
+    partes = {}
+    lock_saida = threading.Lock()
+    linhas = iter(linhas)
+
+    def imprimir_resultado(i: int, erros: List[str]):
+        if erros is None:
+            resultado = {'indice': i, 'status': 'ok'}
+        else:
+            resultado = {'indice': i, 'status': 'erro', 'erros': erros}
+
+        with lock_saida:
+            print(json_dumps(resultado), flush=True)
+
+    def ler_emails(modelo: Dict[str, Any] = None):
+        i = 0
+        for linha in linhas:
+            if linha.strip() == '':
+                continue
+
+            try:
+                email = json_loads(linha)
+                if modelo is not None:
+                    validar_destino(i, email, modelo, erros_msg)
+                else:
+                    validar_email(i, email, erros_msg, arquivos)
+                    if not i in erros_msg:
+                        email = Mail.de_dict(email, partes)
+            except Exception as e:
+                erros = erros_msg.setdefault(i, [])
+                erros.append(
+                    f'JSON inválido na linha do e-mail. Mensagem original do erro: {e}')
+                email = {}
+
+            yield email
+            i += 1
+
+    try:
+        # Lendo e validando os parâmetros de conexão (primeira linha não vazia)
+        entrada = None
+        for linha in linhas:
+            if linha.strip() != '':
+                entrada = json_loads(linha)
+                break
+
+        if entrada is None:
+            erros = erros_msg.setdefault(-1, [])
+            erros.append('Faltando linha com os parâmetros de conexão')
+            raise ParametrosGeraisIncorretosException()
+
+        validar_parametros_conexao(entrada, erros_msg)
+
+        modelo = entrada.get('modelo')
+        if modelo is not None:
+            validar_modelo(modelo, erros_msg, arquivos)
+
+        if -1 in erros_msg:
+            raise ParametrosGeraisIncorretosException()
+
+        caixa_saida = abrir_caixa_saida(entrada, erros_msg, retomar)
+
+        # Enviando as mensagens, à medida que são lidas
+        if 'rotas' in entrada:
+            sender = criar_roteador(entrada, lambda parametros: criar_sender(parametros, observador=agregador))
+        else:
+            sender = criar_sender(entrada, observador=agregador)
+        if modelo is not None:
+            sender.enviar_mala_direta(modelo, ler_emails(modelo), erros_msg, imprimir_resultado, caixa_saida)
+        else:
+            sender.enviar_lista(ler_emails(), erros_msg, imprimir_resultado, caixa_saida)
+    except ParametrosGeraisIncorretosException as e:
+        # Basta suprimir, pois é impresso a seguir
+        pass
+    except TLSVersionMissingExcpetion as e:
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(str(e))
+    except Exception as e:
+        erros = erros_msg.setdefault(-1, [])
+        erros.append(
+            f'Erro desconhecido ao enviar e-mails. Mensagem original do erro: {e}')
+    finally:
+        if caixa_saida is not None:
+            caixa_saida.fechar()
+
+    if -1 in erros_msg:
+        print(json_dumps({'erros_gerais': erros_msg[-1]}), flush=True)
+
+    imprimir_estatisticas(agregador)
 
     if len(erros_msg) > 0:
-        print(formata_erros(erros_msg))
         sys.exit(1)
     else:
-        print('ok')
         sys.exit(0)
 
 
-def internal_main(json: str):
-    entrada = json_util.json_loads(json)
-    enviar_emails(entrada)
+def decodificar_base64(valor: str) -> str:
+    return base64.b64decode(valor).decode(encoding='ansi')
+
+
+def internal_main(json: str, agregador: 'AgregadorMetricas' = None, retomar: bool = False):
+    entrada = json_loads(json)
+    enviar_emails(entrada, agregador, retomar)
 
 
 def main():
@@ -123,7 +788,24 @@ Para uso, enviei um JSON contendo:
 - 'port': Porta de comunicação do servidor de e-mail
 - 'crypt_method': Método de criptografia a ser usado. Opções: "null" (nenhuma), "ssl_tls" (SMTP criptografa desde o íncío da comunicação com o servidor) ou "start_tls" (SMTP criptografado apenas na altura das mensagens em si.)
 - 'tls_version': Versão da criptografia TLS utilizada. Opções: "v1.0", "v1.2" e V1.2"
+- 'conexoes': Quantidade de conexões paralelas para o envio (opcional, padrão 1)
+- 'processos': Quantidade de processos para o envio, cada um com suas próprias conexões (opcional, padrão 1)
+- 'max_msgs_por_conexao': Quantidade máxima de mensagens por conexão, antes de reconectar (opcional, padrão sem limite)
+- 'max_tentativas': Quantidade máxima de tentativas de envio de cada mensagem, em caso de erros transitórios (respostas 4xx do servidor ou perda da conexão), reconectando se necessário (opcional, padrão 3)
+- 'tempo_espera_tentativa': Tempo de espera, em segundos, antes da primeira retentativa, dobrado a cada nova tentativa (opcional, padrão 1)
+- 'max_retentativas_lote': Quantidade máxima de retentativas no envio todo (opcional, padrão 100)
+- 'limite_msgs_por_segundo': Quantidade máxima de mensagens enviadas por segundo, espaçando os envios para respeitar as cotas do provedor (opcional, padrão sem limite)
+- 'limite_destinatarios_por_segundo': Quantidade máxima de destinatários por segundo (opcional, padrão sem limite)
+- 'arquivo_limite': Path base dos arquivos onde o saldo dos limites é guardado, compartilhando os limites entre execuções e processos simultâneos (opcional, padrão: limites apenas dentro do envio)
+- 'streaming': Se verdadeiro, as imagens e anexos são lidos e codificados em blocos, apenas no momento do envio (opcional, padrão false)
+- 'tamanho_cache_mime': Tamanho máximo, em bytes, do cache de imagens e anexos repetidos entre as mensagens (opcional, padrão 64MB; 0 desabilita o cache)
+- 'politica_anexos': Tratamento dos anexos e do tamanho das mensagens (opcional; por padrão, os anexos são enviados como application/octet-stream, sem verificação de tamanho). Dicionário contendo: 'detectar_tipo_mime' (identifica o tipo MIME pela extensão; padrão true), 'compactar' (compacta os anexos em zip; padrão false), 'tamanho_minimo_compactacao' (em bytes; padrão 65536), 'extensoes_nao_compactadas' (lista de extensões; padrão: formatos já compactados), 'verificar_tamanho' (falha as mensagens acima do limite SIZE do servidor, ou de 'tamanho_maximo', antes de transmiti-las; padrão true), 'tamanho_maximo' (em bytes; opcional) e 'dividir_mensagens' (divide as mensagens acima do limite, distribuindo os anexos em partes; padrão false)
+- 'caixa_saida': Diretório onde as mensagens compostas são guardadas, e onde é registrada a situação de envio de cada uma, permitindo retomar o envio (parâmetro --resume) sem reenviar as mensagens já entregues (opcional)
+- 'rotas': Alternativa aos parâmetros de conexão acima, para envio por múltiplos servidores: dicionário indexado pelo nome de cada rota, onde cada rota contém os seus parâmetros de conexão ('host', 'port', 'user', 'password', 'crypt_method' etc.; os parâmetros informados fora das rotas valem como padrão para todas). Os e-mails são agrupados por rota, e as rotas enviadas simultaneamente. A rota de cada e-mail é indicada pelo parâmetro 'rota' do e-mail, ou pelo domínio do remetente (parâmetro 'dominios', ou a rota com o mesmo nome do domínio), ou pela 'rota_padrao' (opcional)
+- 'dominios': Dicionário com o nome da rota de cada domínio de remetente (opcional)
+- 'rota_padrao': Nome da rota dos e-mails sem rota correspondente (opcional, padrão: os e-mails são registrados com erro)
 - 'emails': Lista de e-mails a serem evniados, onde cada e-mail é um dicionários, contendo:
+- 'mala_direta': Alternativa ao parâmetro 'emails', para envio de uma mesma mensagem personalizada por destinatário, contendo: 'modelo' (um e-mail, no mesmo formato abaixo, onde 'assunto' e 'msg_html' podem conter variáveis no formato $nome ou ${nome}, e 'destinatarios' é opcional) e 'destinos' (lista de dicionários, cada um com 'variaveis', um dicionário com os valores das variáveis, e 'destinatarios', 'dest_copia' e 'dest_copia_oculta', opcionais se informados no modelo)
 
 Cada mesnagem deve conter:
 - 'assunto': Assunto do e-mail
@@ -132,10 +814,11 @@ Cada mesnagem deve conter:
 - 'msg_html': String com o corpo do e-mail, em texto plano ou em formato HTML
 - 'dest_copia': Lista com os endereços de e-mail dos destinatarios em cópia
 - 'dest_copia_oculta': Lista com os endereços de e-mail dos destinatarios em cópia oculta
+- 'rota': Nome da rota pela qual o e-mail é enviado (apenas com o parâmetro 'rotas')
 - 'imagens': Lista de dicionários, representando as imagens a serem enviadas como partes do corpo da mensagem. Cada dicionário de imagem contém os parâmetros: "id", que representa o ID da imagem (referido no HTML, por uma tag img similar a: <img src="cid:image1">); e "path", que contém o path em disco da imagem.
 - 'anexos': Lista de dicionários, representanto os arquivos para anexar no e-mail. Cada dicionário contém os parâmetros: "file_name" com o nome do arquivo a ser exibido no e-mail; e "path", com o caminho em disco do anexo.
 
-Sendo que os parâmetros "dest_copia", "dest_copia_oculta", "imagens" e "anexos" são todos opcionais.
+Sendo que os parâmetros "dest_copia", "dest_copia_oculta", "imagens", "anexos" e "rota" são todos opcionais.
 
 Exemplo de mensagem:
 "{
@@ -163,18 +846,64 @@ Exemplo de mensagem:
         parser.add_argument(
             "-j", "--json", help="JSON de entrada, com os parâmetros necessários ao envio do e-mail")
 
+        parser.add_argument(
+            "--jsonl", nargs='?', const='-', metavar='ARQUIVO',
+            help="Lê a entrada no formato JSON Lines, a partir do arquivo indicado, ou da entrada padrão (se omitido o arquivo): a primeira linha contém os parâmetros de conexão, e cada linha seguinte um e-mail. O resultado de cada e-mail é impresso como uma linha JSON, assim que concluído.")
+        parser.add_argument(
+            "--encoding", default='utf-8',
+            help="Codificação da entrada JSON Lines (padrão: utf-8)")
+
+        parser.add_argument(
+            "--serve", nargs='?', type=int, const=PORTA_DAEMON_PADRAO, metavar='PORTA',
+            help=f"Executa em modo daemon, recebendo os envios (no mesmo formato JSON do parâmetro -j, puro ou em Base64, um por linha) por meio de um socket local, na porta indicada (padrão: {PORTA_DAEMON_PADRAO}), e mantendo as conexões SMTP abertas entre os envios. Cada linha deve começar pelo token do daemon (ver --arquivo-token), seguido de um espaço, e é respondida com uma linha: 'ok' ou o JSON de erros.")
+        parser.add_argument(
+            "--arquivo-token", default=ARQUIVO_TOKEN_PADRAO, metavar='ARQUIVO',
+            help=f"No modo daemon, arquivo onde é gravado o token de autenticação (gerado a cada execução, e legível apenas pelo usuário corrente), exigido no início de cada envio (padrão: {ARQUIVO_TOKEN_PADRAO})")
+        parser.add_argument(
+            "--tempo-ocioso", type=float, default=TEMPO_OCIOSO_PADRAO, metavar='SEGUNDOS',
+            help=f"No modo daemon, tempo (em segundos) após o qual as conexões SMTP ociosas são finalizadas (padrão: {TEMPO_OCIOSO_PADRAO})")
+
+        parser.add_argument(
+            "--resume", action='store_true',
+            help="Retoma o envio registrado na caixa de saída (parâmetro 'caixa_saida' da entrada), pulando as mensagens já enviadas, e enviando as demais a partir das mensagens já compostas. Sem este parâmetro, a caixa de saída é esvaziada no início do envio.")
+
+        parser.add_argument(
+            "--stats", action='store_true',
+            help="Imprime, na saída de erro, um JSON com as métricas do envio: latências (p50 e p95) de cada fase (composição, conexão, starttls, login e envio), bytes enviados e mensagens por segundo")
+
         # Read arguments from command line
         args = parser.parse_args()
 
-        if args.json is not None:
-            json = base64.b64decode(args.json).decode(encoding='ansi')
-            internal_main(json)
+        agregador = None
+        if args.stats:
+            from mail_sender_util.metricas import AgregadorMetricas
+            agregador = AgregadorMetricas()
+
+        if args.serve is not None:
+            from mail_sender_util.mail_daemon import MailDaemon, criar_arquivo_token
+            token = criar_arquivo_token(os.path.expanduser(args.arquivo_token))
+            MailDaemon(args.serve, args.tempo_ocioso, token).executar()
+        elif args.jsonl is not None:
+            if args.jsonl == '-':
+                enviar_emails_jsonl(io.TextIOWrapper(sys.stdin.buffer, encoding=args.encoding), agregador, args.resume)
+            else:
+                with open(args.jsonl, 'r', encoding=args.encoding) as arquivo:
+                    enviar_emails_jsonl(arquivo, agregador, args.resume)
+        elif args.json is not None:
+            json = decodificar_base64(args.json)
+            internal_main(json, agregador, args.resume)
     except Exception as e:
         print(f'Erro fatal não identificado. Mensagem original do erro {e}')
         sys.exit(5)
 
 
 if __name__ == '__main__':
+    # Necessário para os processos de envio (parâmetro "processos"), no executável gerado pelo PyInstaller
+    # (fora do executável, o freeze_support não tem efeito, e o multiprocessing só é importado se usado)
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
     main()
     # internal_main(
     #     '{\"password\":\"*********\",\"host\":\"smtp.gmail.com\",\"crypt_method\":\"ssl_tls\",\"user\":\"sergiosilva@nasajon.com.br\",\"port\":\"465\",\"emails\":[{\"destinatarios\":[\"nasajon@elielfigueiredo.com.br,jr@pagesweb.com.br\"],\"imagens\":[],\"anexos\":[{\"path\":\"C:/Users/Sergio Silva/Downloads/Processo Prototipação Front-end.drawio.png\",\"file_name\":\"Processo Prototipação Front-end.drawio.png\"}],\"remetente\":\"sergiosilva@nasajon.com.br\",\"assunto\":\"Teste Assunto\",\"msg_html\":\"Corpo do e-mail\"}],\"tls_version\":\"v1.2\"}')
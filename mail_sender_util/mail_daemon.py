@@ -0,0 +1,245 @@
+import hmac
+import json
+import os
+import secrets
+import socketserver
+import threading
+import time
+
+from mail_sender_util.mail_cmd import criar_sender, decodificar_base64, formata_erros, json_loads, processar_entrada
+from mail_sender_util.mail_sender import MailSender
+from typing import Any, Dict, List
+
+
+class _ManipuladorEnvios(socketserver.StreamRequestHandler):
+    """
+    Trata uma conexão de cliente, onde cada linha recebida corresponde a um envio (respondido também com uma linha).
+
+    Cada linha deve começar pelo token do daemon, seguido de um espaço. A conexão é encerrada na primeira linha com
+    token inválido.
+    """
+
+    def handle(self):
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+
+            linha = linha.strip()
+            if len(linha) <= 0:
+                continue
+
+            token, _, conteudo = linha.partition(b' ')
+            if not self.server.daemon.autenticar(token):
+                resposta = formata_erros({-1: ['Token de autenticação do daemon inválido']})
+                self.wfile.write(resposta.encode('utf-8') + b'\n')
+                self.wfile.flush()
+                return
+
+            resposta = self.server.daemon.processar(conteudo.strip())
+            self.wfile.write(resposta.encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _ServidorEnvios(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _SenderDaemon:
+    """
+    MailSender mantido pelo daemon, com a quantidade de envios em andamento e o instante do último uso.
+    """
+
+    __slots__ = ('sender', 'em_uso', 'ultimo_uso')
+
+    sender: MailSender
+    em_uso: int
+    ultimo_uso: float
+
+    def __init__(self, sender: MailSender):
+        self.sender = sender
+        self.em_uso = 0
+        self.ultimo_uso = time.monotonic()
+
+
+class MailDaemon:
+    """
+    Processo de longa duração, que recebe envios de e-mail por meio de um socket local (evitando o custo de inicialização
+    do executável a cada envio), e mantém as conexões SMTP abertas entre os envios (evitando o custo de conexão, handshake
+    TLS e autenticação).
+
+    As conexões são agrupadas por parâmetros de conexão (isto é, todos os parâmetros da entrada, exceto "emails", "mala_direta" e "caixa_saida"),
+    e finalizadas após o tempo ocioso configurado. Os MailSender sem uso pelo mesmo tempo são descartados (juntamente com
+    o cache de imagens e anexos dos mesmos), de modo que parâmetros antigos (exemplo: uma senha alterada) não ocupem
+    memória indefinidamente. Nas entradas com o parâmetro "rotas", as conexões de cada rota são
+    agrupadas pelos parâmetros da rota (ver função "parametros_rota"), sendo reaproveitadas entre envios com rotas em comum.
+
+    Como a porta local é acessível por qualquer usuário da máquina (e cada envio pode ler qualquer arquivo acessível
+    ao daemon, nos anexos), cada envio deve ser precedido do token do daemon (ver "criar_arquivo_token").
+
+    :porta: Porta TCP, na interface local, onde os envios são recebidos (0 para uma porta livre qualquer, atualizada ao iniciar o daemon)
+    :tempo_ocioso: Tempo (em segundos) após o qual as conexões SMTP ociosas são finalizadas
+    :token: Segredo compartilhado com os clientes, exigido no início de cada envio
+    :host: Interface onde os envios são recebidos (padrão: apenas a interface local)
+    """
+
+    porta: int
+    tempo_ocioso: float
+    host: str
+
+    def __init__(self, porta: int, tempo_ocioso: float, token: str, host: str = '127.0.0.1'):
+        if not token:
+            raise ValueError('Faltando o token de autenticação do daemon')
+
+        self.porta = porta
+        self.tempo_ocioso = tempo_ocioso
+        self.host = host
+        self._token = token.encode('utf-8')
+        self._senders = {}
+        self._lock_senders = threading.Lock()
+        self._servidor = None
+        self._iniciado = threading.Event()
+        self._parado = threading.Event()
+
+    def obter_sender(self, entrada: Dict[str, Any], em_uso: List[_SenderDaemon] = None) -> MailSender:
+        """
+        Retorna o MailSender correspondente aos parâmetros de conexão da entrada (criando-o, se necessário).
+
+        Caso passada a lista "em_uso", o MailSender é marcado como em uso (não sendo descartado por ociosidade), e
+        acrescentado à lista, devendo ser liberado (pelo método "_liberar_senders") ao fim do envio.
+        """
+
+        parametros = {chave: valor for chave, valor in entrada.items() if chave not in ('emails', 'mala_direta', 'caixa_saida')}
+        chave = json.dumps(parametros, sort_keys=True, default=str)
+
+        with self._lock_senders:
+            mantido = self._senders.get(chave)
+            if mantido is None:
+                mantido = _SenderDaemon(criar_sender(entrada, manter_conexoes=True))
+                self._senders[chave] = mantido
+
+            mantido.ultimo_uso = time.monotonic()
+            if em_uso is not None:
+                mantido.em_uso += 1
+                em_uso.append(mantido)
+
+        return mantido.sender
+
+    def _liberar_senders(self, em_uso: List[_SenderDaemon]) -> None:
+        with self._lock_senders:
+            for mantido in em_uso:
+                mantido.em_uso -= 1
+                mantido.ultimo_uso = time.monotonic()
+
+    def autenticar(self, token: bytes) -> bool:
+        # Comparação em tempo constante (sem revelar, pelo tempo de resposta, o prefixo correto do token)
+        return hmac.compare_digest(token, self._token)
+
+    def processar(self, linha: bytes) -> str:
+        """
+        Processa um envio (JSON puro ou codificado em Base64), retornando "ok" ou o JSON de erros (no mesmo padrão do comando).
+        """
+
+        try:
+            if linha.startswith(b'{'):
+                entrada = json_loads(linha.decode('utf-8'))
+            else:
+                entrada = json_loads(decodificar_base64(linha))
+        except Exception as e:
+            return formata_erros({-1: [f'JSON de entrada inválido. Mensagem original do erro: {e}']})
+
+        em_uso = []
+        try:
+            erros_msg = processar_entrada(entrada, lambda entrada: self.obter_sender(entrada, em_uso))
+        finally:
+            self._liberar_senders(em_uso)
+
+        if len(erros_msg) > 0:
+            return formata_erros(erros_msg)
+        else:
+            return 'ok'
+
+    def _finalizar_conexoes_ociosas(self):
+        intervalo = max(1.0, min(self.tempo_ocioso / 2, 30.0))
+        while not self._parado.wait(intervalo):
+            self._descartar_ociosos()
+
+    def _descartar_ociosos(self) -> None:
+        # Descartando os MailSender sem uso há mais que o tempo ocioso (e sem envios em andamento)
+        agora = time.monotonic()
+        descartados = []
+        with self._lock_senders:
+            for chave, mantido in list(self._senders.items()):
+                if mantido.em_uso <= 0 and agora - mantido.ultimo_uso >= self.tempo_ocioso:
+                    del self._senders[chave]
+                    descartados.append(mantido.sender)
+
+            senders = [mantido.sender for mantido in self._senders.values()]
+
+        for sender in descartados:
+            self._descartar_sender(sender)
+
+        for sender in senders:
+            sender.fechar_conexoes_ociosas(self.tempo_ocioso)
+
+    def _descartar_sender(self, sender: MailSender) -> None:
+        sender.fechar()
+        if sender.cache_mime is not None:
+            sender.cache_mime.limpar()
+
+    def executar(self):
+        """
+        Inicia o recebimento de envios (bloqueando até que o método "parar" seja chamado).
+        """
+
+        self._servidor = _ServidorEnvios((self.host, self.porta), _ManipuladorEnvios)
+        self._servidor.daemon = self
+        self.porta = self._servidor.server_address[1]
+        self._iniciado.set()
+
+        finalizador = threading.Thread(target=self._finalizar_conexoes_ociosas, daemon=True)
+        finalizador.start()
+
+        try:
+            self._servidor.serve_forever()
+        finally:
+            self._parado.set()
+            self._servidor.server_close()
+
+            with self._lock_senders:
+                for mantido in self._senders.values():
+                    self._descartar_sender(mantido.sender)
+                self._senders.clear()
+
+    def aguardar_inicio(self, timeout: float = None) -> bool:
+        """
+        Aguarda (por até "timeout" segundos) que o daemon esteja recebendo envios, retornando False caso não tenha iniciado.
+        """
+
+        return self._iniciado.wait(timeout)
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+
+
+def criar_arquivo_token(path: str) -> str:
+    """
+    Gera um novo token aleatório para o daemon, gravando-o no arquivo indicado, com permissão de leitura apenas
+    para o usuário corrente (de onde os clientes do mesmo usuário o leem).
+    """
+
+    token = secrets.token_hex(32)
+
+    diretorio = os.path.dirname(path)
+    if diretorio != '':
+        os.makedirs(diretorio, exist_ok=True)
+
+    descritor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descritor, 'w', encoding='ascii') as arquivo:
+        # Restringindo também um arquivo já existente (criado antes com outras permissões)
+        os.chmod(path, 0o600)
+        arquivo.write(token)
+
+    return token
@@ -1,18 +1,47 @@
 import enum
+import os
+import queue
+import random
+import socket
 import ssl
+import sys
+import threading
+import time
 
-from email import encoders
-from email.header import Header
-from email.mime.base import MIMEBase
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from mail_sender_util.exception import TLSVersionMissingExcpetion
-from smtplib import SMTP, SMTP_SSL, SMTPRecipientsRefused, SMTPSenderRefused
-from typing import Any, Dict, List, Tuple
-from email.utils import make_msgid
+from mail_sender_util.cache_mime import CacheMime, EntradaCacheMime, codificar_arquivo, compactar_arquivo
+from mail_sender_util.exception import MensagemExcedeTamanhoException, TLSVersionMissingExcpetion, TLSVersionNaoSuportadaException
+from mail_sender_util.mail import Anexo, Imagem, Mail
+from mail_sender_util.metricas import FASE_COMPOSICAO, FASE_CONEXAO, FASE_ENVIO, FASE_LIMITE, FASE_LOGIN, FASE_STARTTLS, EventoEnvio, ObservadorEnvio
+from mail_sender_util.smtp_sessao import SMTP_SSLSessaoTLS, SMTPSessaoTLS
+from smtplib import SMTP, SMTPDataError, SMTPRecipientsRefused, SMTPResponseException, SMTPSenderRefused, SMTPServerDisconnected, quoteaddr
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+from email.utils import make_msgid, parseaddr
 from email.utils import formatdate
 
+# O multiprocessing (e o concurrent.futures) só é importado quando usados múltiplos processos de envio, assim como
+# o pacote email.mime (na composição da primeira mensagem) e os módulos das funcionalidades opcionais (caixa de
+# saída, política de anexos, mala direta e limites de taxa), reduzindo o tempo de inicialização do utilitário de
+# linha de comando
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from mail_sender_util.anexos import MensagemDividida, PoliticaAnexos
+    from mail_sender_util.caixa_saida import CaixaSaida, MensagemCaixaSaida
+    from mail_sender_util.limitador import LimitadorTaxa
+    from mail_sender_util.mala_direta import ModeloTexto
+
+# Tamanho mínimo dos blocos escritos no socket durante o envio do conteúdo das mensagens
+TAMANHO_BUFFER_ENVIO = 64 * 1024
+
+# Quantidade de mensagens repassadas de uma vez a cada processo de envio (quando usados múltiplos processos)
+TAMANHO_BLOCO_PROCESSOS = 50
+
+ERRO_SEM_CONEXAO = 'Mensagem não enviada, por falha de conexão com o servidor (ver erros gerais)'
+
+# Contextos SSL compartilhados entre as instâncias criadas com "compartilhar_contexto_ssl" (indexados pela versão TLS)
+_contextos_ssl_compartilhados = {}
+_lock_contextos_ssl = threading.Lock()
 
 
 class CryptMethod(enum.Enum):
@@ -27,6 +56,111 @@ class TLSVersion(enum.Enum):
     TLS_1_2 = 'v1.2'
 
 
+class _Lote:
+    """
+    Estado de uma chamada do método "enviar_lista", compartilhado entre os workers de envio.
+    """
+
+    ctx: ssl.SSLContext
+    erros_msgs: Dict[int, List[str]]
+    callback_resultado: Callable[[int, List[str]], None]
+    caixa_saida: 'CaixaSaida'
+    inicio: int
+    retentativas_restantes: int
+    conexao_inicial: threading.Event
+    workers_ativos: int
+
+    def __init__(
+        self,
+        ctx: ssl.SSLContext,
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: 'CaixaSaida' = None,
+        inicio: int = 0,
+        retentativas_restantes: int = 0
+    ):
+        self.ctx = ctx
+        self.erros_msgs = erros_msgs
+        self.callback_resultado = callback_resultado
+        self.caixa_saida = caixa_saida
+        self.inicio = inicio
+        self.retentativas_restantes = retentativas_restantes
+        # Sinalizado após a primeira tentativa de conexão do lote (ver MailSender._aguardar_tamanho_servidor)
+        self.conexao_inicial = threading.Event()
+        self.workers_ativos = 0
+        self._lock = threading.Lock()
+
+    def reservar_retentativa(self) -> bool:
+        """
+        Consome uma retentativa do orçamento do lote, retornando False caso o orçamento esteja esgotado.
+        """
+
+        with self._lock:
+            if self.retentativas_restantes <= 0:
+                return False
+            self.retentativas_restantes -= 1
+            return True
+
+    def encerrar_worker(self) -> None:
+        with self._lock:
+            self.workers_ativos -= 1
+
+    def devolver(self, fila: queue.Queue, item: 'Tuple[int, MIMEMultipart]') -> bool:
+        """
+        Devolve a mensagem à fila (para os demais workers), sem bloquear, retornando False caso não haja outro worker
+        ativo, ou caso a fila esteja cheia.
+        """
+
+        with self._lock:
+            if self.workers_ativos <= 1:
+                return False
+
+        try:
+            fila.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def registrar_falha_conexao(self, i: int) -> None:
+        """
+        Registra a mensagem de índice "i" como não enviada, por falta de conexão com o servidor (o erro de conexão
+        em si é registrado como erro geral), notificando a conclusão da mesma.
+        """
+
+        erros = self.erros_msgs.setdefault(i, [])
+        erros.append(ERRO_SEM_CONEXAO)
+        self.registrar_envio(i)
+        self.concluir(i)
+
+    def concluir(self, i: int) -> None:
+        """
+        Notifica a conclusão da mensagem de índice "i" (se houver callback de resultado).
+        """
+
+        if self.callback_resultado is not None:
+            self.callback_resultado(i, self.erros_msgs.get(i))
+
+    def registrar_envio(self, i: int) -> None:
+        """
+        Registra o resultado do envio da mensagem de índice "i" na caixa de saída (se houver).
+
+        O índice na caixa de saída é deslocado por "inicio" (quando o lote é parte de um lote maior, enviado por
+        múltiplos processos).
+        """
+
+        if self.caixa_saida is None:
+            return
+
+        try:
+            self.caixa_saida.registrar_envio(self.inicio + i, self.erros_msgs.get(i))
+        except Exception as e:
+            # A mensagem já foi enviada (ou recusada): o erro de registro não é atribuído à mesma
+            erro = f'Erro ao registrar o envio na caixa de saída. Mensagem original do erro: {e}'
+            erros = self.erros_msgs.setdefault(-1, [])
+            if not erro in erros:
+                erros.append(erro)
+
+
 class MailSender:
 
     smtp_host: str
@@ -36,6 +170,27 @@ class MailSender:
     smtp_obj: SMTP
     crypt_method: CryptMethod
     tls_version: TLSVersion
+    num_conexoes: int
+    num_processos: int
+    max_msgs_por_conexao: int
+    max_msgs_em_espera: int
+    streaming: bool
+    cache_mime: CacheMime
+    manter_conexoes: bool
+    compartilhar_contexto_ssl: bool
+    retomar_sessao_tls: bool
+    conexoes_abertas: int
+    sessoes_tls_retomadas: int
+    retentativas: int
+    observador: ObservadorEnvio
+    max_tentativas: int
+    tempo_espera_tentativa: float
+    tempo_espera_maximo: float
+    max_retentativas_lote: int
+    limite_msgs_por_segundo: float
+    limite_destinatarios_por_segundo: float
+    arquivo_limite: str
+    politica_anexos: 'PoliticaAnexos'
 
     def __init__(
         self,
@@ -44,7 +199,25 @@ class MailSender:
         smtp_user: str,
         smtp_pass: str,
         crypt_method: CryptMethod = None,
-        tls_version: TLSVersion = None
+        tls_version: TLSVersion = None,
+        num_conexoes: int = 1,
+        max_msgs_por_conexao: int = None,
+        streaming: bool = False,
+        cache_mime: CacheMime = None,
+        max_msgs_em_espera: int = None,
+        manter_conexoes: bool = False,
+        compartilhar_contexto_ssl: bool = False,
+        retomar_sessao_tls: bool = True,
+        observador: ObservadorEnvio = None,
+        num_processos: int = 1,
+        max_tentativas: int = 3,
+        tempo_espera_tentativa: float = 1.0,
+        tempo_espera_maximo: float = 30.0,
+        max_retentativas_lote: int = 100,
+        limite_msgs_por_segundo: float = None,
+        limite_destinatarios_por_segundo: float = None,
+        arquivo_limite: str = None,
+        politica_anexos: 'PoliticaAnexos' = None
     ):
         """
         Classe responsável por envio de e-mails via SMTP.
@@ -57,6 +230,24 @@ class MailSender:
         :smtp_user: Usuário para login via SMTP
         :smtp_pass: Senha para login via SMTP
         :tls_version: Versão da criptografia TLS desejada
+        :num_conexoes: Quantidade de conexões paralelas usadas no envio de listas de e-mails (padrão: 1, isto é, envio sequencial)
+        :max_msgs_por_conexao: Quantidade máxima de mensagens enviadas por conexão, antes de reconectar (padrão: sem limite)
+        :streaming: Indica se o conteúdo das imagens e anexos deve ser lido e codificado em blocos, apenas no momento do envio (mantendo o consumo de memória constante, independente do tamanho dos arquivos e do lote)
+        :cache_mime: Cache das imagens e anexos já codificados, reaproveitados entre as mensagens (e entre os lotes enviados pela mesma instância)
+        :max_msgs_em_espera: Quantidade máxima de mensagens compostas antecipadamente, aguardando envio (padrão: o dobro do número de conexões)
+        :manter_conexoes: Indica se as conexões devem ser mantidas abertas (ociosas) ao fim de cada envio, para reaproveitamento nos envios seguintes (neste caso, as conexões devem ser finalizadas por meio dos métodos "fechar" ou "fechar_conexoes_ociosas")
+        :compartilhar_contexto_ssl: Indica se o contexto SSL deve ser compartilhado com as demais instâncias que usem a mesma versão TLS (por padrão, o contexto é criado uma única vez por instância)
+        :retomar_sessao_tls: Indica se as reconexões devem retomar a sessão TLS da conexão anterior, evitando o handshake completo (padrão: True)
+        :observador: Função chamada com a medição (EventoEnvio) de cada fase do envio: composição e envio de cada mensagem, conexão, starttls e login (ver AgregadorMetricas). Pode ser chamada a partir de threads distintas.
+        :num_processos: Quantidade de processos usados no envio de listas de e-mails (padrão: 1, isto é, envio no próprio processo). Cada processo compõe e envia uma parte das mensagens, com suas próprias "num_conexoes" conexões, contornando o limite de um único núcleo de CPU do interpretador.
+        :max_tentativas: Quantidade máxima de tentativas de envio de cada mensagem (e de cada conexão), em caso de erros transitórios: respostas 4xx do servidor, ou perda da conexão (padrão: 3; 1 desabilita as retentativas). Os erros permanentes (respostas 5xx, arquivos inexistentes e etc) não são repetidos.
+        :tempo_espera_tentativa: Tempo de espera (em segundos) antes da primeira retentativa, dobrado a cada nova tentativa (com variação aleatória de até metade do tempo, evitando que as conexões repitam os envios em sincronia)
+        :tempo_espera_maximo: Tempo máximo de espera (em segundos) entre as tentativas
+        :max_retentativas_lote: Quantidade máxima de retentativas em cada lote (isto é, em cada chamada do envio de listas, ou em cada bloco, quando usados múltiplos processos), evitando que um servidor indisponível prolongue o envio indefinidamente
+        :limite_msgs_por_segundo: Quantidade máxima de mensagens enviadas por segundo, somando todas as conexões (padrão: sem limite). Os envios são espaçados para respeitar o limite (ver LimitadorTaxa), em vez de esbarrar nas cotas do provedor e desperdiçar retentativas.
+        :limite_destinatarios_por_segundo: Quantidade máxima de destinatários (somando cópias e cópias ocultas) por segundo (padrão: sem limite)
+        :arquivo_limite: Path base dos arquivos que guardam o saldo dos limites (acrescido dos sufixos ".msgs" e ".destinatarios"), compartilhando os limites entre todos os processos que usem os mesmos arquivos (inclusive execuções distintas do utilitário, para a mesma conta). Por padrão, os limites valem apenas para a instância (e são divididos entre os processos de envio, quando usados múltiplos processos).
+        :politica_anexos: Política de tratamento dos anexos e do tamanho das mensagens (ver PoliticaAnexos): identificação do tipo MIME dos anexos, compactação em zip, verificação do tamanho das mensagens contra o limite do servidor (antes de transmitir o conteúdo), e divisão das mensagens que excedem o limite. Por padrão, os anexos são enviados como "application/octet-stream", sem verificação de tamanho.
         """
 
         self.smtp_host = smtp_host
@@ -65,6 +256,35 @@ class MailSender:
         self.smtp_pass = smtp_pass
         self.crypt_method = crypt_method
         self.tls_version = tls_version
+        self.num_conexoes = num_conexoes
+        self.num_processos = num_processos
+        self.max_msgs_por_conexao = max_msgs_por_conexao
+        self.streaming = streaming
+        self.cache_mime = cache_mime
+        self.max_msgs_em_espera = max_msgs_em_espera if max_msgs_em_espera is not None else 2 * max(1, num_conexoes)
+        self.manter_conexoes = manter_conexoes
+        self.compartilhar_contexto_ssl = compartilhar_contexto_ssl
+        self.retomar_sessao_tls = retomar_sessao_tls
+        self.conexoes_abertas = 0
+        self.sessoes_tls_retomadas = 0
+        self.retentativas = 0
+        self.observador = observador
+        self.max_tentativas = max_tentativas
+        self.tempo_espera_tentativa = tempo_espera_tentativa
+        self.tempo_espera_maximo = tempo_espera_maximo
+        self.max_retentativas_lote = max_retentativas_lote
+        self.limite_msgs_por_segundo = limite_msgs_por_segundo
+        self.limite_destinatarios_por_segundo = limite_destinatarios_por_segundo
+        self.arquivo_limite = arquivo_limite
+        self.politica_anexos = politica_anexos
+        self._limitador_msgs = self._criar_limitador(limite_msgs_por_segundo, '.msgs')
+        self._limitador_destinatarios = self._criar_limitador(limite_destinatarios_por_segundo, '.destinatarios')
+        self._conexoes_ociosas = []
+        self._lock_conexoes = threading.Lock()
+        self._ctx = None
+        self._sessao_tls = None
+        # Tamanho máximo das mensagens anunciado pelo servidor (None enquanto desconhecido, e 0 caso não haja limite)
+        self._tamanho_maximo_servidor = None
 
         if crypt_method is not None and crypt_method != CryptMethod.NONE and tls_version is None:
             raise TLSVersionMissingExcpetion('Faltando parâmetro: tls_version')
@@ -91,59 +311,40 @@ class MailSender:
         :anexos: Lista de arquivos para anexar no e-mail. Cada anexo é uma tupla, onde a primeira posição contem o nome do arquivo a ser exibido no e-mail, e a segunda posição contém o path em disco do anexo.
         """
 
-        # Convertendo os parâmetros num Dict
-        mail = {
-            'assunto': assunto,
-            'remetente': remetente,
-            'destinatarios': destinatarios,
-            'msg_html': msg_html
-        }
-
-        if dest_copia is not None:
-            mail['dest_copia'] = dest_copia,
-
-        if dest_copia_oculta is not None:
-            mail['dest_copia_oculta'] = dest_copia_oculta,
-
-        if imagens is not None:
-            image_list = []
-
-            for imagem in imagens:
-                img = {
-                    'id': imagem[0],
-                    'path': imagem[1]
-                }
-                image_list.append(img)
-
-            mail['imagens'] = image_list
-
-        if anexos is not None:
-            anexo_list = []
-
-            for anexo in anexos:
-                anx = {
-                    'file_name': anexo[0],
-                    'path': anexo[1]
-                }
-                anexo_list.append(anx)
-
-            mail['anexos'] = anexo_list
+        # Convertendo os parâmetros num Mail
+        mail = self._converter_parametros(
+            assunto,
+            remetente,
+            destinatarios,
+            msg_html,
+            dest_copia,
+            dest_copia_oculta,
+            imagens,
+            anexos
+        )
 
         # Enviando
-        self.enviar(
+        self.enviar_lista(
             [mail],
             erros_msgs
         )
 
     def enviar_lista(
         self,
-        mail_msgs: List[Dict[str, Any]],
-        erros_msgs: Dict[int, List[str]]
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: 'CaixaSaida' = None
     ) -> None:
         """
         Método capaz de enviar uma lista de e-mails em formato HTML.
 
-        o parâmetro "mail_msg" contém uma lista de dicionários, onde cada dicionário contém os parâmetros de um e-mail:
+        As mensagens são compostas sob demanda, à medida que são enviadas (no máximo "max_msgs_em_espera" mensagens
+        ficam compostas aguardando envio). Assim, o parâmetro "mail_msgs" pode ser qualquer iterável (inclusive um
+        generator), e os erros são registrados pela posição de cada e-mail na sequência de entrada.
+
+        o parâmetro "mail_msg" contém uma lista de e-mails (instâncias de Mail, ou dicionários com os mesmos parâmetros,
+        convertidos no momento da composição), onde cada e-mail contém os parâmetros:
         :assunto: Assunto da mensagem a ser enviada por e-mail
         :remetente: Remetente da mensagem a ser enviada por e-mail
         :destinatarios: Lista de stings, representando os endereços dos destinatátios da mensagem
@@ -152,187 +353,1394 @@ class MailSender:
         :dest_copia_oculta: Lista de stings, representandoos  destinatátios em cópia oculta, na mensagem (não visíveis pelos destinatários diretos)
         :imagens: Lista de dicionários, representando as imagens a serem enviadas como partes do corpo da mensagem. Cada dicionário de imagem contém os parâmetros: "id", que representa o ID da imagem (referido no HTML, por uma tag img similar a: <img src="cid:image1">); e "path", que contém o path em disco da imagem.
         :anexos: Lista de dicionários, representanto os arquivos para anexar no e-mail. Cada dicionário contém os parâmetros: "file_name" com o nome do arquivo a ser exibido no e-mail; e "path", com o caminho em disco do anexo.
+
+        Opcionalmente, o parâmetro "callback_resultado" recebe uma função, chamada assim que cada mensagem é concluída
+        (enviada, ou descartada por erro), recebendo o índice da mensagem e a lista de erros da mesma (None em caso de sucesso).
+        A função pode ser chamada a partir de threads distintas (quando usadas múltiplas conexões).
+
+        Quando usados múltiplos processos ("num_processos"), as mensagens são repassadas aos processos em blocos, e o
+        callback é chamado no processo principal, à medida que cada bloco é concluído. Neste caso, o programa principal
+        deve ser protegido por "if __name__ == '__main__':" (e, em executáveis congelados, chamar
+        "multiprocessing.freeze_support()"), pois os processos de envio são iniciados por "spawn" no Windows.
+
+        Opcionalmente, o parâmetro "caixa_saida" recebe uma CaixaSaida, onde as mensagens compostas são guardadas
+        (já serializadas) antes do envio, e onde é registrado o resultado do envio de cada uma. Ao enviar novamente
+        o mesmo lote, com a caixa de saída retomada, as mensagens já enviadas são puladas (e notificadas como
+        concluídas sem erros), e as demais são enviadas a partir dos arquivos guardados, sem nova composição.
         """
 
-        # Convertendo as mensagens
-        msgs_multipart = {}
-        for i in range(0, len(mail_msgs)):
-            try:
-                # Pulando a mensagem, se já foram identificados erros anteriores de composição da mesma
-                if i in erros_msgs:
-                    continue
+        self._enviar_lote(mail_msgs, erros_msgs, callback_resultado, caixa_saida=caixa_saida)
+
+    def enviar_mala_direta(
+        self,
+        modelo: Dict[str, Any],
+        destinos: Iterable[Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: 'CaixaSaida' = None
+    ) -> None:
+        """
+        Envia uma mala direta: uma mesma mensagem (modelo), personalizada com as variáveis de cada destino.
 
-                mail_msg = mail_msgs[i]
+        O parâmetro "modelo" contém os mesmos parâmetros de um e-mail do método "enviar_lista", onde o "assunto" e o
+        "msg_html" podem conter variáveis no formato "$nome" ou "${nome}" ("$$" representa o próprio caractere "$").
+        Os parâmetros "destinatarios", "dest_copia" e "dest_copia_oculta" são opcionais no modelo.
 
-                # Construindo o e-mail
-                msg = MIMEMultipart()
+        O parâmetro "destinos" pode ser qualquer iterável (inclusive um generator), onde cada item é um dicionário com:
+        :variaveis: Dicionário com os valores das variáveis do modelo (no "msg_html", os valores são escapados para HTML)
+        :destinatarios: Lista de destinatários da mensagem (obrigatório, caso não informado no modelo)
+        :dest_copia: Lista de destinatários em cópia (opcional, substituindo os do modelo)
+        :dest_copia_oculta: Lista de destinatários em cópia oculta (opcional, substituindo os do modelo)
 
-                msg['From'] = mail_msg['remetente']
-                msg['To'] = ', '.join(mail_msg['destinatarios'])
-                msg['Subject'] = mail_msg['assunto']
-                msg['Date'] = formatdate(localtime=True)
-
-                dominio = mail_msg['remetente'].split('@')[1]
-                msg['Message-ID'] = make_msgid(domain=dominio)
-
-                if 'dest_copia' in mail_msg:
-                    msg['Cc'] = ', '.join(mail_msg['dest_copia'])
-
-                if 'dest_copia_oculta' in mail_msg:
-                    msg['Bcc'] = ', '.join(mail_msg['dest_copia_oculta'])
-
-                msg.attach(MIMEText(mail_msg['msg_html'], 'html'))
-
-                # Adicionando as imagens como partes MIME no mensagem de e-mail:
-                # Onde o ID de cada parte é de acordo com a tupla da imagem, o caminho também
-                if 'imagens' in mail_msg:
-                    for image in mail_msg['imagens']:
-
-                        try:
-                            with open(image['path'], 'rb') as file:
-                                msgImage = MIMEImage(file.read())
-                        except FileNotFoundError as e:
-                            erros = erros_msgs.setdefault(i, [])
-                            erros.append(
-                                f"Imagem não encontrada no caminho: {image['path']}. Mensagem original do erro: {e}")
-                            continue
-                        except Exception as e:
-                            erros = erros_msgs.setdefault(i, [])
-                            erros.append(
-                                f"Erro de leitura da imagem no caminho: {image['path']}. Mensagem original do erro: {e}")
-                            continue
-
-                        msgImage.add_header(
-                            'Content-ID', '<{}>'.format(image['id']))
-                        msg.attach(msgImage)
-
-                # Adicionando os anexos como partes MIME na mensagem de e-mail:
-                if 'anexos' in mail_msg:
-                    for anexo in mail_msg['anexos']:
-                        msgAnexo = MIMEBase('application', 'octet-stream')
-
-                        try:
-                            with open(anexo['path'], 'rb') as file:
-                                msgAnexo.set_payload(file.read())
-                        except FileNotFoundError as e:
-                            erros = erros_msgs.setdefault(i, [])
-                            erros.append(
-                                f"Anexo não encontrada no caminho: {anexo['path']}. Mensagem original do erro: {e}")
-                            continue
-                        except Exception as e:
-                            erros = erros_msgs.setdefault(i, [])
-                            erros.append(
-                                f"Erro de leitura do anexo no caminho: {anexo['path']}. Mensagem original do erro: {e}")
-                            continue
-
-                        encoders.encode_base64(msgAnexo)
-
-                        # Escrevendo o nome do arquivo no header
-                        filename = Header(anexo['file_name'], 'utf-8').encode()
-                        parameters = {
-                            'filename*': filename,  # RFC2231
-                            'filename': filename,  # RFC2047
-                        }
-                        msgAnexo.add_header(
-                            'Content-Disposition', 'attachment', **parameters)
-
-                        # import base64
-                        # flname = base64.b64encode(
-                        #     anexo['file_name'].encode('utf-8'))
-                        # flname = str(flname, 'utf-8')
-                        # msgAnexo.add_header(
-                        #     'Content-Disposition', "attachment; filename*=\"=?utf-8?b?{}?=\"; filename=\"=?utf-8?b?{}?=\"".format(flname, flname))
-                        # msgAnexo.add_header(
-                        #     'Content-Disposition', 'attachment', filename=('utf-8', 'pt-br', anexo['file_name']))
-                        # msgAnexo.add_header(
-                        #     'Content-Disposition', "attachment; filename= {}".format(self._convert_filename_to_ascii(anexo['file_name'])))
-                        msg.attach(msgAnexo)
-
-                msgs_multipart[i] = msg
+        O modelo é compilado, e as imagens e anexos são lidos e codificados, uma única vez por chamada; apenas o
+        texto de cada mensagem é renderizado individualmente. Os erros são registrados pela posição de cada destino
+        (tal qual no método "enviar_lista"), e erros do modelo (ou de leitura das imagens e anexos) como erros gerais.
+
+        O parâmetro "caixa_saida" tem o mesmo comportamento do método "enviar_lista".
+        """
+
+        mail_msgs, partes_compartilhadas = self._preparar_mala_direta(modelo, destinos, erros_msgs)
+        if mail_msgs is None:
+            return
+
+        self._enviar_lote(mail_msgs, erros_msgs, callback_resultado, partes_compartilhadas, caixa_saida)
+
+    def _preparar_mala_direta(
+        self,
+        modelo: Dict[str, Any],
+        destinos: Iterable[Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]]
+    ) -> Tuple[Iterator[Dict[str, Any]], Dict[str, EntradaCacheMime]]:
+        """
+        Compila o modelo, e codifica as imagens e anexos do mesmo, retornando o gerador dos e-mails de cada destino
+        (no formato do método "enviar_lista"), e as partes compartilhadas (indexadas pelo path do arquivo, ou pelo
+        path e nome do anexo, no caso dos anexos compactados).
+
+        Retorna (None, None) em caso de erro no modelo (registrando os erros gerais correspondentes).
+        """
+
+        for par in ['assunto', 'remetente', 'msg_html']:
+            if not par in modelo:
+                erros = erros_msgs.setdefault(-1, [])
+                erros.append(f'Faltando parâmetro no modelo da mala direta: {par}')
+
+        if -1 in erros_msgs:
+            return None, None
+
+        from mail_sender_util.mala_direta import ModeloTexto
+
+        assunto = ModeloTexto(modelo['assunto'])
+        msg_html = ModeloTexto(modelo['msg_html'], escapar_html=True)
+
+        # Codificando as imagens e anexos uma única vez (compartilhados por todas as mensagens)
+        partes_compartilhadas = {}
+        for tipo, chave in [('Imagem', 'imagens'), ('Anexo', 'anexos')]:
+            for arquivo in modelo.get(chave, []):
+                path = arquivo['path']
+                try:
+                    # Os anexos compactados são indexados também pelo nome (gravado no zip)
+                    if tipo == 'Anexo' and self._compactar_anexo(Anexo(arquivo['file_name'], path)):
+                        chave_parte = (path, arquivo['file_name'])
+                        if not chave_parte in partes_compartilhadas:
+                            partes_compartilhadas[chave_parte] = self._obter_anexo_compactado(
+                                Anexo(arquivo['file_name'], path))
+                        continue
+
+                    if path in partes_compartilhadas:
+                        continue
+
+                    entrada = self.cache_mime.obter(path) if self.cache_mime is not None else None
+                    partes_compartilhadas[path] = entrada if entrada is not None else codificar_arquivo(path)
+                except FileNotFoundError as e:
+                    erros = erros_msgs.setdefault(-1, [])
+                    erros.append(
+                        f"{tipo} não encontrada no caminho: {path}. Mensagem original do erro: {e}")
+                except Exception as e:
+                    erros = erros_msgs.setdefault(-1, [])
+                    erros.append(
+                        f"Erro de leitura do arquivo no caminho: {path}. Mensagem original do erro: {e}")
+
+        if -1 in erros_msgs:
+            return None, None
+
+        return self._renderizar_mala_direta(modelo, assunto, msg_html, destinos, erros_msgs), partes_compartilhadas
+
+    def _renderizar_mala_direta(
+        self,
+        modelo: Dict[str, Any],
+        assunto: 'ModeloTexto',
+        msg_html: 'ModeloTexto',
+        destinos: Iterable[Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]]
+    ) -> Iterator[Mail]:
+        # Imagens e anexos do modelo, compartilhados por todas as mensagens
+        imagens = [Imagem(imagem['id'], imagem['path']) for imagem in modelo.get('imagens', [])]
+        anexos = [Anexo(anexo['file_name'], anexo['path']) for anexo in modelo.get('anexos', [])]
+
+        for i, destino in enumerate(destinos):
+            mail = Mail(None, modelo['remetente'], None, None, imagens=imagens, anexos=anexos)
+
+            # Pulando o destino, se já foram identificados erros anteriores (de validação) do mesmo
+            if i in erros_msgs:
+                yield mail
+                continue
+
+            mail.destinatarios = destino.get('destinatarios', modelo.get('destinatarios'))
+            mail.dest_copia = destino.get('dest_copia', modelo.get('dest_copia'))
+            mail.dest_copia_oculta = destino.get('dest_copia_oculta', modelo.get('dest_copia_oculta'))
+
+            if mail.destinatarios is None:
+                erros = erros_msgs.setdefault(i, [])
+                erros.append('Faltando parâmetro: destinatarios')
+
+            try:
+                valores = destino.get('variaveis', {})
+                mail.assunto = assunto.renderizar(valores)
+                mail.msg_html = msg_html.renderizar(valores)
+            except KeyError as e:
+                erros = erros_msgs.setdefault(i, [])
+                erros.append(f'Variável não informada: {e.args[0]}')
             except Exception as e:
                 erros = erros_msgs.setdefault(i, [])
                 erros.append(
-                    f"Erro desconhecido no preparo da mensagem. Mensagem original do erro: {e}")
+                    f'Erro desconhecido na renderização da mensagem. Mensagem original do erro: {e}')
+
+            yield mail
 
+    def _enviar_lote(
+        self,
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None,
+        caixa_saida: 'CaixaSaida' = None,
+        inicio: int = 0
+    ) -> None:
         # Resolvendo versão TLS
-        tls_version = None
-        if self.tls_version is not None:
-            if self.tls_version == TLSVersion.TLS_1_0:
-                tls_version = ssl.PROTOCOL_TLSv1
-            elif self.tls_version == TLSVersion.TLS_1_1:
-                tls_version = ssl.PROTOCOL_TLSv1_1
-            elif self.tls_version == TLSVersion.TLS_1_2:
-                tls_version = ssl.PROTOCOL_TLSv1_2
-            else:
-                erros = erros_msgs.setdefault(-1, [])
-                erros.append(
-                    f"Versão TLS não suportada ou identificada: {self.tls_version}")
-                return
+        try:
+            ctx = self._obter_contexto_ssl()
+        except TLSVersionNaoSuportadaException as e:
+            erros = erros_msgs.setdefault(-1, [])
+            erros.append(str(e))
+            return
 
-        ctx = None
-        if self.tls_version is not None:
-            ctx = ssl.SSLContext(tls_version)
+        if self.num_processos > 1:
+            self._enviar_lote_processos(mail_msgs, erros_msgs, callback_resultado, partes_compartilhadas, caixa_saida)
+            return
 
-        # Enviando os e-mails
-        smtp_obj = None
+        # Iniciando os workers de envio (cada worker mantém sua própria conexão, e consome a fila compartilhada)
+        lote = _Lote(ctx, erros_msgs, callback_resultado, caixa_saida, inicio, self.max_retentativas_lote)
+        fila = queue.Queue(maxsize=self.max_msgs_em_espera)
+        lote.workers_ativos = max(1, self.num_conexoes)
+
+        workers = []
+        for w in range(0, max(1, self.num_conexoes)):
+            worker = threading.Thread(
+                target=self._processar_fila,
+                args=(fila, lote, w == 0),
+                daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+
+        # Compondo as mensagens, à medida que os workers liberam espaço na fila
+        itens = enumerate(mail_msgs)
         try:
-            # Estabelecendo a conexão
-            try:
-                if self.crypt_method is not None and self.crypt_method == CryptMethod.SSL_OR_TLS:
-                    smtp_obj = SMTP_SSL(host=self.smtp_host,
-                                        port=self.smtp_port, context=ctx)
+            if self._aguardar_tamanho_servidor():
+                lote.conexao_inicial.wait()
+
+            for i, mail_msg in itens:
+                inicio_composicao = time.perf_counter()
+                if caixa_saida is not None:
+                    from mail_sender_util.caixa_saida import SITUACAO_ENVIADA
+                    situacao, msg = self._obter_da_caixa_saida(lote, i, mail_msg, erros_msgs, partes_compartilhadas)
+                    if situacao == SITUACAO_ENVIADA:
+                        lote.concluir(i)
+                        continue
                 else:
-                    smtp_obj = SMTP(host=self.smtp_host,
-                                    port=self.smtp_port)
+                    msg = self._compor_mensagem(i, mail_msg, erros_msgs, partes_compartilhadas)
 
-                smtp_obj.ehlo()
-                if self.crypt_method is not None and self.crypt_method == CryptMethod.START_TLS:
-                    smtp_obj.starttls(context=ctx)
-            except Exception as e:
-                erros = erros_msgs.setdefault(-1, [])
-                erros.append(
-                    f"Erro estabelecendo conexão com o servidor. Verifique dados de conexão e criptografia. Mensagem original do erro: {e}")
-                return
+                self._emitir_composicao(i, inicio_composicao, msg, erros_msgs)
+                if msg is None:
+                    lote.concluir(i)
+                    continue
 
-            # Autenticando
-            try:
-                smtp_obj.login(self.smtp_user, self.smtp_pass)
-            except Exception as e:
-                erros = erros_msgs.setdefault(-1, [])
-                erros.append(
-                    f"Erro de autenticação com o servidor de e-mail. Verifique o usuário e senha passados. Mensagem original do erro: {e}")
-                return
+                if not self._enfileirar(fila, workers, (i, msg)):
+                    # Todos os workers foram encerrados (por falha de conexão): as mensagens restantes não são enviadas
+                    lote.registrar_falha_conexao(i)
+                    self._descartar_restantes(lote, itens)
+                    break
+        finally:
+            # Sinalizando o fim da composição (um marcador para cada worker)
+            for _ in workers:
+                if not self._enfileirar(fila, workers, None):
+                    break
 
-            # Enviando as mensagens
-            for i in msgs_multipart:
-                msg = msgs_multipart[i]
+            for worker in workers:
+                worker.join()
+
+            # Mensagens que permaneceram na fila, após o encerramento dos workers (por falha de conexão)
+            while True:
                 try:
-                    # Pulando a mensagem, se já foram identificados erros anteriores de composição da mesma
-                    if i in erros_msgs:
-                        continue
+                    item = fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    lote.registrar_falha_conexao(item[0])
 
-                    # Enviando o e-mail de fato
-                    smtp_obj.send_message(msg)
-                except SMTPRecipientsRefused as e:
-                    erros = erros_msgs.setdefault(i, [])
-                    erros.append(
-                        f"Um ou mais destinatário não identificados: {e.recipients}. Mensagem original do erro: {e}")
-                    continue
-                except SMTPSenderRefused as e:
-                    erros = erros_msgs.setdefault(i, [])
-                    erros.append(
-                        f"Remetente não identificado: {msg['From']}. Mensagem original do erro: {e}")
-                    continue
-                except Exception as e:
-                    erros = erros_msgs.setdefault(i, [])
-                    erros.append(
-                        f"Erro desconhecido ao enviar a mensagem. Verifique o remetente e os destinatários passados. Mensagem original do erro: {e}")
+    def _descartar_restantes(self, lote: '_Lote', itens: Iterator[Tuple[int, Union[Mail, Dict[str, Any]]]]) -> None:
+        """
+        Conclui as mensagens ainda não compostas, quando não há mais conexão com o servidor (de modo que cada
+        mensagem da entrada tenha um resultado).
+
+        As mensagens já enviadas (registradas na caixa de saída) são concluídas sem erros.
+        """
+
+        for i, mail_msg in itens:
+            if i in lote.erros_msgs:
+                lote.concluir(i)
+                continue
+
+            if lote.caixa_saida is not None:
+                from mail_sender_util.caixa_saida import SITUACAO_ENVIADA
+                try:
+                    situacao, _ = lote.caixa_saida.obter(lote.inicio + i, mail_msg)
+                except Exception:
+                    situacao = None
+
+                if situacao == SITUACAO_ENVIADA:
+                    lote.concluir(i)
                     continue
 
+            lote.registrar_falha_conexao(i)
+
+    def _obter_da_caixa_saida(
+        self,
+        lote: '_Lote',
+        i: int,
+        mail_msg: Union[Mail, Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]],
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None
+    ) -> 'Tuple[str, MensagemCaixaSaida]':
+        """
+        Retorna a situação e a mensagem guardada na caixa de saída (caso o envio esteja sendo retomado), ou compõe
+        a mensagem e a guarda na caixa de saída, como pendente.
+
+        Retorna None, no lugar da mensagem, caso a mesma já tenha sido enviada, ou em caso de erro (registrado).
+        """
+
+        try:
+            situacao, msg = lote.caixa_saida.obter(lote.inicio + i, mail_msg)
+            if situacao is not None:
+                return situacao, msg
+        except Exception as e:
+            erros = erros_msgs.setdefault(i, [])
+            erros.append(
+                f'Erro ao ler a mensagem da caixa de saída. Mensagem original do erro: {e}')
+            return None, None
+
+        # As mensagens da caixa de saída não são divididas (cada índice corresponde a um único arquivo)
+        msg = self._compor_mensagem(i, mail_msg, erros_msgs, partes_compartilhadas, dividir=False)
+        if msg is None:
+            return None, None
+
+        try:
+            return None, lote.caixa_saida.guardar(lote.inicio + i, mail_msg, msg)
+        except Exception as e:
+            erros = erros_msgs.setdefault(i, [])
+            erros.append(
+                f'Erro ao guardar a mensagem na caixa de saída. Mensagem original do erro: {e}')
+            return None, None
+
+    def _enviar_lote_processos(
+        self,
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None,
+        caixa_saida: 'CaixaSaida' = None
+    ) -> None:
+        """
+        Distribui as mensagens, em blocos de TAMANHO_BLOCO_PROCESSOS, entre "num_processos" processos de envio.
+
+        Cada processo mantém seu próprio MailSender (e suas conexões) entre os blocos recebidos. Os erros (e os
+        eventos de medição, caso haja observador) de cada bloco são devolvidos ao processo principal, e registrados
+        pelo índice original das mensagens. No máximo dois blocos por processo ficam aguardando envio, de modo que
+        "mail_msgs" continua sendo consumido sob demanda.
+
+        As partes compartilhadas (imagens e anexos da mala direta, já codificados) são transmitidas uma única vez a
+        cada processo, na inicialização do mesmo, e referidas pela chave correspondente em cada bloco.
+
+        A caixa de saída (se houver) é aberta novamente em cada processo, a partir do mesmo diretório.
+        """
+
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        parametros = self._parametros_processo()
+        diretorio_caixa_saida = caixa_saida.diretorio if caixa_saida is not None else None
+        tamanho_cache_mime = self.cache_mime.tamanho_maximo if self.cache_mime is not None else None
+        coletar_eventos = self.observador is not None
+
+        # Chave das partes compartilhadas (única entre os lotes enviados pelos processos deste processo principal)
+        chave_partes = f'{os.getpid()}:{id(partes_compartilhadas)}' if partes_compartilhadas else None
+
+        with ProcessPoolExecutor(
+            max_workers=self.num_processos,
+            initializer=_inicializar_processo,
+            initargs=(parametros, tamanho_cache_mime, diretorio_caixa_saida, chave_partes, partes_compartilhadas)
+        ) as executor:
+            pendentes = {}
+            for inicio, bloco in _dividir_em_blocos(mail_msgs, TAMANHO_BLOCO_PROCESSOS):
+                # Aguardando a conclusão de algum bloco, caso todos os processos já estejam ocupados
+                while len(pendentes) >= 2 * self.num_processos:
+                    concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        self._concluir_bloco(futuro, *pendentes.pop(futuro), erros_msgs, callback_resultado)
+
+                # Repassando os erros já conhecidos (de validação), para que as mensagens correspondentes sejam puladas
+                erros_bloco = {i - inicio: list(erros_msgs[i]) for i in range(inicio, inicio + len(bloco)) if i in erros_msgs}
+
+                futuro = executor.submit(
+                    _enviar_bloco_processo, inicio, bloco, erros_bloco, chave_partes, coletar_eventos)
+                pendentes[futuro] = (inicio, len(bloco))
+
+            for futuro in wait(pendentes).done:
+                self._concluir_bloco(futuro, *pendentes[futuro], erros_msgs, callback_resultado)
+
+    def _parametros_processo(self) -> Dict[str, Any]:
+        """
+        Retorna os parâmetros do MailSender criado em cada processo de envio (que envia no próprio processo,
+        mantendo as conexões abertas entre os blocos recebidos).
+        """
+
+        return {
+            'smtp_host': self.smtp_host,
+            'smtp_port': self.smtp_port,
+            'smtp_user': self.smtp_user,
+            'smtp_pass': self.smtp_pass,
+            'crypt_method': self.crypt_method,
+            'tls_version': self.tls_version,
+            'num_conexoes': self.num_conexoes,
+            'max_msgs_por_conexao': self.max_msgs_por_conexao,
+            'streaming': self.streaming,
+            'max_msgs_em_espera': self.max_msgs_em_espera,
+            'manter_conexoes': True,
+            'retomar_sessao_tls': self.retomar_sessao_tls,
+            'max_tentativas': self.max_tentativas,
+            'tempo_espera_tentativa': self.tempo_espera_tentativa,
+            'tempo_espera_maximo': self.tempo_espera_maximo,
+            'max_retentativas_lote': self.max_retentativas_lote,
+            'limite_msgs_por_segundo': self._limite_processo(self.limite_msgs_por_segundo),
+            'limite_destinatarios_por_segundo': self._limite_processo(self.limite_destinatarios_por_segundo),
+            'arquivo_limite': self.arquivo_limite,
+            'politica_anexos': self.politica_anexos
+        }
+
+    def _limite_processo(self, limite: float) -> float:
+        # Sem arquivo compartilhado, o limite é dividido igualmente entre os processos de envio
+        if limite is None or self.arquivo_limite is not None:
+            return limite
+
+        return limite / self.num_processos
+
+    def _concluir_bloco(
+        self,
+        futuro: 'Future',
+        inicio: int,
+        qtd_msgs: int,
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None
+    ) -> None:
+        """
+        Registra o resultado de um bloco enviado por um processo de envio (reindexando os erros a partir
+        de "inicio"), e notifica o observador e o callback de resultado.
+        """
+
+        try:
+            erros_bloco, eventos = futuro.result()
+        except Exception as e:
+            # Processo de envio interrompido (ou resultado não transmissível): o bloco inteiro é considerado com erro
+            erros_bloco = {
+                i: [f'Erro no processo de envio da mensagem. Mensagem original do erro: {e}'] for i in range(0, qtd_msgs)}
+            eventos = []
+
+        for evento in eventos:
+            if evento.indice is not None:
+                evento.indice += inicio
+            self.observador(evento)
+
+        for i, erros in erros_bloco.items():
+            if i < 0:
+                for erro in erros:
+                    self._registrar_erro_geral(erros_msgs, erro)
+            else:
+                erros_msgs[inicio + i] = erros
+
+        if callback_resultado is not None:
+            for i in range(inicio, inicio + qtd_msgs):
+                callback_resultado(i, erros_msgs.get(i))
+
+    def _enfileirar(self, fila: queue.Queue, workers: List[threading.Thread], item: 'Tuple[int, MIMEMultipart]' = None) -> bool:
+        """
+        Aguarda espaço na fila para a mensagem composta, retornando False caso não haja mais workers ativos.
+        """
+
+        while True:
+            if not any(worker.is_alive() for worker in workers):
+                return False
+
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+    def _converter_parametros(
+        self,
+        assunto: str,
+        remetente: str,
+        destinatarios: List[str],
+        msg_html: str,
+        dest_copia: List[str] = None,
+        dest_copia_oculta: List[str] = None,
+        imagens: List[Tuple[str, str]] = None,
+        anexos: List[Tuple[str, str]] = None
+    ) -> Mail:
+        """
+        Converte os parâmetros do método "enviar" no formato aceito pelo método "enviar_lista".
+        """
+
+        if imagens is not None:
+            imagens = [Imagem(imagem[0], imagem[1]) for imagem in imagens]
+
+        if anexos is not None:
+            anexos = [Anexo(anexo[0], anexo[1]) for anexo in anexos]
+
+        return Mail(assunto, remetente, destinatarios, msg_html, dest_copia, dest_copia_oculta, imagens, anexos)
+
+    def _compor_mensagem(
+        self,
+        i: int,
+        mail_msg: Union[Mail, Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]],
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None,
+        dividir: bool = True
+    ) -> 'Union[MIMEMultipart, MensagemDividida]':
+        """
+        Constrói a mensagem MIME correspondente ao e-mail de índice "i".
+
+        As imagens e anexos presentes em "partes_compartilhadas" (já codificados, e indexados pelo path) são apenas
+        referenciados pela mensagem, e inseridos no momento do envio (sem cópia do conteúdo por mensagem).
+
+        Caso a política de anexos preveja a divisão das mensagens (e o parâmetro "dividir" seja verdadeiro), a
+        mensagem que excede o tamanho máximo é retornada dividida (MensagemDividida).
+
+        Os erros de composição são registrados em "erros_msgs", e, neste caso, retorna None.
+        """
+
+        try:
+            # Pulando a mensagem, se já foram identificados erros anteriores de composição da mesma
+            if i in erros_msgs:
+                return None
+
+            if not isinstance(mail_msg, Mail):
+                mail_msg = Mail.de_dict(mail_msg)
+
+            from email.header import Header
+            from email.mime.multipart import MIMEMultipart
+            from email.mime.text import MIMEText
+            from mail_sender_util.mime_stream import MIMEMultipartStream
+
+            # Construindo o e-mail (no modo streaming, o conteúdo dos arquivos só é lido e codificado no envio)
+            if self.streaming or partes_compartilhadas:
+                msg = MIMEMultipartStream()
+            else:
+                msg = MIMEMultipart()
+
+            msg['From'] = mail_msg.remetente
+            msg['To'] = ', '.join(mail_msg.destinatarios)
+            msg['Subject'] = mail_msg.assunto
+            msg['Date'] = formatdate(localtime=True)
+
+            dominio = parseaddr(mail_msg.remetente)[1].rpartition('@')[2]
+            msg['Message-ID'] = make_msgid(domain=dominio)
+
+            # As listas vazias não geram headers (um header "Cc" vazio é inválido)
+            if mail_msg.dest_copia:
+                msg['Cc'] = ', '.join(mail_msg.dest_copia)
+
+            if mail_msg.dest_copia_oculta:
+                msg['Bcc'] = ', '.join(mail_msg.dest_copia_oculta)
+
+            msg.attach(MIMEText(mail_msg.msg_html, 'html'))
+
+            # Adicionando as imagens como partes MIME no mensagem de e-mail:
+            # Onde o ID de cada parte é de acordo com a tupla da imagem, o caminho também
+            if mail_msg.imagens is not None:
+                for image in mail_msg.imagens:
+
+                    try:
+                        msgImage = self._criar_parte_imagem(
+                            msg, image.path, partes_compartilhadas)
+                    except FileNotFoundError as e:
+                        erros = erros_msgs.setdefault(i, [])
+                        erros.append(
+                            f"Imagem não encontrada no caminho: {image.path}. Mensagem original do erro: {e}")
+                        continue
+                    except Exception as e:
+                        erros = erros_msgs.setdefault(i, [])
+                        erros.append(
+                            f"Erro de leitura da imagem no caminho: {image.path}. Mensagem original do erro: {e}")
+                        continue
+
+                    msgImage.add_header(
+                        'Content-ID', '<{}>'.format(image.id))
+                    msg.attach(msgImage)
+
+            # Adicionando os anexos como partes MIME na mensagem de e-mail:
+            if mail_msg.anexos is not None:
+                for anexo in mail_msg.anexos:
+                    try:
+                        compactar = self._compactar_anexo(anexo)
+                        msgAnexo = self._criar_parte_anexo(
+                            msg, anexo, partes_compartilhadas, compactar)
+                    except FileNotFoundError as e:
+                        erros = erros_msgs.setdefault(i, [])
+                        erros.append(
+                            f"Anexo não encontrada no caminho: {anexo.path}. Mensagem original do erro: {e}")
+                        continue
+                    except Exception as e:
+                        erros = erros_msgs.setdefault(i, [])
+                        erros.append(
+                            f"Erro de leitura do anexo no caminho: {anexo.path}. Mensagem original do erro: {e}")
+                        continue
+
+                    # Escrevendo o nome do arquivo no header
+                    filename = Header(anexo.file_name + '.zip' if compactar else anexo.file_name, 'utf-8').encode()
+                    parameters = {
+                        'filename*': filename,  # RFC2231
+                        'filename': filename,  # RFC2047
+                    }
+                    msgAnexo.add_header(
+                        'Content-Disposition', 'attachment', **parameters)
+
+                    # import base64
+                    # flname = base64.b64encode(
+                    #     anexo['file_name'].encode('utf-8'))
+                    # flname = str(flname, 'utf-8')
+                    # msgAnexo.add_header(
+                    #     'Content-Disposition', "attachment; filename*=\"=?utf-8?b?{}?=\"; filename=\"=?utf-8?b?{}?=\"".format(flname, flname))
+                    # msgAnexo.add_header(
+                    #     'Content-Disposition', 'attachment', filename=('utf-8', 'pt-br', anexo['file_name']))
+                    # msgAnexo.add_header(
+                    #     'Content-Disposition', "attachment; filename= {}".format(self._convert_filename_to_ascii(anexo['file_name'])))
+                    msg.attach(msgAnexo)
+
+            # Descartando a mensagem, caso tenha ocorrido erro na leitura de alguma imagem ou anexo
+            if i in erros_msgs:
+                return None
+
+            if dividir:
+                return self._dividir_mensagem(i, msg, erros_msgs)
+
+            return msg
+        except Exception as e:
+            erros = erros_msgs.setdefault(i, [])
+            erros.append(
+                f"Erro desconhecido no preparo da mensagem. Mensagem original do erro: {e}")
+            return None
+
+    def _criar_parte_imagem(
+        self,
+        msg: 'MIMEMultipart',
+        path: str,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None
+    ) -> 'MIMEBase':
+        """
+        Cria a parte MIME de uma imagem, reaproveitando o conteúdo já codificado (das partes compartilhadas ou do cache),
+        ou adiando a leitura do arquivo para o momento do envio (no modo streaming).
+        """
+
+        from email.mime.image import MIMEImage
+        from mail_sender_util.mime_stream import MIMEMultipartStream, criar_parte_codificada, subtipo_imagem
+
+        entrada = None
+        if partes_compartilhadas:
+            entrada = partes_compartilhadas.get(path)
+        if entrada is None and self.cache_mime is not None:
+            entrada = self.cache_mime.obter(path)
+
+        if entrada is not None:
+            subtipo = subtipo_imagem(entrada.cabecalho)
+            if isinstance(msg, MIMEMultipartStream):
+                return msg.criar_parte_arquivo('image', subtipo, path, entrada.conteudo)
+            return criar_parte_codificada('image', subtipo, entrada.conteudo)
+
+        if self.streaming:
+            with open(path, 'rb') as file:
+                subtipo = subtipo_imagem(file.read(32))
+            return msg.criar_parte_arquivo('image', subtipo, path)
+
+        with open(path, 'rb') as file:
+            return MIMEImage(file.read())
+
+    def _criar_parte_anexo(
+        self,
+        msg: 'MIMEMultipart',
+        anexo: Anexo,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None,
+        compactar: bool = False
+    ) -> 'MIMEBase':
+        """
+        Cria a parte MIME de um anexo, reaproveitando o conteúdo já codificado (das partes compartilhadas ou do cache),
+        ou adiando a leitura do arquivo para o momento do envio (no modo streaming).
+
+        Os anexos compactados são sempre compactados na composição (o conteúdo compactado é mantido em memória,
+        inclusive no modo streaming).
+        """
+
+        from email import encoders
+        from email.mime.base import MIMEBase
+        from mail_sender_util.mime_stream import MIMEMultipartStream, criar_parte_codificada
+
+        path = anexo.path
+        if compactar:
+            entrada = self._obter_anexo_compactado(anexo, partes_compartilhadas)
+            maintype, subtype = 'application', 'zip'
+        else:
+            entrada = None
+            if partes_compartilhadas:
+                entrada = partes_compartilhadas.get(path)
+            if entrada is None and self.cache_mime is not None:
+                entrada = self.cache_mime.obter(path)
+            maintype, subtype = self._tipo_anexo(anexo.file_name)
+
+        if entrada is not None:
+            if isinstance(msg, MIMEMultipartStream):
+                return msg.criar_parte_arquivo(maintype, subtype, path, entrada.conteudo)
+            return criar_parte_codificada(maintype, subtype, entrada.conteudo)
+
+        if self.streaming:
+            # Apenas verificando o acesso ao arquivo (o conteúdo só é lido no envio)
+            with open(path, 'rb'):
+                pass
+            return msg.criar_parte_arquivo(maintype, subtype, path)
+
+        msgAnexo = MIMEBase(maintype, subtype)
+        with open(path, 'rb') as file:
+            msgAnexo.set_payload(file.read())
+        encoders.encode_base64(msgAnexo)
+
+        return msgAnexo
+
+    def _tipo_anexo(self, nome: str) -> Tuple[str, str]:
+        if self.politica_anexos is None or not self.politica_anexos.detectar_tipo_mime:
+            return 'application', 'octet-stream'
+
+        from mail_sender_util.anexos import tipo_mime
+        return tipo_mime(nome)
+
+    def _compactar_anexo(self, anexo: Anexo) -> bool:
+        """
+        Indica se o anexo deve ser compactado, de acordo com a política de anexos (se houver).
+        """
+
+        if self.politica_anexos is None or not self.politica_anexos.compactar:
+            return False
+
+        return self.politica_anexos.deve_compactar(anexo.file_name, os.path.getsize(anexo.path))
+
+    def _obter_anexo_compactado(
+        self,
+        anexo: Anexo,
+        partes_compartilhadas: Dict[str, EntradaCacheMime] = None
+    ) -> EntradaCacheMime:
+        """
+        Retorna o anexo compactado (e codificado), das partes compartilhadas, do cache, ou compactando o arquivo.
+        """
+
+        entrada = None
+        if partes_compartilhadas:
+            entrada = partes_compartilhadas.get((anexo.path, anexo.file_name))
+        if entrada is None and self.cache_mime is not None:
+            entrada = self.cache_mime.obter(anexo.path, anexo.file_name)
+        if entrada is None:
+            entrada = compactar_arquivo(anexo.path, anexo.file_name)
+
+        return entrada
+
+    def _dividir_mensagem(
+        self,
+        i: int,
+        msg: 'MIMEMultipart',
+        erros_msgs: Dict[int, List[str]]
+    ) -> 'Union[MIMEMultipart, MensagemDividida]':
+        """
+        Divide a mensagem que excede o tamanho máximo (caso a política de anexos preveja a divisão, e o limite
+        seja conhecido), registrando o erro correspondente caso a divisão não seja possível.
+        """
+
+        if self.politica_anexos is None or not self.politica_anexos.dividir_mensagens:
+            return msg
+
+        limite = self.politica_anexos.limite_tamanho(self._tamanho_maximo_servidor)
+        if limite is None:
+            return msg
+
+        from mail_sender_util.anexos import MensagemDividida, dividir_mensagem
+
+        try:
+            partes = dividir_mensagem(msg, limite)
+        except MensagemExcedeTamanhoException as e:
+            erros = erros_msgs.setdefault(i, [])
+            erros.append(
+                f"Mensagem excede o tamanho máximo, mesmo dividida em partes. Mensagem original do erro: {e}")
+            return None
+
+        if len(partes) == 1:
+            return partes[0]
+
+        return MensagemDividida(partes)
+
+    def _aguardar_tamanho_servidor(self) -> bool:
+        """
+        Indica se a composição deve aguardar a primeira conexão do lote, para conhecer o tamanho máximo das mensagens
+        anunciado pelo servidor (necessário à divisão das mensagens).
+        """
+
+        return (
+            self.politica_anexos is not None
+            and self.politica_anexos.dividir_mensagens
+            and self._tamanho_maximo_servidor is None
+        )
+
+    def _obter_contexto_ssl(self) -> ssl.SSLContext:
+        """
+        Retorna o contexto SSL da instância (ou o contexto compartilhado, se configurado), criando-o apenas no primeiro uso.
+
+        A reutilização do contexto é também condição para a retomada das sessões TLS.
+        """
+
+        if self._ctx is not None:
+            return self._ctx
+
+        if self.compartilhar_contexto_ssl and self.tls_version is not None:
+            with _lock_contextos_ssl:
+                ctx = _contextos_ssl_compartilhados.get(self.tls_version)
+                if ctx is None:
+                    ctx = self._criar_contexto_ssl()
+                    _contextos_ssl_compartilhados[self.tls_version] = ctx
+        else:
+            ctx = self._criar_contexto_ssl()
+
+        self._ctx = ctx
+        return ctx
+
+    def _criar_contexto_ssl(self) -> ssl.SSLContext:
+        """
+        Cria o contexto SSL correspondente à versão TLS configurada (ou None, se não houver versão configurada).
+        """
+
+        if self.tls_version is None:
+            return None
+
+        if self.tls_version == TLSVersion.TLS_1_0:
+            tls_version = ssl.PROTOCOL_TLSv1
+        elif self.tls_version == TLSVersion.TLS_1_1:
+            tls_version = ssl.PROTOCOL_TLSv1_1
+        elif self.tls_version == TLSVersion.TLS_1_2:
+            tls_version = ssl.PROTOCOL_TLSv1_2
+        else:
+            raise TLSVersionNaoSuportadaException(
+                f"Versão TLS não suportada ou identificada: {self.tls_version}")
+
+        return ssl.SSLContext(tls_version)
+
+    def _processar_fila(
+        self,
+        fila: queue.Queue,
+        lote: '_Lote',
+        conectar_imediatamente: bool
+    ) -> None:
+        """
+        Consome a fila de mensagens compostas, enviando-as por uma conexão própria, até receber o marcador
+        de fim da composição (None).
+
+        A conexão é aberta na primeira mensagem recebida (ou imediatamente, no caso do primeiro worker, para que
+        erros de conexão sejam reportados mesmo que nenhuma mensagem seja composta com sucesso), e reaberta sempre
+        que atinge o limite de mensagens por conexão (se configurado).
+        Em caso de falha de conexão, a mensagem corrente é devolvida à fila (para os demais workers), ou, caso não
+        haja outro worker ativo (ou espaço na fila), registrada como não enviada.
+        """
+
+        smtp_obj = None
+        qtd_msgs = 0
+        try:
+            if conectar_imediatamente:
+                try:
+                    smtp_obj, qtd_msgs = self._obter_conexao(lote)
+                finally:
+                    lote.conexao_inicial.set()
+                if smtp_obj is None:
+                    return
+
+            while True:
+                item = fila.get()
+                if item is None:
+                    return
+
+                i, msg = item
+
+                tentativa = 1
+                while True:
+                    # Abrindo a conexão, caso ainda não aberta, ou reabrindo, caso atingido o limite de mensagens da mesma (ou caso a conexão tenha sido interrompida)
+                    if smtp_obj is None or smtp_obj.sock is None or self._limite_msgs_atingido(qtd_msgs):
+                        if smtp_obj is not None:
+                            self._desconectar(smtp_obj)
+
+                        smtp_obj, qtd_msgs = self._obter_conexao(lote)
+                        if smtp_obj is None:
+                            # Nunca bloqueando na devolução: a fila pode ter sido preenchida novamente pela composição
+                            if not lote.devolver(fila, (i, msg)):
+                                lote.registrar_falha_conexao(i)
+                            return
+
+                    qtd_msgs += 1
+                    if not self._enviar_mensagem(smtp_obj, i, msg, lote, tentativa):
+                        break
+
+                    # Erro transitório: aguardando para tentar novamente (pela mesma conexão, ou por uma nova, caso a mesma tenha caído)
+                    self._aguardar_retentativa(tentativa)
+                    tentativa += 1
+
+                lote.registrar_envio(i)
+                lote.concluir(i)
         finally:
-            # Finalizando a conexão
+            lote.encerrar_worker()
+
+            # Finalizando a conexão (ou mantendo-a ociosa, para os próximos envios)
+            if smtp_obj is not None:
+                self._liberar_conexao(smtp_obj, qtd_msgs)
+
+    def _limite_msgs_atingido(self, qtd_msgs: int) -> bool:
+        return self.max_msgs_por_conexao is not None and qtd_msgs >= self.max_msgs_por_conexao
+
+    def _obter_conexao(self, lote: '_Lote') -> Tuple[SMTP, int]:
+        """
+        Retorna uma conexão ociosa (mantida de envios anteriores), ou abre uma nova conexão, juntamente com
+        a quantidade de mensagens já enviadas pela mesma.
+
+        Retorna None, em caso de erro na abertura da conexão (registrando o erro geral correspondente).
+        """
+
+        while True:
+            with self._lock_conexoes:
+                if len(self._conexoes_ociosas) <= 0:
+                    break
+                smtp_obj, qtd_msgs, _ = self._conexoes_ociosas.pop()
+
+            # Verificando se a conexão ociosa ainda está ativa (o servidor pode tê-la encerrado por inatividade)
+            try:
+                if smtp_obj.noop()[0] == 250:
+                    return smtp_obj, qtd_msgs
+            except Exception:
+                pass
+            smtp_obj.close()
+
+        # Abrindo uma nova conexão (repetindo, em caso de erros transitórios)
+        tentativa = 1
+        while True:
+            erros_conexao = {}
+            smtp_obj, erro = self._conectar(lote.ctx, erros_conexao)
             if smtp_obj is not None:
-                smtp_obj.quit()
+                return smtp_obj, 0
+
+            if not self._deve_repetir(lote, erro, tentativa):
+                for erro_geral in erros_conexao.get(-1, []):
+                    self._registrar_erro_geral(lote.erros_msgs, erro_geral)
+                return None, 0
+
+            self._aguardar_retentativa(tentativa)
+            tentativa += 1
+
+    def _liberar_conexao(self, smtp_obj: SMTP, qtd_msgs: int) -> None:
+        """
+        Mantém a conexão ociosa, para reaproveitamento nos próximos envios (se configurado), ou a finaliza.
+        """
+
+        if self.manter_conexoes and smtp_obj.sock is not None and not self._limite_msgs_atingido(qtd_msgs):
+            with self._lock_conexoes:
+                self._conexoes_ociosas.append(
+                    (smtp_obj, qtd_msgs, time.monotonic()))
+        else:
+            self._desconectar(smtp_obj)
+
+    def fechar_conexoes_ociosas(self, tempo_ocioso: float = 0) -> int:
+        """
+        Finaliza as conexões mantidas ociosas há mais de "tempo_ocioso" segundos (por padrão, todas as conexões ociosas).
+
+        Retorna a quantidade de conexões finalizadas.
+        """
+
+        limite = time.monotonic() - tempo_ocioso
+        with self._lock_conexoes:
+            expiradas = [conexao for conexao in self._conexoes_ociosas if conexao[2] <= limite]
+            self._conexoes_ociosas = [conexao for conexao in self._conexoes_ociosas if conexao[2] > limite]
+
+        for smtp_obj, _, _ in expiradas:
+            self._desconectar(smtp_obj)
+
+        return len(expiradas)
+
+    def fechar(self) -> None:
+        """
+        Finaliza todas as conexões mantidas ociosas (quando usado o parâmetro "manter_conexoes").
+        """
+
+        self.fechar_conexoes_ociosas()
+
+    def _conectar(
+        self,
+        ctx: ssl.SSLContext,
+        erros_msgs: Dict[int, List[str]]
+    ) -> Tuple[SMTP, Exception]:
+        """
+        Estabelece a conexão com o servidor, e realiza a autenticação.
+
+        Retorna a conexão, ou None e a exceção ocorrida, em caso de erro (registrando o erro geral correspondente).
+        """
+
+        sessao_tls = self._sessao_tls if self.retomar_sessao_tls else None
+
+        smtp_obj = None
+        fase = FASE_CONEXAO
+        inicio = time.perf_counter()
+        try:
+            if self.crypt_method is not None and self.crypt_method == CryptMethod.SSL_OR_TLS:
+                smtp_obj = SMTP_SSLSessaoTLS(host=self.smtp_host,
+                                             port=self.smtp_port, context=ctx, sessao_tls=sessao_tls)
+            else:
+                smtp_obj = SMTPSessaoTLS(host=self.smtp_host,
+                                         port=self.smtp_port, sessao_tls=sessao_tls)
+
+            smtp_obj.ehlo()
+            self._emitir(FASE_CONEXAO, None, inicio)
+
+            if self.crypt_method is not None and self.crypt_method == CryptMethod.START_TLS:
+                fase = FASE_STARTTLS
+                inicio = time.perf_counter()
+                smtp_obj.starttls(context=ctx)
+                self._emitir(FASE_STARTTLS, None, inicio)
+        except Exception as e:
+            if smtp_obj is not None:
+                smtp_obj.close()
+            self._emitir(fase, None, inicio, erro=str(e))
+            self._registrar_erro_geral(
+                erros_msgs, f"Erro estabelecendo conexão com o servidor. Verifique dados de conexão e criptografia. Mensagem original do erro: {e}")
+            return None, e
+
+        # Autenticando
+        inicio = time.perf_counter()
+        try:
+            code, _ = smtp_obj.login(self.smtp_user, self.smtp_pass)
+            self._emitir(FASE_LOGIN, None, inicio, codigo_resposta=code)
+        except Exception as e:
+            self._desconectar(smtp_obj)
+            self._emitir(FASE_LOGIN, None, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=str(e))
+            self._registrar_erro_geral(
+                erros_msgs, f"Erro de autenticação com o servidor de e-mail. Verifique o usuário e senha passados. Mensagem original do erro: {e}")
+            return None, e
+
+        self._registrar_conexao(smtp_obj)
+
+        return smtp_obj, None
+
+    def _registrar_conexao(self, smtp_obj: SMTP) -> None:
+        """
+        Contabiliza a conexão aberta, e guarda a sessão TLS da mesma, para retomada nas próximas conexões (e o
+        tamanho máximo das mensagens anunciado pelo servidor, usado apenas pela política de anexos).
+        """
+
+        if self.politica_anexos is not None:
+            from mail_sender_util.anexos import tamanho_maximo_anunciado
+            self._tamanho_maximo_servidor = tamanho_maximo_anunciado(smtp_obj.esmtp_features)
+
+        with self._lock_conexoes:
+            self.conexoes_abertas += 1
+            if smtp_obj.sessao_reutilizada:
+                self.sessoes_tls_retomadas += 1
+            elif isinstance(smtp_obj.sock, ssl.SSLSocket) and self.retomar_sessao_tls:
+                self._sessao_tls = smtp_obj.sock.session
+
+    def estatisticas_conexoes(self) -> Dict[str, Any]:
+        """
+        Retorna a quantidade de conexões abertas pela instância, quantas destas retomaram uma sessão TLS anterior,
+        e a quantidade de retentativas (de envio e de conexão) realizadas.
+        """
+
+        with self._lock_conexoes:
+            return {
+                'conexoes_abertas': self.conexoes_abertas,
+                'sessoes_tls_retomadas': self.sessoes_tls_retomadas,
+                'retentativas': self.retentativas
+            }
+
+    def _desconectar(self, smtp_obj: SMTP) -> None:
+        """
+        Finaliza a conexão, ignorando erros (a conexão pode já ter sido derrubada pelo servidor).
+        """
+
+        try:
+            smtp_obj.quit()
+        except Exception:
+            smtp_obj.close()
+
+    def _registrar_erro_geral(self, erros_msgs: Dict[int, List[str]], erro: str) -> None:
+        """
+        Registra um erro geral, evitando repetições (quando vários workers falham pelo mesmo motivo).
+        """
+
+        erros = erros_msgs.setdefault(-1, [])
+        if not erro in erros:
+            erros.append(erro)
+
+    def _enviar_mensagem(
+        self,
+        smtp_obj: SMTP,
+        i: int,
+        msg: 'Union[MIMEMultipart, MensagemDividida]',
+        lote: '_Lote',
+        tentativa: int = 1
+    ) -> bool:
+        """
+        Envia a mensagem, registrando o erro ocorrido (se houver).
+
+        Retorna True caso a mensagem deva ser enviada novamente (erro transitório, dentro do limite de tentativas
+        e do orçamento de retentativas do lote), caso em que o erro não é registrado.
+
+        As partes de uma mensagem dividida são enviadas em sequência (interrompida no primeiro erro), e as partes
+        já enviadas não são reenviadas nas tentativas seguintes.
+        """
+
+        # Pulando a mensagem, se já foram identificados erros anteriores de composição da mesma
+        if i in lote.erros_msgs:
+            return False
+
+        if not _mensagem_dividida(msg):
+            return self._enviar_parte(smtp_obj, i, msg, lote, tentativa)
+
+        while msg.enviadas < len(msg.partes):
+            if self._enviar_parte(
+                    smtp_obj, i, msg.partes[msg.enviadas], lote, tentativa, msg.enviadas + 1, len(msg.partes)):
+                return True
+            if i in lote.erros_msgs:
+                return False
+            msg.enviadas += 1
+
+        return False
+
+    def _enviar_parte(
+        self,
+        smtp_obj: SMTP,
+        i: int,
+        msg: 'MIMEMultipart',
+        lote: '_Lote',
+        tentativa: int = 1,
+        parte: int = None,
+        qtd_partes: int = None
+    ) -> bool:
+        erros_msgs = lote.erros_msgs
+
+        espera = self._reservar_limite(msg)
+        if espera > 0:
+            inicio = time.perf_counter()
+            time.sleep(espera)
+            self._emitir(FASE_LIMITE, i, inicio, parte=parte, qtd_partes=qtd_partes)
+
+        inicio = time.perf_counter()
+        try:
+            # Enviando o e-mail de fato
+            bytes_enviados, code = self._transmitir(smtp_obj, msg)
+            self._emitir(FASE_ENVIO, i, inicio, bytes_enviados, code, parte=parte, qtd_partes=qtd_partes)
+        except Exception as e:
+            if self._deve_repetir(lote, e, tentativa):
+                self._emitir(
+                    FASE_ENVIO, i, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=str(e),
+                    parte=parte, qtd_partes=qtd_partes)
+                return True
+
+            self._registrar_erro_envio(i, msg, e, erros_msgs)
+            self._emitir(
+                FASE_ENVIO, i, inicio, codigo_resposta=getattr(e, 'smtp_code', None), erro=erros_msgs[i][-1],
+                parte=parte, qtd_partes=qtd_partes)
+
+        return False
+
+    def _criar_limitador(self, taxa: float, sufixo: str) -> 'LimitadorTaxa':
+        if taxa is None:
+            return None
+
+        from mail_sender_util.limitador import LimitadorTaxa, LimitadorTaxaArquivo
+
+        if self.arquivo_limite is not None:
+            return LimitadorTaxaArquivo(self.arquivo_limite + sufixo, taxa)
+
+        return LimitadorTaxa(taxa)
+
+    def _reservar_limite(self, msg: 'MIMEMultipart') -> float:
+        """
+        Reserva o envio da mensagem (e de seus destinatários) nos limites de taxa configurados, retornando o tempo
+        (em segundos) a aguardar antes do envio.
+        """
+
+        espera = 0.0
+        if self._limitador_msgs is not None:
+            espera = self._limitador_msgs.reservar(1)
+
+        if self._limitador_destinatarios is not None:
+            if _mensagem_caixa_saida(msg):
+                qtd_destinatarios = len(msg.destinatarios)
+            else:
+                from mail_sender_util.mime_stream import destinatarios_envelope
+                qtd_destinatarios = len(destinatarios_envelope(msg))
+            espera = max(espera, self._limitador_destinatarios.reservar(qtd_destinatarios))
+
+        return espera
+
+    def _deve_repetir(self, lote: '_Lote', e: Exception, tentativa: int) -> bool:
+        """
+        Indica se a operação que falhou com o erro "e" deve ser repetida (erro transitório, dentro do limite de
+        tentativas), consumindo uma retentativa do orçamento do lote.
+        """
+
+        if tentativa >= self.max_tentativas or not erro_transitorio(e) or not lote.reservar_retentativa():
+            return False
+
+        with self._lock_conexoes:
+            self.retentativas += 1
+
+        return True
+
+    def _aguardar_retentativa(self, tentativa: int) -> None:
+        time.sleep(self._tempo_espera_retentativa(tentativa))
+
+    def _tempo_espera_retentativa(self, tentativa: int) -> float:
+        """
+        Retorna o tempo de espera antes da próxima tentativa: espera exponencial, limitada a "tempo_espera_maximo",
+        com variação aleatória entre a metade e o total do tempo.
+        """
+
+        espera = min(self.tempo_espera_maximo, self.tempo_espera_tentativa * (2 ** (tentativa - 1)))
+        return random.uniform(espera / 2, espera)
+
+    def _emitir(
+        self,
+        fase: str,
+        indice: int,
+        inicio: float,
+        bytes_enviados: int = None,
+        codigo_resposta: int = None,
+        erro: str = None,
+        parte: int = None,
+        qtd_partes: int = None
+    ) -> None:
+        """
+        Notifica o observador (se houver) da medição de uma fase, iniciada no instante "inicio" (time.perf_counter).
+        """
+
+        if self.observador is None:
+            return
+
+        self.observador(EventoEnvio(
+            fase, indice, inicio, time.perf_counter() - inicio, bytes_enviados, codigo_resposta, erro, parte, qtd_partes))
+
+    def _emitir_composicao(self, i: int, inicio: float, msg: 'MIMEMultipart', erros_msgs: Dict[int, List[str]]) -> None:
+        if self.observador is None:
+            return
+
+        erro = erros_msgs[i][-1] if msg is None and i in erros_msgs else None
+        self._emitir(FASE_COMPOSICAO, i, inicio, erro=erro)
+
+    def _transmitir(self, smtp_obj: SMTP, msg: 'MIMEMultipart') -> Tuple[int, int]:
+        """
+        Envia a mensagem pela conexão, com a mesma semântica do método SMTP.send_message, porém escrevendo
+        o conteúdo no socket bloco a bloco (o que, no modo streaming, evita carregar os arquivos em memória).
+
+        Retorna a quantidade de bytes do conteúdo escritos no socket, e o código da resposta final do servidor.
+        """
+
+        from mail_sender_util.mime_stream import quote_periods, serializar_com_tamanho
+
+        if _mensagem_caixa_saida(msg):
+            remetente, destinatarios, blocos = msg.serializar()
+            tamanho = msg.tamanho()
+        else:
+            remetente, destinatarios, blocos, tamanho = serializar_com_tamanho(msg)
+
+        opcoes = self._opcoes_envelope(smtp_obj.esmtp_features, tamanho)
+
+        # Envelope (agrupado numa única escrita, caso o servidor suporte PIPELINING)
+        if smtp_obj.has_extn('pipelining'):
+            self._enviar_envelope_pipelining(smtp_obj, remetente, destinatarios, opcoes)
+        else:
+            self._enviar_envelope(smtp_obj, remetente, destinatarios, opcoes)
+
+        bytes_enviados = 0
+        try:
+            # Os blocos são agrupados antes da escrita no socket, evitando pacotes pequenos (e o atraso do algoritmo de Nagle)
+            buffer = bytearray()
+            for bloco in blocos:
+                buffer += quote_periods(bloco)
+                if len(buffer) >= TAMANHO_BUFFER_ENVIO:
+                    smtp_obj.send(bytes(buffer))
+                    bytes_enviados += len(buffer)
+                    buffer.clear()
+
+            if not buffer.endswith(b'\r\n'):
+                buffer += b'\r\n'
+            buffer += b'.\r\n'
+            smtp_obj.send(bytes(buffer))
+            bytes_enviados += len(buffer)
+        except Exception:
+            # A conexão fica inutilizada, caso o envio seja interrompido no meio do conteúdo
+            smtp_obj.close()
+            raise
+
+        code, resp = smtp_obj.getreply()
+        if code != 250:
+            smtp_obj.rset()
+            raise SMTPDataError(code, resp)
+
+        return bytes_enviados, code
+
+    def _opcoes_envelope(self, esmtp_features: Dict[str, str], tamanho: int) -> List[str]:
+        """
+        Verifica o tamanho da mensagem (caso previsto na política de anexos), lançando MensagemExcedeTamanhoException
+        caso exceda o limite (antes do envio de qualquer comando), e retorna as opções do comando MAIL (o parâmetro
+        SIZE, caso o servidor suporte a extensão).
+        """
+
+        if self.politica_anexos is None or not self.politica_anexos.verificar_tamanho:
+            return []
+
+        from mail_sender_util.anexos import tamanho_maximo_anunciado
+
+        limite = self.politica_anexos.limite_tamanho(tamanho_maximo_anunciado(esmtp_features))
+        if limite is not None and tamanho > limite:
+            raise MensagemExcedeTamanhoException(
+                f'Tamanho da mensagem ({tamanho} bytes) excede o limite de {limite} bytes')
+
+        if 'size' in esmtp_features:
+            return [f'SIZE={tamanho}']
+
+        return []
+
+    def _enviar_envelope(self, smtp_obj: SMTP, remetente: str, destinatarios: List[str], opcoes: List[str] = ()) -> None:
+        """
+        Envia os comandos MAIL, RCPT e DATA, aguardando a resposta de cada um (tal qual o método SMTP.send_message).
+        """
+
+        code, resp = smtp_obj.mail(remetente, opcoes)
+        if code != 250:
+            if code == 421:
+                smtp_obj.close()
+            else:
+                smtp_obj.rset()
+            raise SMTPSenderRefused(code, resp, remetente)
+
+        recusados = {}
+        for destinatario in destinatarios:
+            code, resp = smtp_obj.rcpt(destinatario)
+            if (code != 250) and (code != 251):
+                recusados[destinatario] = (code, resp)
+            if code == 421:
+                smtp_obj.close()
+                raise SMTPRecipientsRefused(recusados)
+
+        if len(recusados) == len(destinatarios):
+            smtp_obj.rset()
+            raise SMTPRecipientsRefused(recusados)
+
+        smtp_obj.putcmd('data')
+        code, resp = smtp_obj.getreply()
+        if code != 354:
+            smtp_obj.rset()
+            raise SMTPDataError(code, resp)
+
+    def _enviar_envelope_pipelining(self, smtp_obj: SMTP, remetente: str, destinatarios: List[str], opcoes: List[str] = ()) -> None:
+        """
+        Envia os comandos MAIL, RCPT (de todos os destinatários) e DATA numa única escrita (RFC 2920), e só então
+        lê as respostas, na mesma ordem. O tratamento das respostas é o mesmo do método "_enviar_envelope".
+        """
+
+        comandos = [f'mail FROM:{quoteaddr(remetente)}{"".join(" " + opcao for opcao in opcoes)}\r\n']
+        for destinatario in destinatarios:
+            comandos.append(f'rcpt TO:{quoteaddr(destinatario)}\r\n')
+        comandos.append('data\r\n')
+        smtp_obj.send(''.join(comandos))
+
+        code, resp = smtp_obj.getreply()
+        if code == 421:
+            smtp_obj.close()
+            raise SMTPSenderRefused(code, resp, remetente)
+        recusa_remetente = (code, resp) if code != 250 else None
+
+        recusados = {}
+        for destinatario in destinatarios:
+            code, resp = smtp_obj.getreply()
+            if (code != 250) and (code != 251):
+                recusados[destinatario] = (code, resp)
+            if code == 421:
+                smtp_obj.close()
+                raise SMTPRecipientsRefused(recusados)
+
+        code, resp = smtp_obj.getreply()
+        if code == 421:
+            smtp_obj.close()
+            raise SMTPDataError(code, resp)
+
+        sem_transacao = recusa_remetente is not None or len(recusados) == len(destinatarios)
+        if code == 354 and sem_transacao:
+            # O servidor não deveria aceitar o DATA sem remetente ou destinatários válidos, mas, se o fizer, o conteúdo é encerrado vazio
+            smtp_obj.send('.\r\n')
+            smtp_obj.getreply()
+
+        if recusa_remetente is not None:
+            smtp_obj.rset()
+            raise SMTPSenderRefused(recusa_remetente[0], recusa_remetente[1], remetente)
+
+        if len(recusados) == len(destinatarios):
+            smtp_obj.rset()
+            raise SMTPRecipientsRefused(recusados)
+
+        if code != 354:
+            smtp_obj.rset()
+            raise SMTPDataError(code, resp)
+
+    def _registrar_erro_envio(
+        self,
+        i: int,
+        msg: 'MIMEMultipart',
+        e: Exception,
+        erros_msgs: Dict[int, List[str]]
+    ) -> None:
+        erros = erros_msgs.setdefault(i, [])
+        if isinstance(e, MensagemExcedeTamanhoException) or getattr(e, 'smtp_code', None) == 552:
+            # 552: tamanho excedido, seja no comando MAIL (parâmetro SIZE) ou ao fim do conteúdo (RFC 1870)
+            erros.append(
+                f"Mensagem excede o tamanho máximo aceito pelo servidor. Mensagem original do erro: {e}")
+        elif isinstance(e, SMTPRecipientsRefused):
+            erros.append(
+                f"Um ou mais destinatário não identificados: {e.recipients}. Mensagem original do erro: {e}")
+        elif isinstance(e, SMTPSenderRefused):
+            erros.append(
+                f"Remetente não identificado: {msg.remetente if _mensagem_caixa_saida(msg) else msg['From']}. Mensagem original do erro: {e}")
+        elif erro_transitorio(e):
+            erros.append(
+                f"Erro temporário ao enviar a mensagem (servidor indisponível ou conexão interrompida), não resolvido dentro do limite de tentativas. Mensagem original do erro: {e}")
+        else:
+            erros.append(
+                f"Erro desconhecido ao enviar a mensagem. Verifique o remetente e os destinatários passados. Mensagem original do erro: {e}")
 
     def _convert_filename_to_ascii(self, value: str) -> str:
         """
@@ -359,3 +1767,118 @@ class GmailSender(MailSender):
     ):
         super().__init__('smtp.gmail.com', '465', gmail_user,
                          gmail_pass, CryptMethod.SSL_OR_TLS, TLSVersion.TLS_1_2)
+
+
+def erro_transitorio(e: Exception) -> bool:
+    """
+    Indica se o erro é transitório (respostas 4xx do servidor, ou perda da conexão), podendo o envio ser repetido.
+    """
+
+    if isinstance(e, SMTPRecipientsRefused):
+        return any(400 <= code < 500 for code, _ in e.recipients.values())
+
+    if isinstance(e, SMTPResponseException):
+        return 400 <= e.smtp_code < 500
+
+    # As exceções do smtplib derivam de OSError, assim como os erros de acesso aos arquivos (que são permanentes)
+    return isinstance(e, (SMTPServerDisconnected, ConnectionError, TimeoutError, socket.timeout, ssl.SSLEOFError, ssl.SSLZeroReturnError))
+
+
+# As mensagens da caixa de saída e as mensagens divididas só existem quando o módulo correspondente já foi importado
+# (pela funcionalidade que as cria), de modo que a verificação do tipo não precisa importá-lo
+
+def _mensagem_caixa_saida(msg: Any) -> bool:
+    modulo = sys.modules.get('mail_sender_util.caixa_saida')
+    return modulo is not None and isinstance(msg, modulo.MensagemCaixaSaida)
+
+
+def _mensagem_dividida(msg: Any) -> bool:
+    modulo = sys.modules.get('mail_sender_util.anexos')
+    return modulo is not None and isinstance(msg, modulo.MensagemDividida)
+
+
+# MailSender (e caixa de saída) de cada processo de envio (ver MailSender._enviar_lote_processos), e as partes
+# compartilhadas recebidas na inicialização do processo (indexadas pela chave informada em cada bloco)
+_sender_processo: MailSender = None
+_caixa_saida_processo: 'CaixaSaida' = None
+_partes_compartilhadas_processo: Dict[str, Dict[str, EntradaCacheMime]] = {}
+
+
+def _inicializar_processo(
+    parametros: Dict[str, Any],
+    tamanho_cache_mime: int = None,
+    diretorio_caixa_saida: str = None,
+    chave_partes: str = None,
+    partes_compartilhadas: Dict[str, EntradaCacheMime] = None
+) -> None:
+    global _sender_processo, _caixa_saida_processo
+    import multiprocessing.util
+
+    if chave_partes is not None:
+        _partes_compartilhadas_processo[chave_partes] = partes_compartilhadas
+
+    cache_mime = CacheMime(tamanho_cache_mime) if tamanho_cache_mime is not None else None
+    _sender_processo = MailSender(cache_mime=cache_mime, **parametros)
+
+    # Finalizando as conexões mantidas entre os blocos, ao término do processo
+    multiprocessing.util.Finalize(None, _sender_processo.fechar, exitpriority=10)
+
+    # Encerrando o processo de envio junto com o processo principal (caso este seja interrompido), em vez de
+    # continuar enviando os blocos já recebidos sem que o resultado possa ser reportado
+    threading.Thread(target=_aguardar_processo_principal, daemon=True).start()
+
+    if diretorio_caixa_saida is not None:
+        from mail_sender_util.caixa_saida import CaixaSaida
+        _caixa_saida_processo = CaixaSaida(diretorio_caixa_saida, retomar=True)
+        multiprocessing.util.Finalize(None, _caixa_saida_processo.fechar, exitpriority=5)
+
+
+def _aguardar_processo_principal() -> None:
+    import multiprocessing
+
+    processo_principal = multiprocessing.parent_process()
+    if processo_principal is not None:
+        processo_principal.join()
+        os._exit(1)
+
+
+def _enviar_bloco_processo(
+    inicio: int,
+    mail_msgs: List[Union[Mail, Dict[str, Any]]],
+    erros_msgs: Dict[int, List[str]],
+    chave_partes: str = None,
+    coletar_eventos: bool = False
+) -> Tuple[Dict[int, List[str]], List[EventoEnvio]]:
+    """
+    Envia um bloco de mensagens (iniciado no índice "inicio" do lote), no processo de envio, retornando os erros
+    (indexados pela posição no bloco) e os eventos de medição (caso solicitados).
+
+    As partes compartilhadas são obtidas pela chave (recebidas uma única vez, na inicialização do processo).
+    """
+
+    partes_compartilhadas = _partes_compartilhadas_processo.get(chave_partes) if chave_partes is not None else None
+
+    eventos = []
+    _sender_processo.observador = eventos.append if coletar_eventos else None
+    _sender_processo._enviar_lote(
+        mail_msgs, erros_msgs, partes_compartilhadas=partes_compartilhadas, caixa_saida=_caixa_saida_processo, inicio=inicio)
+
+    return erros_msgs, eventos
+
+
+def _dividir_em_blocos(itens: Iterable[Any], tamanho: int) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Agrupa os itens em listas de até "tamanho" itens, juntamente com o índice do primeiro item de cada lista.
+    """
+
+    inicio = 0
+    bloco = []
+    for item in itens:
+        bloco.append(item)
+        if len(bloco) >= tamanho:
+            yield inicio, bloco
+            inicio += len(bloco)
+            bloco = []
+
+    if len(bloco) > 0:
+        yield inicio, bloco
@@ -0,0 +1,63 @@
+import html
+
+from string import Template
+from typing import Any, Dict, List
+
+
+class ModeloTexto:
+    """
+    Texto com variáveis, no mesmo formato do string.Template ("$nome" ou "${nome}", e "$$" para o próprio caractere "$"),
+    compilado uma única vez (em trechos literais e nomes de variáveis), e renderizado para cada mensagem por simples
+    concatenação.
+
+    Diferente do string.Template, um "$" que não inicie uma variável (exemplo: "R$ 10,00") é mantido como texto.
+
+    :texto: Texto do modelo
+    :escapar_html: Indica se os valores das variáveis devem ser escapados para HTML (caracteres "&", "<" e ">")
+    """
+
+    texto: str
+    escapar_html: bool
+    variaveis: List[str]
+
+    def __init__(self, texto: str, escapar_html: bool = False):
+        self.texto = texto
+        self.escapar_html = escapar_html
+        self.variaveis = []
+        self._literais = []
+
+        literal = []
+        posicao = 0
+        for marcador in Template.pattern.finditer(texto):
+            literal.append(texto[posicao:marcador.start()])
+            posicao = marcador.end()
+
+            nome = marcador.group('named') or marcador.group('braced')
+            if nome is not None:
+                self._literais.append(''.join(literal))
+                self.variaveis.append(nome)
+                literal = []
+            elif marcador.group('escaped') is not None:
+                literal.append('$')
+            else:
+                literal.append(marcador.group())
+
+        literal.append(texto[posicao:])
+        self._literais.append(''.join(literal))
+
+    def renderizar(self, valores: Dict[str, Any]) -> str:
+        """
+        Substitui as variáveis pelos valores passados.
+
+        Lança KeyError caso alguma variável do modelo não tenha valor.
+        """
+
+        partes = [self._literais[0]]
+        for nome, literal in zip(self.variaveis, self._literais[1:]):
+            valor = str(valores[nome])
+            if self.escapar_html:
+                valor = html.escape(valor, quote=False)
+            partes.append(valor)
+            partes.append(literal)
+
+        return ''.join(partes)
@@ -0,0 +1,150 @@
+import threading
+
+from typing import Any, Callable, Dict, List
+
+# Fases do envio, reportadas nos eventos
+FASE_COMPOSICAO = 'composicao'
+FASE_CONEXAO = 'conexao'
+FASE_STARTTLS = 'starttls'
+FASE_LOGIN = 'login'
+FASE_ENVIO = 'envio'
+FASE_LIMITE = 'limite'
+
+
+class EventoEnvio:
+    """
+    Medição de uma fase do envio, emitida para o observador do MailSender.
+
+    :fase: Fase medida ("composicao", "conexao", "starttls", "login", "envio" ou "limite", isto é, a espera imposta pelo limite de taxa antes do envio)
+    :indice: Índice da mensagem (None nas fases de conexão, que não se referem a uma mensagem específica)
+    :inicio: Instante de início da fase (em segundos, conforme time.perf_counter)
+    :duracao: Duração da fase (em segundos)
+    :bytes_enviados: Quantidade de bytes do conteúdo da mensagem escritos no socket (apenas na fase "envio")
+    :codigo_resposta: Código da resposta SMTP final (quando houver)
+    :erro: Mensagem do erro ocorrido na fase (None em caso de sucesso)
+    :parte: Número da parte enviada (de 1 a "qtd_partes"), quando a mensagem é dividida (None caso contrário)
+    :qtd_partes: Quantidade de partes da mensagem dividida (None caso a mensagem não seja dividida)
+    """
+
+    __slots__ = ('fase', 'indice', 'inicio', 'duracao', 'bytes_enviados', 'codigo_resposta', 'erro', 'parte', 'qtd_partes')
+
+    fase: str
+    indice: int
+    inicio: float
+    duracao: float
+    bytes_enviados: int
+    codigo_resposta: int
+    erro: str
+    parte: int
+    qtd_partes: int
+
+    def __init__(
+        self,
+        fase: str,
+        indice: int,
+        inicio: float,
+        duracao: float,
+        bytes_enviados: int = None,
+        codigo_resposta: int = None,
+        erro: str = None,
+        parte: int = None,
+        qtd_partes: int = None
+    ):
+        self.fase = fase
+        self.indice = indice
+        self.inicio = inicio
+        self.duracao = duracao
+        self.bytes_enviados = bytes_enviados
+        self.codigo_resposta = codigo_resposta
+        self.erro = erro
+        self.parte = parte
+        self.qtd_partes = qtd_partes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {atributo: getattr(self, atributo) for atributo in self.__slots__}
+
+
+ObservadorEnvio = Callable[[EventoEnvio], None]
+
+
+class AgregadorMetricas:
+    """
+    Observador que acumula os eventos de envio, e resume as latências (p50 e p95) de cada fase, e a vazão
+    (mensagens por segundo) dos envios.
+
+    Pode ser passado diretamente como "observador" do MailSender (inclusive compartilhado entre várias instâncias).
+
+    Cada parte de uma mensagem dividida é medida (e tem seus bytes contabilizados) separadamente, mas a mensagem
+    é contada como enviada apenas uma vez, no envio da última parte.
+    """
+
+    def __init__(self):
+        self._duracoes = {}
+        self._erros = {}
+        self._bytes_enviados = 0
+        self._msgs_enviadas = 0
+        self._inicio = None
+        self._fim = None
+        self._lock = threading.Lock()
+
+    def __call__(self, evento: EventoEnvio) -> None:
+        with self._lock:
+            self._duracoes.setdefault(evento.fase, []).append(evento.duracao)
+            if evento.erro is not None:
+                self._erros[evento.fase] = self._erros.get(evento.fase, 0) + 1
+
+            if self._inicio is None or evento.inicio < self._inicio:
+                self._inicio = evento.inicio
+            fim = evento.inicio + evento.duracao
+            if self._fim is None or fim > self._fim:
+                self._fim = fim
+
+            if evento.fase == FASE_ENVIO and evento.erro is None:
+                if evento.parte is None or evento.parte == evento.qtd_partes:
+                    self._msgs_enviadas += 1
+                self._bytes_enviados += evento.bytes_enviados or 0
+
+    def resumo(self) -> Dict[str, Any]:
+        """
+        Retorna o resumo das medições (durações em segundos):
+        {"mensagens_enviadas": ..., "bytes_enviados": ..., "duracao": ..., "msgs_por_segundo": ...,
+         "fases": {"envio": {"qtd": ..., "erros": ..., "total": ..., "p50": ..., "p95": ..., "max": ...}, ...}}
+        """
+
+        with self._lock:
+            duracao = (self._fim - self._inicio) if self._inicio is not None else 0.0
+
+            fases = {}
+            for fase, duracoes in self._duracoes.items():
+                ordenadas = sorted(duracoes)
+                fases[fase] = {
+                    'qtd': len(ordenadas),
+                    'erros': self._erros.get(fase, 0),
+                    'total': round(sum(ordenadas), 6),
+                    'p50': round(_percentil(ordenadas, 50), 6),
+                    'p95': round(_percentil(ordenadas, 95), 6),
+                    'max': round(ordenadas[-1], 6)
+                }
+
+            return {
+                'mensagens_enviadas': self._msgs_enviadas,
+                'bytes_enviados': self._bytes_enviados,
+                'duracao': round(duracao, 6),
+                'msgs_por_segundo': round(self._msgs_enviadas / duracao, 3) if duracao > 0 else 0.0,
+                'fases': fases
+            }
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._duracoes = {}
+            self._erros = {}
+            self._bytes_enviados = 0
+            self._msgs_enviadas = 0
+            self._inicio = None
+            self._fim = None
+
+
+def _percentil(ordenadas: List[float], percentil: int) -> float:
+    # Método "nearest-rank"
+    posicao = max(0, -(-len(ordenadas) * percentil // 100) - 1)
+    return ordenadas[posicao]
@@ -0,0 +1,226 @@
+import base64
+import io
+import os
+import re
+
+from email.generator import BytesGenerator
+from email.message import Message
+from email.mime.base import MIMEBase
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.utils import getaddresses
+from typing import Iterator, List, Tuple
+
+# Quantidade de bytes lidos por vez dos arquivos (múltiplo de 57, para que cada bloco codificado contenha apenas linhas completas de 76 caracteres)
+TAMANHO_BLOCO_ARQUIVO = 57 * 1024
+
+_PADRAO_PONTO_INICIO_LINHA = re.compile(br'(?m)^\.')
+
+
+class MIMEMultipartStream(MIMEMultipart):
+    """
+    Mensagem multipart, cujas partes de arquivo (imagens e anexos) não são carregadas em memória durante a composição.
+
+    Cada parte de arquivo contém apenas um marcador, que é substituído (durante a serialização) pelo conteúdo
+    do arquivo, codificado em base64 bloco a bloco.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Identificador aleatório (equivalente ao uuid4, sem o custo de importação do módulo uuid)
+        self._prefixo_marcador = f'==ARQUIVO-{os.urandom(16).hex()}-'
+        self._arquivos = []
+
+    def criar_parte_arquivo(self, maintype: str, subtype: str, path: str, conteudo: bytes = None) -> MIMEBase:
+        """
+        Cria uma parte MIME (codificada em base64), cujo conteúdo será lido do arquivo apenas no momento do envio.
+
+        Caso o conteúdo já codificado seja passado (por exemplo, obtido de um CacheMime), o arquivo não é lido novamente.
+        """
+
+        parte = MIMEBase(maintype, subtype)
+        parte.set_payload(f'{self._prefixo_marcador}{len(self._arquivos)}==')
+        parte['Content-Transfer-Encoding'] = 'base64'
+        self._arquivos.append((path, conteudo))
+
+        return parte
+
+    def nova_mensagem(self) -> 'MIMEMultipartStream':
+        """
+        Cria uma mensagem vazia, que compartilha os arquivos desta (de modo que as partes de arquivo possam ser
+        movidas para a mesma; ver anexos.dividir_mensagem).
+        """
+
+        nova = MIMEMultipartStream()
+        nova._prefixo_marcador = self._prefixo_marcador
+        nova._arquivos = self._arquivos
+
+        return nova
+
+    def tamanho_payload(self, parte: Message) -> int:
+        """
+        Retorna o tamanho serializado do conteúdo da parte (no caso das partes de arquivo, o tamanho do arquivo
+        codificado, sem lê-lo).
+        """
+
+        payload = parte.get_payload()
+        if payload.startswith(self._prefixo_marcador) and payload.endswith('=='):
+            return self._tamanho_arquivo(int(payload[len(self._prefixo_marcador):-2]))
+
+        return tamanho_payload(payload)
+
+    def tamanho_serializado(self, dados: bytes) -> int:
+        """
+        Retorna o tamanho do conteúdo retornado pelo método "iter_blocos", sem ler os arquivos.
+        """
+
+        tamanho = len(dados)
+        for marcador in self._padrao_marcador().finditer(dados):
+            tamanho += self._tamanho_arquivo(int(marcador.group(1))) - len(marcador.group(0))
+
+        return tamanho
+
+    def _tamanho_arquivo(self, indice: int) -> int:
+        path, conteudo = self._arquivos[indice]
+        if conteudo is not None:
+            return len(conteudo)
+
+        return tamanho_base64(os.path.getsize(path))
+
+    def _padrao_marcador(self) -> 're.Pattern':
+        return re.compile(re.escape(self._prefixo_marcador.encode('ascii')) + br'(\d+)==')
+
+    def iter_blocos(self, dados: bytes) -> Iterator[bytes]:
+        """
+        Substitui os marcadores da mensagem serializada (recebida em "dados") pelo conteúdo dos arquivos correspondentes.
+        """
+
+        inicio = 0
+        for marcador in self._padrao_marcador().finditer(dados):
+            yield dados[inicio:marcador.start()]
+
+            path, conteudo = self._arquivos[int(marcador.group(1))]
+            if conteudo is not None:
+                yield conteudo
+            else:
+                yield from iter_base64_arquivo(path)
+            inicio = marcador.end()
+
+        yield dados[inicio:]
+
+
+def criar_parte_codificada(maintype: str, subtype: str, conteudo: bytes) -> MIMEBase:
+    """
+    Cria uma parte MIME a partir de um conteúdo já codificado em base64.
+    """
+
+    parte = MIMEBase(maintype, subtype)
+    parte.set_payload(conteudo.decode('ascii'))
+    parte['Content-Transfer-Encoding'] = 'base64'
+
+    return parte
+
+
+def subtipo_imagem(cabecalho: bytes) -> str:
+    """
+    Identifica o subtipo MIME de uma imagem, a partir dos primeiros 32 bytes do arquivo
+    (reaproveitando a mesma detecção usada pela classe MIMEImage).
+    """
+
+    return MIMEImage(cabecalho).get_content_subtype()
+
+
+def iter_base64_arquivo(path: str) -> Iterator[bytes]:
+    """
+    Lê o arquivo em blocos, retornando o conteúdo codificado em base64 (em linhas de 76 caracteres, terminadas em CRLF).
+    """
+
+    with open(path, 'rb') as file:
+        while True:
+            bloco = file.read(TAMANHO_BLOCO_ARQUIVO)
+            if not bloco:
+                return
+
+            yield base64.encodebytes(bloco).replace(b'\n', b'\r\n')
+
+
+def tamanho_base64(tamanho: int) -> int:
+    """
+    Retorna o tamanho de um conteúdo de "tamanho" bytes, codificado em base64 (em linhas de 76 caracteres,
+    terminadas em CRLF).
+    """
+
+    # 4 caracteres para cada 3 bytes, mais o CRLF a cada linha de 76 caracteres
+    linhas = (tamanho + 56) // 57
+    return ((tamanho + 2) // 3) * 4 + linhas * 2
+
+
+def tamanho_payload(payload: str) -> int:
+    """
+    Retorna o tamanho serializado (com quebras de linha CRLF) do conteúdo de uma parte MIME.
+    """
+
+    if '\r\n' in payload:
+        return len(payload)
+
+    return len(payload) + payload.count('\n')
+
+
+def quote_periods(dados: bytes) -> bytes:
+    """
+    Duplica os pontos no início das linhas (RFC 5321, seção 4.5.2).
+    """
+
+    return _PADRAO_PONTO_INICIO_LINHA.sub(b'..', dados)
+
+
+def serializar(msg: MIMEMultipart) -> Tuple[str, List[str], Iterator[bytes]]:
+    """
+    Extrai o envelope (remetente e destinatários), e serializa a mensagem com quebras de linha CRLF,
+    omitindo o header Bcc (tal qual o método SMTP.send_message).
+
+    O conteúdo é retornado como um iterador de blocos, onde cada bloco se inicia no começo de uma linha,
+    ou em um caractere que não seja ponto (o que permite aplicar o "quote_periods" bloco a bloco).
+    """
+
+    remetente, destinatarios, blocos, _ = serializar_com_tamanho(msg)
+    return remetente, destinatarios, blocos
+
+
+def serializar_com_tamanho(msg: MIMEMultipart) -> Tuple[str, List[str], Iterator[bytes], int]:
+    """
+    Equivalente à função "serializar", retornando também o tamanho total do conteúdo (antes do "quote_periods"),
+    sem ler os arquivos das partes de streaming.
+    """
+
+    remetente = getaddresses([msg['From']])[0][1]
+    destinatarios = destinatarios_envelope(msg)
+
+    bcc = msg['Bcc']
+    del msg['Bcc']
+    try:
+        with io.BytesIO() as buffer:
+            generator = BytesGenerator(buffer)
+            generator.flatten(msg, linesep='\r\n')
+            dados = buffer.getvalue()
+    finally:
+        if bcc is not None:
+            msg['Bcc'] = bcc
+
+    if isinstance(msg, MIMEMultipartStream):
+        return remetente, destinatarios, msg.iter_blocos(dados), msg.tamanho_serializado(dados)
+
+    return remetente, destinatarios, iter([dados]), len(dados)
+
+
+def destinatarios_envelope(msg: MIMEMultipart) -> List[str]:
+    """
+    Retorna os endereços dos destinatários da mensagem (headers To, Cc e Bcc), usados no envelope.
+    """
+
+    enderecos = []
+    for header in ['To', 'Cc', 'Bcc']:
+        enderecos.extend(msg.get_all(header, []))
+
+    # Headers vazios (exemplo: lista de cópias ocultas vazia) resultariam em destinatários vazios no envelope
+    return [endereco[1] for endereco in getaddresses(enderecos) if endereco[1]]
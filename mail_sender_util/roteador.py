@@ -0,0 +1,299 @@
+import os
+import queue
+import threading
+
+from email.utils import parseaddr
+from mail_sender_util.caixa_saida import CaixaSaida
+from mail_sender_util.exception import RotaNaoEncontradaException
+from mail_sender_util.mail import Mail
+from mail_sender_util.mail_sender import MailSender
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+# Quantidade máxima de e-mails distribuídos a cada rota, aguardando envio (limitando o consumo de memória, quando
+# uma rota é mais lenta que as demais)
+TAMANHO_FILA_ROTA = 1000
+
+
+class _EnvioRota:
+    """
+    Envio dos e-mails de uma rota, numa thread própria, durante uma chamada do método "enviar_lista" do RoteadorMailSender.
+
+    Os e-mails são recebidos por uma fila, e repassados ao MailSender da rota como um generator (de modo que o envio
+    se inicia antes que a entrada seja toda distribuída). Os índices da rota (a posição de cada e-mail na sequência
+    recebida pela rota) são convertidos nos índices da entrada completa.
+    """
+
+    nome: str
+    sender: MailSender
+    caixa_saida: CaixaSaida
+    indices: List[int]
+    erros_msgs: Dict[int, List[str]]
+
+    def __init__(
+        self,
+        nome: str,
+        sender: MailSender,
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: CaixaSaida = None
+    ):
+        self.nome = nome
+        self.sender = sender
+        self.caixa_saida = caixa_saida
+        self.indices = []
+        self.erros_msgs = {}
+        self._callback_resultado = callback_resultado
+        self._fila = queue.Queue(maxsize=TAMANHO_FILA_ROTA)
+        self._concluidos = set()
+        self._fim_recebido = False
+        self._thread = threading.Thread(target=self._enviar, daemon=True)
+
+    def iniciar(self) -> None:
+        self._thread.start()
+
+    def adicionar(self, i: int, mail_msg: Union[Mail, Dict[str, Any]]) -> None:
+        self._fila.put((i, mail_msg))
+
+    def finalizar(self, erros_msgs: Dict[int, List[str]]) -> None:
+        """
+        Sinaliza o fim da distribuição, aguarda a conclusão do envio, e registra os erros da rota em "erros_msgs"
+        (pelos índices da entrada completa).
+
+        Os erros gerais da rota (exemplo: falha de conexão) são atribuídos aos e-mails da rota que não foram
+        concluídos (notificando o callback de resultado), e registrados como erros gerais (identificados pelo nome
+        da rota) apenas caso todos os e-mails da rota tenham sido concluídos.
+        """
+
+        self._fila.put(None)
+        self._thread.join()
+
+        erros_gerais = [f'Rota "{self.nome}": {erro}' for erro in self.erros_msgs.get(-1, [])]
+        for j, i in enumerate(self.indices):
+            if j in self.erros_msgs:
+                erros_msgs[i] = self.erros_msgs[j]
+            elif not j in self._concluidos:
+                erros_msgs[i] = list(erros_gerais) if erros_gerais else [f'E-mail não enviado pela rota "{self.nome}"']
+                if self._callback_resultado is not None:
+                    self._callback_resultado(i, erros_msgs[i])
+
+        if len(erros_gerais) > 0 and len(self._concluidos) >= len(self.indices):
+            erros = erros_msgs.setdefault(-1, [])
+            for erro in erros_gerais:
+                if not erro in erros:
+                    erros.append(erro)
+
+    def _enviar(self) -> None:
+        try:
+            self.sender.enviar_lista(self._itens(), self.erros_msgs, self._concluir, self.caixa_saida)
+        except Exception as e:
+            erros = self.erros_msgs.setdefault(-1, [])
+            erros.append(
+                f'Erro desconhecido ao enviar e-mails. Mensagem original do erro: {e}')
+        finally:
+            # O envio pode ser interrompido antes do fim da fila (exemplo: falha de conexão): os e-mails restantes
+            # são apenas recebidos (e registrados como não concluídos), liberando a distribuição
+            while not self._fim_recebido:
+                item = self._fila.get()
+                if item is None:
+                    self._fim_recebido = True
+                else:
+                    self.indices.append(item[0])
+
+    def _itens(self) -> Iterator[Union[Mail, Dict[str, Any]]]:
+        while True:
+            item = self._fila.get()
+            if item is None:
+                self._fim_recebido = True
+                return
+
+            i, mail_msg = item
+            self.indices.append(i)
+            yield mail_msg
+
+    def _concluir(self, j: int, erros: List[str]) -> None:
+        self._concluidos.add(j)
+        if self._callback_resultado is not None:
+            self._callback_resultado(self.indices[j], erros)
+
+
+class RoteadorMailSender:
+    """
+    Envia e-mails por múltiplos servidores SMTP (rotas), cada um com seu próprio MailSender (e suas conexões).
+
+    A rota de cada e-mail é indicada pelo parâmetro "rota" do mesmo, ou, caso não informada, identificada pelo
+    domínio do remetente: pelo dicionário "dominios", ou pela rota com o mesmo nome do domínio (nesta ordem), ou,
+    por fim, pela "rota_padrao". Os e-mails sem rota correspondente são registrados com erro.
+
+    Os e-mails de uma lista são agrupados por rota, e as rotas são enviadas simultaneamente (cada uma numa thread
+    própria, com as "num_conexoes" conexões do seu MailSender). Para manter as conexões de cada rota abertas entre
+    os envios, os MailSender devem ser criados com o parâmetro "manter_conexoes" (e finalizados pelos métodos
+    "fechar" ou "fechar_conexoes_ociosas" do roteador).
+
+    :rotas: MailSender de cada rota, indexados pelo nome da rota
+    :dominios: Nome da rota de cada domínio de remetente (sem distinção de maiúsculas e minúsculas)
+    :rota_padrao: Nome da rota dos e-mails sem rota correspondente (padrão: nenhuma)
+    """
+
+    rotas: Dict[str, MailSender]
+    dominios: Dict[str, str]
+    rota_padrao: str
+
+    def __init__(
+        self,
+        rotas: Dict[str, MailSender],
+        dominios: Dict[str, str] = None,
+        rota_padrao: str = None
+    ):
+        # O nome da rota é usado como subdiretório da caixa de saída (não podendo apontar para outro diretório)
+        for rota in rotas:
+            if not nome_rota_valido(rota):
+                raise RotaNaoEncontradaException(f'Nome de rota inválido: {rota}')
+
+        self.rotas = rotas
+        self.dominios = {dominio.lower(): rota for dominio, rota in (dominios or {}).items()}
+        self.rota_padrao = rota_padrao
+
+        for rota in list(self.dominios.values()) + ([rota_padrao] if rota_padrao is not None else []):
+            if not rota in rotas:
+                raise RotaNaoEncontradaException(f'Rota não configurada: {rota}')
+
+    def resolver_rota(self, mail_msg: Union[Mail, Dict[str, Any]]) -> str:
+        """
+        Retorna o nome da rota do e-mail (ou do modelo da mala direta), lançando RotaNaoEncontradaException caso
+        não haja rota correspondente.
+        """
+
+        if isinstance(mail_msg, Mail):
+            rota, remetente = mail_msg.rota, mail_msg.remetente
+        else:
+            rota, remetente = mail_msg.get('rota'), mail_msg.get('remetente')
+
+        if rota is not None:
+            if not rota in self.rotas:
+                raise RotaNaoEncontradaException(f'Rota não configurada: {rota}')
+            return rota
+
+        dominio = parseaddr(remetente or '')[1].rpartition('@')[2].lower()
+        rota = self.dominios.get(dominio)
+        if rota is None and dominio in self.rotas:
+            rota = dominio
+        if rota is None:
+            rota = self.rota_padrao
+
+        if rota is None:
+            raise RotaNaoEncontradaException(f'Nenhuma rota configurada para o remetente: {remetente}')
+
+        return rota
+
+    def enviar_lista(
+        self,
+        mail_msgs: Iterable[Union[Mail, Dict[str, Any]]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: CaixaSaida = None
+    ) -> None:
+        """
+        Envia uma lista de e-mails (com o mesmo formato de entrada, e de registro dos erros, do método "enviar_lista"
+        do MailSender), distribuindo cada e-mail para a sua rota.
+
+        Os erros são registrados pelo índice de cada e-mail na lista completa. Os erros gerais de uma rota são
+        atribuídos aos e-mails da mesma que não puderam ser enviados (ver _EnvioRota.finalizar), de modo que a falha
+        de uma rota não afeta o resultado das demais.
+
+        Caso seja passada uma caixa de saída, cada rota usa uma caixa de saída própria, num subdiretório (com o nome
+        da rota) do diretório da mesma.
+        """
+
+        envios = {}
+        try:
+            for i, mail_msg in enumerate(mail_msgs):
+                # Pulando o e-mail, se já foram identificados erros anteriores (de validação) do mesmo
+                if i in erros_msgs:
+                    if callback_resultado is not None:
+                        callback_resultado(i, erros_msgs[i])
+                    continue
+
+                try:
+                    rota = self.resolver_rota(mail_msg)
+                except RotaNaoEncontradaException as e:
+                    erros = erros_msgs.setdefault(i, [])
+                    erros.append(str(e))
+                    if callback_resultado is not None:
+                        callback_resultado(i, erros)
+                    continue
+
+                envio = envios.get(rota)
+                if envio is None:
+                    envio = _EnvioRota(rota, self.rotas[rota], callback_resultado, self._abrir_caixa_saida(caixa_saida, rota))
+                    envios[rota] = envio
+                    envio.iniciar()
+
+                envio.adicionar(i, mail_msg)
+        finally:
+            for envio in envios.values():
+                try:
+                    envio.finalizar(erros_msgs)
+                finally:
+                    if envio.caixa_saida is not None:
+                        envio.caixa_saida.fechar()
+
+    def enviar_mala_direta(
+        self,
+        modelo: Dict[str, Any],
+        destinos: Iterable[Dict[str, Any]],
+        erros_msgs: Dict[int, List[str]],
+        callback_resultado: Callable[[int, List[str]], None] = None,
+        caixa_saida: CaixaSaida = None
+    ) -> None:
+        """
+        Envia uma mala direta (ver método "enviar_mala_direta" do MailSender) pela rota do modelo.
+        """
+
+        try:
+            rota = self.resolver_rota(modelo)
+        except RotaNaoEncontradaException as e:
+            erros = erros_msgs.setdefault(-1, [])
+            erros.append(str(e))
+            return
+
+        caixa_saida_rota = self._abrir_caixa_saida(caixa_saida, rota)
+        try:
+            self.rotas[rota].enviar_mala_direta(modelo, destinos, erros_msgs, callback_resultado, caixa_saida_rota)
+        finally:
+            if caixa_saida_rota is not None:
+                caixa_saida_rota.fechar()
+
+    def _abrir_caixa_saida(self, caixa_saida: CaixaSaida, rota: str) -> CaixaSaida:
+        if caixa_saida is None:
+            return None
+
+        return CaixaSaida(os.path.join(caixa_saida.diretorio, rota), caixa_saida.retomar)
+
+    def fechar_conexoes_ociosas(self, tempo_ocioso: float = 0) -> int:
+        """
+        Finaliza as conexões ociosas de todas as rotas (ver método "fechar_conexoes_ociosas" do MailSender).
+        """
+
+        return sum(sender.fechar_conexoes_ociosas(tempo_ocioso) for sender in self.rotas.values())
+
+    def fechar(self) -> None:
+        for sender in self.rotas.values():
+            sender.fechar()
+
+    def estatisticas_conexoes(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna as estatísticas de conexão de cada rota (ver método "estatisticas_conexoes" do MailSender).
+        """
+
+        return {rota: sender.estatisticas_conexoes() for rota, sender in self.rotas.items()}
+
+
+def nome_rota_valido(nome: str) -> bool:
+    """
+    Indica se o nome da rota pode ser usado como nome de diretório (sem separadores de diretório, ou de unidade no
+    Windows, e diferente de "." e "..").
+    """
+
+    return (
+        isinstance(nome, str) and nome.strip() not in ('', '.', '..')
+        and not any(separador in nome for separador in ('/', '\\', ':'))
+    )
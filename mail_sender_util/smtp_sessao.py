@@ -0,0 +1,86 @@
+import socket
+import ssl
+
+from smtplib import SMTP, SMTP_SSL, SMTPNotSupportedError, SMTPResponseException
+
+
+class SMTPSessaoTLS(SMTP):
+    """
+    Conexão SMTP cujo comando STARTTLS retoma uma sessão TLS anterior (evitando o handshake completo).
+
+    A sessão a retomar é passada no atributo "sessao_tls" (obtida do atributo "sock.session" de uma conexão
+    anterior, criada com o mesmo SSLContext). Caso o servidor recuse a retomada, é feito o handshake completo.
+    """
+
+    sessao_tls: ssl.SSLSession
+
+    def __init__(self, *args, sessao_tls: ssl.SSLSession = None, **kwargs):
+        self.sessao_tls = sessao_tls
+        super().__init__(*args, **kwargs)
+
+    def _get_socket(self, host, port, timeout):
+        return _desabilitar_nagle(super()._get_socket(host, port, timeout))
+
+    def starttls(self, context: ssl.SSLContext):
+        self.ehlo_or_helo_if_needed()
+        if not self.has_extn('starttls'):
+            raise SMTPNotSupportedError(
+                'STARTTLS extension not supported by server.')
+
+        (resp, reply) = self.docmd('STARTTLS')
+        if resp != 220:
+            raise SMTPResponseException(resp, reply)
+
+        self.sock = context.wrap_socket(
+            self.sock, server_hostname=self._host, session=self.sessao_tls)
+        self.file = None
+
+        # Descartando as informações obtidas antes da negociação TLS (RFC 3207)
+        self.helo_resp = None
+        self.ehlo_resp = None
+        self.esmtp_features = {}
+        self.does_esmtp = False
+
+        return (resp, reply)
+
+    @property
+    def sessao_reutilizada(self) -> bool:
+        """
+        Indica se o handshake TLS desta conexão retomou a sessão anterior.
+        """
+
+        return isinstance(self.sock, ssl.SSLSocket) and self.sock.session_reused
+
+
+class SMTP_SSLSessaoTLS(SMTP_SSL):
+    """
+    Conexão SMTP sobre SSL/TLS (implícito) que retoma uma sessão TLS anterior (evitando o handshake completo).
+
+    Equivalente à classe SMTPSessaoTLS, para o método de criptografia SSL_OR_TLS.
+    """
+
+    sessao_tls: ssl.SSLSession
+
+    def __init__(self, *args, sessao_tls: ssl.SSLSession = None, **kwargs):
+        self.sessao_tls = sessao_tls
+        super().__init__(*args, **kwargs)
+
+    def _get_socket(self, host, port, timeout):
+        new_socket = _desabilitar_nagle(SMTP._get_socket(self, host, port, timeout))
+        return self.context.wrap_socket(
+            new_socket, server_hostname=self._host, session=self.sessao_tls)
+
+    @property
+    def sessao_reutilizada(self) -> bool:
+        """
+        Indica se o handshake TLS desta conexão retomou a sessão anterior.
+        """
+
+        return isinstance(self.sock, ssl.SSLSocket) and self.sock.session_reused
+
+
+def _desabilitar_nagle(sock: socket.socket) -> socket.socket:
+    # Os comandos SMTP (e as mensagens finais do handshake TLS abreviado) são pequenos e aguardam resposta,
+    # de modo que o algoritmo de Nagle apenas atrasa o envio (o conteúdo das mensagens já é agrupado em blocos maiores)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
@@ -0,0 +1,110 @@
+import os
+import shutil
+import ssl
+import threading
+
+import pytest
+
+from benchmarks.servidor_smtp_fake import ServidorSMTPFake, criar_contexto_ssl_servidor
+from mail_sender_util.mail_sender import CryptMethod, MailSender
+from typing import Any, Callable, Dict, List
+
+# Tempo máximo (em segundos) de um envio nos testes: um envio que não termina neste prazo indica um travamento
+TEMPO_MAXIMO_ENVIO = 30
+
+
+@pytest.fixture
+def servidor_smtp() -> Callable[..., ServidorSMTPFake]:
+    """
+    Retorna uma função que inicia um ServidorSMTPFake (com os parâmetros recebidos, registrando as mensagens),
+    finalizado ao término do teste.
+    """
+
+    servidores = []
+
+    def iniciar(**parametros) -> ServidorSMTPFake:
+        parametros.setdefault('registrar_mensagens', True)
+        servidor = ServidorSMTPFake(**parametros)
+        servidor.iniciar()
+        servidores.append(servidor)
+        return servidor
+
+    yield iniciar
+
+    for servidor in servidores:
+        servidor.parar()
+
+
+@pytest.fixture(scope='session')
+def contexto_ssl_servidor(tmp_path_factory) -> ssl.SSLContext:
+    """
+    Contexto SSL do servidor fake (com um certificado auto-assinado, gerado pelo executável "openssl").
+    """
+
+    if shutil.which('openssl') is None:
+        pytest.skip('Executável "openssl" não encontrado (necessário aos modos ssl_tls e start_tls)')
+
+    return criar_contexto_ssl_servidor(str(tmp_path_factory.mktemp('certificado')))
+
+
+@pytest.fixture
+def arquivo(tmp_path) -> Callable[[str, int], str]:
+    """
+    Retorna uma função que cria um arquivo (com o nome e a quantidade de bytes indicados) no diretório temporário
+    do teste, retornando o path do mesmo.
+    """
+
+    def criar(nome: str, tamanho: int) -> str:
+        path = os.path.join(tmp_path, nome)
+        with open(path, 'wb') as file:
+            file.write(os.urandom(tamanho))
+        return path
+
+    return criar
+
+
+def criar_sender(servidor: ServidorSMTPFake, **parametros) -> MailSender:
+    parametros.setdefault('tempo_espera_tentativa', 0.01)
+    return MailSender('127.0.0.1', servidor.porta, 'usuario', 'senha', CryptMethod.NONE, **parametros)
+
+
+def criar_email(i: int, **parametros) -> Dict[str, Any]:
+    email = {
+        'assunto': f'Assunto {i}',
+        'remetente': 'remetente@teste.com',
+        'destinatarios': [f'destinatario{i}@teste.com'],
+        'msg_html': f'<p>Mensagem {i}</p>'
+    }
+    email.update(parametros)
+    return email
+
+
+def enviar(
+    sender: MailSender,
+    emails: List[Dict[str, Any]],
+    callback_resultado: Callable[[int, List[str]], None] = None,
+    **parametros
+) -> Dict[int, List[str]]:
+    """
+    Envia a lista de e-mails numa thread separada, falhando o teste caso o envio não termine em TEMPO_MAXIMO_ENVIO
+    (em vez de travar a execução dos testes), e retorna os erros registrados.
+    """
+
+    erros_msgs = {}
+    excecoes = []
+
+    def executar():
+        try:
+            sender.enviar_lista(emails, erros_msgs, callback_resultado, **parametros)
+        except Exception as e:
+            excecoes.append(e)
+
+    thread = threading.Thread(target=executar, daemon=True)
+    thread.start()
+    thread.join(TEMPO_MAXIMO_ENVIO)
+
+    assert not thread.is_alive(), f'Envio não concluído em {TEMPO_MAXIMO_ENVIO} segundos'
+    if excecoes:
+        raise excecoes[0]
+
+    return erros_msgs
@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import pytest
+
+from conftest import TEMPO_MAXIMO_ENVIO, criar_email, criar_sender, enviar
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from mail_sender_util.anexos import PoliticaAnexos, dividir_mensagem
+from mail_sender_util.async_mail_sender import AsyncMailSender
+from mail_sender_util.exception import MensagemExcedeTamanhoException
+from mail_sender_util.mail_sender import CryptMethod
+from mail_sender_util.metricas import AgregadorMetricas
+
+
+def criar_mensagem(tamanhos_anexos):
+    msg = MIMEMultipart()
+    msg['From'] = 'remetente@teste.com'
+    msg['To'] = 'destinatario@teste.com'
+    msg['Subject'] = 'Relatórios'
+    msg['Message-ID'] = '<1@teste.com>'
+    msg.attach(MIMEText('<p>Segue em anexo</p>', 'html'))
+
+    for k, tamanho in enumerate(tamanhos_anexos):
+        anexo = MIMEBase('application', 'octet-stream')
+        anexo.set_payload(os.urandom(tamanho))
+        encoders.encode_base64(anexo)
+        anexo.add_header('Content-Disposition', 'attachment', filename=f'anexo{k}.bin')
+        msg.attach(anexo)
+
+    return msg
+
+
+def nomes_anexos(msg):
+    return [parte.get_filename() for parte in msg.get_payload() if parte.get_content_disposition() == 'attachment']
+
+
+def test_mensagem_dentro_do_limite_nao_e_dividida():
+    msg = criar_mensagem([1000, 1000])
+
+    assert dividir_mensagem(msg, 100 * 1024) == [msg]
+
+
+def test_anexos_distribuidos_entre_as_partes():
+    msg = criar_mensagem([20 * 1024, 20 * 1024, 20 * 1024])
+    limite = 40 * 1024
+
+    partes = dividir_mensagem(msg, limite)
+
+    assert len(partes) == 3
+    assert [parte['Subject'] for parte in partes] == [f'Relatórios (parte {k}/3)' for k in range(1, 4)]
+    assert [nome for parte in partes for nome in nomes_anexos(parte)] == ['anexo0.bin', 'anexo1.bin', 'anexo2.bin']
+    assert len({parte['Message-ID'] for parte in partes}) == 3
+    assert all(len(parte.as_bytes()) <= limite for parte in partes)
+
+    # Apenas a primeira parte mantém o corpo original
+    assert 'Segue em anexo' in partes[0].get_payload()[0].get_payload()
+    assert all(not 'Segue em anexo' in parte.get_payload()[0].get_payload() for parte in partes[1:])
+
+
+def test_anexo_maior_que_o_limite():
+    with pytest.raises(MensagemExcedeTamanhoException):
+        dividir_mensagem(criar_mensagem([1000, 60 * 1024]), 40 * 1024)
+
+
+def test_envio_com_divisao_das_mensagens(servidor_smtp, arquivo):
+    limite = 64 * 1024
+    servidor = servidor_smtp(tamanho_maximo=limite)
+
+    anexos = [{'file_name': f'anexo{k}.bin', 'path': arquivo(f'anexo{k}.bin', 30 * 1024)} for k in range(3)]
+    emails = [
+        criar_email(0, anexos=anexos),
+        criar_email(1, anexos=anexos[:1]),
+        criar_email(2, anexos=[{'file_name': 'grande.bin', 'path': arquivo('grande.bin', 60 * 1024)}])
+    ]
+
+    sender = criar_sender(servidor, politica_anexos=PoliticaAnexos(dividir_mensagens=True))
+    erros_msgs = enviar(sender, emails)
+
+    # A mensagem 0 é dividida, a 1 cabe no limite, e a 2 tem um anexo que não cabe sozinho numa mensagem
+    assert sorted(erros_msgs) == [2]
+    destinatarios = [destinatarios[0] for _, destinatarios, _ in servidor.mensagens]
+    assert destinatarios.count('destinatario0@teste.com') > 1
+    assert destinatarios.count('destinatario1@teste.com') == 1
+    assert not 'destinatario2@teste.com' in destinatarios
+    assert all(tamanho <= limite for _, _, tamanho in servidor.mensagens)
+
+
+@pytest.mark.parametrize('assincrono', [False, True])
+def test_metricas_contam_a_mensagem_dividida_uma_vez(servidor_smtp, arquivo, assincrono):
+    servidor = servidor_smtp(tamanho_maximo=64 * 1024)
+
+    anexos = [{'file_name': f'anexo{k}.bin', 'path': arquivo(f'anexo{k}.bin', 30 * 1024)} for k in range(3)]
+    emails = [criar_email(0, anexos=anexos), criar_email(1, anexos=anexos[:1])]
+
+    agregador = AgregadorMetricas()
+    parametros = {'politica_anexos': PoliticaAnexos(dividir_mensagens=True), 'observador': agregador}
+    if assincrono:
+        sender = AsyncMailSender(
+            '127.0.0.1', servidor.porta, 'usuario', 'senha', CryptMethod.NONE, tempo_espera_tentativa=0.01, **parametros)
+        erros_msgs = {}
+        asyncio.run(asyncio.wait_for(sender.enviar_lista(emails, erros_msgs), TEMPO_MAXIMO_ENVIO))
+    else:
+        erros_msgs = enviar(criar_sender(servidor, **parametros), emails)
+    assert erros_msgs == {}
+
+    # Cada parte é medida (e tem os bytes contabilizados), mas cada mensagem é contada uma única vez
+    resumo = agregador.resumo()
+    assert len(servidor.mensagens) > 2
+    assert resumo['mensagens_enviadas'] == 2
+    assert resumo['fases']['envio']['qtd'] == len(servidor.mensagens)
+    assert resumo['bytes_enviados'] >= sum(tamanho for _, _, tamanho in servidor.mensagens)
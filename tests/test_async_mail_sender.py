@@ -0,0 +1,303 @@
+import asyncio
+import base64
+import email
+
+import pytest
+
+from benchmarks.servidor_smtp_fake import ServidorSMTPFake
+from conftest import TEMPO_MAXIMO_ENVIO, criar_email
+from mail_sender_util.async_mail_sender import AsyncMailSender, ConexaoSMTPAsync
+from mail_sender_util.mail_sender import CryptMethod, TLSVersion
+from smtplib import SMTPServerDisconnected
+
+MODOS = ['null', 'ssl_tls', 'start_tls']
+
+CRYPT_METHODS = {'null': CryptMethod.NONE, 'ssl_tls': CryptMethod.SSL_OR_TLS, 'start_tls': CryptMethod.START_TLS}
+
+
+@pytest.fixture
+def servidor_modo(servidor_smtp, request):
+    """
+    Retorna uma função que inicia o servidor fake no modo indicado (obtendo o contexto SSL apenas nos modos
+    criptografados).
+    """
+
+    def iniciar(modo: str, **parametros) -> ServidorSMTPFake:
+        if modo != 'null':
+            parametros['contexto_ssl'] = request.getfixturevalue('contexto_ssl_servidor')
+        return servidor_smtp(modo=modo, **parametros)
+
+    return iniciar
+
+
+def criar_sender_async(servidor: ServidorSMTPFake, **parametros) -> AsyncMailSender:
+    parametros.setdefault('tempo_espera_tentativa', 0.01)
+    if servidor.modo != 'null':
+        parametros.setdefault('tls_version', TLSVersion.TLS_1_2)
+
+    return AsyncMailSender(
+        '127.0.0.1', servidor.porta, 'usuario', 'senha', CRYPT_METHODS[servidor.modo], **parametros)
+
+
+def enviar_async(sender: AsyncMailSender, emails, callback_resultado=None):
+    erros_msgs = {}
+    asyncio.run(asyncio.wait_for(sender.enviar_lista(emails, erros_msgs, callback_resultado), TEMPO_MAXIMO_ENVIO))
+    return erros_msgs
+
+
+def destinatarios_recebidos(servidor):
+    return [destinatario for _, destinatarios, _ in servidor.mensagens for destinatario in destinatarios]
+
+
+# O cliente usa as versões fixas de TLS do MailSender (depreciadas no Python recente)
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+@pytest.mark.parametrize('modo', MODOS)
+def test_envio_nos_modos_de_criptografia(servidor_modo, arquivo, modo):
+    servidor = servidor_modo(modo)
+    sender = criar_sender_async(servidor)
+    anexo = arquivo('relatorio.bin', 10 * 1024)
+
+    erros_msgs = {}
+    asyncio.run(sender.enviar(
+        erros_msgs, 'Assunto', 'remetente@teste.com', ['unico@teste.com'], '<p>Mensagem</p>',
+        dest_copia=['copia@teste.com'], anexos=[('relatorio.bin', anexo)]))
+    assert erros_msgs == {}
+
+    assert enviar_async(sender, [criar_email(i) for i in range(5)]) == {}
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(
+        ['unico@teste.com', 'copia@teste.com'] + [f'destinatario{i}@teste.com' for i in range(5)])
+
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+@pytest.mark.parametrize('streaming', [True, False])
+@pytest.mark.parametrize('modo', MODOS)
+def test_anexo_transmitido_byte_a_byte(servidor_modo, arquivo, modo, streaming):
+    servidor = servidor_modo(modo, registrar_conteudo=True)
+
+    # Anexo maior que o buffer de envio (escrito em vários blocos), e corpo com linhas iniciadas por ponto
+    path = arquivo('dados.bin', 300 * 1024 + 7)
+    msg_html = '.linha iniciada por ponto\n..duas\n.\nfim'
+    emails = [criar_email(0, msg_html=msg_html, anexos=[{'file_name': 'dados.bin', 'path': path}])]
+
+    assert enviar_async(criar_sender_async(servidor, streaming=streaming), emails) == {}
+
+    msg = email.message_from_bytes(servidor.conteudos[0])
+    partes = {parte.get_content_type(): parte for parte in msg.walk()}
+    with open(path, 'rb') as file:
+        assert partes['application/octet-stream'].get_payload(decode=True) == file.read()
+    assert partes['text/html'].get_payload(decode=True).decode('utf-8').replace('\r\n', '\n') == msg_html
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+def test_erros_registrados_pelo_indice_da_mensagem(servidor_smtp, pipelining):
+    servidor = servidor_smtp(
+        pipelining=pipelining, recusar=['destinatario1@teste.com', 'destinatario4@teste.com', 'recusado@teste.com'])
+    emails = [criar_email(i) for i in range(8)]
+    emails[6]['remetente'] = 'recusado@teste.com'
+
+    resultados = {}
+    erros_msgs = enviar_async(
+        criar_sender_async(servidor, num_conexoes=3), emails, lambda i, erros: resultados.setdefault(i, erros))
+
+    assert sorted(erros_msgs) == [1, 4, 6]
+    assert 'destinatario1@teste.com' in erros_msgs[1][0]
+    assert 'destinatario4@teste.com' in erros_msgs[4][0]
+    assert 'recusado@teste.com' in erros_msgs[6][0]
+    assert sorted(resultados) == list(range(8))
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(
+        f'destinatario{i}@teste.com' for i in [0, 2, 3, 5, 7])
+
+
+@pytest.mark.parametrize('num_conexoes', [1, 3])
+def test_semaforo_limita_os_envios_simultaneos(servidor_smtp, monkeypatch, num_conexoes):
+    servidor = servidor_smtp(latencia=0.02)
+
+    em_andamento = 0
+    maximo = 0
+    enviar_original = ConexaoSMTPAsync.enviar
+
+    async def enviar_contando(self, *args, **kwargs):
+        nonlocal em_andamento, maximo
+        em_andamento += 1
+        maximo = max(maximo, em_andamento)
+        try:
+            return await enviar_original(self, *args, **kwargs)
+        finally:
+            em_andamento -= 1
+
+    monkeypatch.setattr(ConexaoSMTPAsync, 'enviar', enviar_contando)
+
+    assert enviar_async(criar_sender_async(servidor, num_conexoes=num_conexoes), [criar_email(i) for i in range(12)]) == {}
+
+    assert maximo == num_conexoes
+    assert servidor.contadores['conexoes'] <= num_conexoes
+    assert len(destinatarios_recebidos(servidor)) == 12
+
+
+def test_servidor_indisponivel(servidor_smtp):
+    servidor = servidor_smtp()
+    sender = criar_sender_async(servidor, num_conexoes=2)
+    servidor.parar()
+
+    resultados = []
+    erros_msgs = enviar_async(sender, [criar_email(i) for i in range(5)], lambda i, erros: resultados.append(i))
+
+    assert sorted(resultados) == list(range(5))
+    assert sorted(erros_msgs) == [-1, 0, 1, 2, 3, 4]
+
+
+class ServidorRoteirizado:
+    """
+    Servidor SMTP (asyncio) que responde 421 ao comando indicado, nas primeiras "qtd_encerramentos" conexões,
+    registrando os comandos recebidos e as mensagens aceitas.
+    """
+
+    def __init__(self, comando_encerrado: str, pipelining: bool, qtd_encerramentos: int = 1, auth: str = 'PLAIN'):
+        self.comando_encerrado = comando_encerrado
+        self.pipelining = pipelining
+        self.qtd_encerramentos = qtd_encerramentos
+        self.auth = auth
+        self.credenciais = []
+        self.comandos = []
+        self.mensagens = 0
+        self._servidor = None
+
+    async def iniciar(self) -> int:
+        self._servidor = await asyncio.start_server(self._atender, '127.0.0.1', 0)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    def parar(self):
+        self._servidor.close()
+
+    async def _atender(self, reader, writer):
+        encerrar = self.qtd_encerramentos > 0
+        self.qtd_encerramentos -= 1
+
+        writer.write(b'220 roteirizado\r\n')
+        while True:
+            linha = await reader.readline()
+            if not linha:
+                break
+
+            comando = linha.decode('utf-8').strip()
+            self.comandos.append(comando)
+            verbo = comando.split(' ', 1)[0].split(':', 1)[0].upper()
+
+            if encerrar and verbo == self.comando_encerrado:
+                writer.write(b'421 servidor encerrando\r\n')
+                await writer.drain()
+                break
+
+            if verbo == 'EHLO':
+                extensoes = ['roteirizado'] + (['PIPELINING'] if self.pipelining else []) + [f'AUTH {self.auth}']
+                writer.write(''.join(
+                    f'250{"-" if k < len(extensoes) - 1 else " "}{extensao}\r\n' for k, extensao in enumerate(extensoes)
+                ).encode('ascii'))
+            elif verbo == 'AUTH' and comando.upper() == 'AUTH LOGIN':
+                # Usuário e senha, cada um numa linha (em base64)
+                for _ in range(2):
+                    writer.write(b'334 VXNlcm5hbWU6\r\n')
+                    await writer.drain()
+                    self.credenciais.append(base64.b64decode(await reader.readline()).decode('utf-8'))
+                writer.write(b'235 ok\r\n')
+            elif verbo == 'AUTH':
+                self.credenciais.extend(base64.b64decode(comando.split(' ')[2]).decode('utf-8').split('\0')[1:])
+                writer.write(b'235 ok\r\n')
+            elif verbo == 'DATA':
+                writer.write(b'354 envie\r\n')
+                await writer.drain()
+                while await reader.readline() != b'.\r\n':
+                    pass
+                self.mensagens += 1
+                writer.write(b'250 aceita\r\n')
+            elif verbo == 'QUIT':
+                writer.write(b'221 tchau\r\n')
+                await writer.drain()
+                break
+            else:
+                writer.write(b'250 ok\r\n')
+            await writer.drain()
+
+        writer.close()
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+@pytest.mark.parametrize('comando', ['MAIL', 'RCPT', 'DATA'])
+def test_resposta_421_encerra_a_conexao(pipelining, comando):
+    async def executar():
+        servidor = ServidorRoteirizado(comando, pipelining)
+        conexao = ConexaoSMTPAsync('127.0.0.1', await servidor.iniciar())
+        try:
+            await conexao.conectar()
+            await conexao.ehlo()
+            with pytest.raises(SMTPServerDisconnected):
+                await conexao.enviar('remetente@teste.com', ['destinatario@teste.com'], [b'Subject: x\r\n\r\nx\r\n'])
+        finally:
+            servidor.parar()
+
+        # A conexão é fechada, sem o envio do RSET ao servidor (que já a encerrou)
+        assert conexao.writer is None
+        assert not 'RSET' in servidor.comandos
+
+    asyncio.run(executar())
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+def test_mensagem_reenviada_apos_resposta_421(pipelining):
+    async def executar():
+        servidor = ServidorRoteirizado('MAIL', pipelining)
+        sender = AsyncMailSender(
+            '127.0.0.1', await servidor.iniciar(), 'usuario', 'senha', CryptMethod.NONE, tempo_espera_tentativa=0.01)
+        erros_msgs = {}
+        try:
+            await sender.enviar_lista([criar_email(i) for i in range(3)], erros_msgs)
+        finally:
+            servidor.parar()
+
+        assert erros_msgs == {}
+        assert servidor.mensagens == 3
+
+    asyncio.run(executar())
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+def test_enderecos_do_envelope_normalizados(pipelining):
+    async def executar():
+        servidor = ServidorRoteirizado(None, pipelining, qtd_encerramentos=0)
+        conexao = ConexaoSMTPAsync('127.0.0.1', await servidor.iniciar())
+        try:
+            await conexao.conectar()
+            await conexao.ehlo()
+            await conexao.enviar('Remetente <remetente@teste.com>', ['Fulano <fulano@teste.com>'], [b'x\r\n'])
+            await conexao.enviar('', ['ciclano@teste.com'], [b'x\r\n'])
+            await conexao.quit()
+        finally:
+            servidor.parar()
+
+        # Os mesmos endereços enviados pelo MailSender (smtplib.quoteaddr)
+        envelope = [comando for comando in servidor.comandos if comando.startswith(('MAIL', 'RCPT'))]
+        assert envelope == [
+            'MAIL FROM:<remetente@teste.com>', 'RCPT TO:<fulano@teste.com>',
+            'MAIL FROM:<>', 'RCPT TO:<ciclano@teste.com>'
+        ]
+
+    asyncio.run(executar())
+
+
+@pytest.mark.parametrize('auth', ['PLAIN', 'LOGIN'])
+def test_autenticacao(auth):
+    async def executar():
+        servidor = ServidorRoteirizado(None, True, qtd_encerramentos=0, auth=auth)
+        conexao = ConexaoSMTPAsync('127.0.0.1', await servidor.iniciar())
+        try:
+            await conexao.conectar()
+            await conexao.ehlo()
+            code, _ = await conexao.login('usuário', 'senha secreta')
+            await conexao.quit()
+        finally:
+            servidor.parar()
+
+        assert code == 235
+        assert servidor.credenciais == ['usuário', 'senha secreta']
+
+    asyncio.run(executar())
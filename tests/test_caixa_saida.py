@@ -0,0 +1,147 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from conftest import TEMPO_MAXIMO_ENVIO, criar_email, criar_sender, enviar
+from mail_sender_util.caixa_saida import CaixaSaida, assinatura
+from mail_sender_util.mail import Anexo, Imagem, Mail
+from mail_sender_util.mail_cmd import processar_entrada
+
+
+def criar_entrada(servidor, diretorio, emails):
+    # A validação da entrada converte os e-mails (cada execução recebe a sua cópia)
+    return {
+        'host': '127.0.0.1',
+        'port': servidor.porta,
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': 'null',
+        'tempo_espera_tentativa': 0.01,
+        'caixa_saida': str(diretorio),
+        'emails': copy.deepcopy(emails)
+    }
+
+
+def destinatarios_recebidos(servidor):
+    return [destinatario for _, destinatarios, _ in servidor.mensagens for destinatario in destinatarios]
+
+
+def test_assinatura_identica_para_mail_e_dicionario():
+    dados = criar_email(
+        0,
+        dest_copia=['copia@teste.com'],
+        imagens=[{'id': 'logo', 'path': '/imagens/logo.png'}],
+        anexos=[{'file_name': 'relatório.pdf', 'path': '/anexos/relatorio.pdf'}])
+    mail = Mail(
+        'Assunto 0', 'remetente@teste.com', ['destinatario0@teste.com'], '<p>Mensagem 0</p>',
+        dest_copia=['copia@teste.com'],
+        imagens=[Imagem('logo', '/imagens/logo.png')],
+        anexos=[Anexo('relatório.pdf', '/anexos/relatorio.pdf')])
+
+    # A assinatura independe da representação (e da ordem dos parâmetros do dicionário)
+    assert assinatura(mail) == assinatura(dados)
+    assert assinatura(Mail.de_dict(dados)) == assinatura(dados)
+    assert assinatura(dict(reversed(list(dados.items())))) == assinatura(dados)
+
+    # Parâmetros opcionais não informados (None no Mail) equivalem aos ausentes do dicionário
+    assert assinatura(Mail('Assunto 1', 'remetente@teste.com', ['destinatario1@teste.com'], '<p>Mensagem 1</p>')) == (
+        assinatura(criar_email(1)))
+
+    # Qualquer alteração do conteúdo altera a assinatura
+    mail.anexos = [Anexo('outro.pdf', '/anexos/relatorio.pdf')]
+    assert assinatura(mail) != assinatura(dados)
+    assert assinatura(criar_email(0, msg_html='<p>Mensagem alterada</p>')) != assinatura(criar_email(0))
+
+
+def test_retomar_envia_apenas_as_mensagens_nao_entregues(servidor_smtp, tmp_path):
+    emails = [criar_email(i) for i in range(6)]
+
+    # Primeira execução: duas mensagens recusadas
+    servidor = servidor_smtp(recusar=['destinatario2@teste.com', 'destinatario5@teste.com'])
+    erros_msgs = processar_entrada(criar_entrada(servidor, tmp_path, emails))
+    assert sorted(erros_msgs) == [2, 5]
+
+    # Retomada (--resume): apenas as mensagens recusadas são reenviadas
+    servidor = servidor_smtp()
+    erros_msgs = processar_entrada(criar_entrada(servidor, tmp_path, emails), retomar=True)
+    assert erros_msgs == {}
+    assert sorted(destinatarios_recebidos(servidor)) == ['destinatario2@teste.com', 'destinatario5@teste.com']
+
+    # Nova retomada: nada a enviar
+    servidor = servidor_smtp()
+    assert processar_entrada(criar_entrada(servidor, tmp_path, emails), retomar=True) == {}
+    assert destinatarios_recebidos(servidor) == []
+
+
+def test_sem_retomar_o_envio_e_reiniciado(servidor_smtp, tmp_path):
+    emails = [criar_email(i) for i in range(4)]
+
+    servidor = servidor_smtp()
+    assert processar_entrada(criar_entrada(servidor, tmp_path, emails)) == {}
+
+    servidor = servidor_smtp()
+    assert processar_entrada(criar_entrada(servidor, tmp_path, emails)) == {}
+    assert len(destinatarios_recebidos(servidor)) == 4
+
+
+def test_retomar_apos_perda_do_servidor(servidor_smtp, tmp_path):
+    emails = [criar_email(i) for i in range(10)]
+
+    # Primeira execução interrompida: o servidor é finalizado após a primeira mensagem
+    servidor = servidor_smtp(derrubar_a_cada=2)
+
+    def callback(i, erros):
+        if i == 0:
+            threading.Thread(target=servidor.parar).start()
+
+    caixa_saida = CaixaSaida(str(tmp_path))
+    try:
+        erros_msgs = enviar(criar_sender(servidor), emails, callback, caixa_saida=caixa_saida)
+    finally:
+        caixa_saida.fechar()
+
+    entregues = destinatarios_recebidos(servidor)
+    assert len(erros_msgs) > 0
+
+    # A retomada entrega exatamente as mensagens restantes
+    servidor = servidor_smtp()
+    caixa_saida = CaixaSaida(str(tmp_path), retomar=True)
+    try:
+        erros_msgs = enviar(criar_sender(servidor), emails, caixa_saida=caixa_saida)
+        assert caixa_saida.situacoes() == {'enviada': 10}
+    finally:
+        caixa_saida.fechar()
+
+    assert erros_msgs == {}
+    assert sorted(entregues + destinatarios_recebidos(servidor)) == sorted(
+        f'destinatario{i}@teste.com' for i in range(10))
+
+
+def test_parametro_resume_da_linha_de_comando(servidor_smtp, tmp_path):
+    emails = [criar_email(i) for i in range(5)]
+    diretorio = tmp_path / 'caixa_saida'
+
+    def executar(servidor, *argumentos):
+        entrada = criar_entrada(servidor, diretorio, None)
+        del entrada['emails']
+
+        arquivo = tmp_path / 'entrada.jsonl'
+        arquivo.write_text('\n'.join(json.dumps(linha) for linha in [entrada] + emails), encoding='utf-8')
+
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        processo = subprocess.run(
+            [sys.executable, '-m', 'mail_sender_util.mail_cmd', '--jsonl', str(arquivo), *argumentos],
+            cwd=raiz, capture_output=True, text=True, timeout=TEMPO_MAXIMO_ENVIO)
+        return sorted((json.loads(linha) for linha in processo.stdout.splitlines()), key=lambda linha: linha['indice'])
+
+    servidor = servidor_smtp(recusar=['destinatario3@teste.com'])
+    resultados = executar(servidor)
+    assert [resultado['status'] for resultado in resultados] == ['ok', 'ok', 'ok', 'erro', 'ok']
+
+    servidor = servidor_smtp()
+    resultados = executar(servidor, '--resume')
+    assert all(resultado['status'] == 'ok' for resultado in resultados)
+    assert destinatarios_recebidos(servidor) == ['destinatario3@teste.com']
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from conftest import criar_email, criar_sender, enviar
+from mail_sender_util.limitador import LimitadorTaxa, LimitadorTaxaArquivo
+
+
+class Relogio:
+    """
+    Relógio controlado pelo teste (os instantes avançam apenas pelo método "avancar").
+    """
+
+    def __init__(self, agora: float = 1000.0):
+        self.agora = agora
+
+    def __call__(self) -> float:
+        return self.agora
+
+    def avancar(self, segundos: float) -> None:
+        self.agora += segundos
+
+
+def test_reservas_espacadas_na_taxa():
+    relogio = Relogio()
+    limitador = LimitadorTaxa(2, relogio=relogio)
+
+    # Rajada inicial (até a capacidade), e as reservas seguintes espaçadas em 1/taxa, na ordem das reservas
+    assert [limitador.reservar() for _ in range(5)] == [0.0, 0.0, 0.5, 1.0, 1.5]
+
+    # Após 1 segundo, 2 tokens acumulados (ainda com saldo negativo)
+    relogio.avancar(1.0)
+    assert limitador.reservar() == 1.0
+
+    # Após um longo período ocioso, o saldo é limitado à capacidade
+    relogio.avancar(60.0)
+    assert [limitador.reservar() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_reserva_maior_que_a_capacidade():
+    relogio = Relogio()
+    limitador = LimitadorTaxa(10, capacidade=5, relogio=relogio)
+
+    # Uma reserva maior que a capacidade é aceita, e atrasa as reservas seguintes
+    assert limitador.reservar(25) == pytest.approx(2.0)
+    assert limitador.reservar(1) == pytest.approx(2.1)
+
+    relogio.avancar(2.1)
+    assert limitador.reservar(1) == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize('taxa', [0, -1])
+def test_taxa_invalida(taxa):
+    with pytest.raises(ValueError):
+        LimitadorTaxa(taxa)
+
+
+def test_limitadores_compartilhando_o_arquivo(tmp_path):
+    relogio = Relogio()
+    path = str(tmp_path / 'limite.msgs')
+    limitador_a = LimitadorTaxaArquivo(path, 1, capacidade=2, relogio=relogio)
+    limitador_b = LimitadorTaxaArquivo(path, 1, capacidade=2, relogio=relogio)
+
+    # Um único saldo, consumido alternadamente pelos dois limitadores
+    assert [limitador_a.reservar(), limitador_b.reservar(), limitador_a.reservar(), limitador_b.reservar()] == [
+        0.0, 0.0, 1.0, 2.0]
+
+    relogio.avancar(1.0)
+    assert limitador_b.reservar() == 2.0
+
+    # Um novo limitador (exemplo: uma nova execução do utilitário) continua do saldo gravado
+    relogio.avancar(10.0)
+    limitador_c = LimitadorTaxaArquivo(path, 1, capacidade=2, relogio=relogio)
+    assert [limitador_c.reservar(), limitador_a.reservar(), limitador_b.reservar()] == [0.0, 0.0, 1.0]
+
+
+def test_senders_compartilhando_o_arquivo_limite(servidor_smtp, tmp_path):
+    servidor = servidor_smtp()
+    arquivo_limite = str(tmp_path / 'limite')
+    taxa = 20
+
+    # Cada sender, isoladamente, enviaria as suas mensagens numa única rajada (dentro da capacidade)
+    senders = [criar_sender(servidor, limite_msgs_por_segundo=taxa, arquivo_limite=arquivo_limite) for _ in range(2)]
+    emails = [[criar_email(i) for i in range(k * taxa, (k + 1) * taxa)] for k in range(2)]
+
+    resultados = [None, None]
+
+    def executar(k):
+        resultados[k] = enviar(senders[k], emails[k])
+
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=executar, args=(k,)) for k in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.monotonic() - inicio
+
+    # Com o saldo compartilhado, apenas uma rajada é enviada de imediato, e as demais mensagens na taxa configurada
+    assert resultados == [{}, {}]
+    assert servidor.contadores['mensagens'] == 2 * taxa
+    assert duracao >= 0.9 * (taxa - 1) / taxa
@@ -0,0 +1,129 @@
+import pytest
+
+from conftest import criar_email
+from mail_sender_util.mail_cmd import processar_entrada, todas_invalidas, validar_enderecos, verificar_arquivo
+
+
+def criar_entrada(servidor, emails):
+    return {
+        'host': '127.0.0.1',
+        'port': servidor.porta,
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': 'null',
+        'tempo_espera_tentativa': 0.01,
+        'emails': emails
+    }
+
+
+def test_enderecos_separados_por_virgula_e_ponto_e_virgula():
+    email = {
+        'remetente': 'Remetente <remetente@teste.com>',
+        'destinatarios': ['a@teste.com, Fulano <b@teste.com>;c@teste.com', '  Ciclano <d@teste.com>  ']
+    }
+    erros_msg = {}
+
+    validar_enderecos(0, email, erros_msg)
+
+    # Os itens com mais de um endereço são desmembrados, e os itens com um único endereço mantidos tal qual
+    assert erros_msg == {}
+    assert email['destinatarios'] == ['a@teste.com', 'Fulano <b@teste.com>', 'c@teste.com', 'Ciclano <d@teste.com>']
+
+
+def test_enderecos_repetidos_removidos_entre_as_listas():
+    email = {
+        'remetente': 'remetente@teste.com',
+        'destinatarios': ['A@teste.com', 'a@TESTE.com'],
+        'dest_copia': ['a@teste.com; B@teste.com', 'Outro <a@Teste.com>'],
+        'dest_copia_oculta': ['b@teste.com', 'a@teste.com']
+    }
+    erros_msg = {}
+
+    validar_enderecos(0, email, erros_msg)
+
+    # A primeira ocorrência (sem distinção de maiúsculas e minúsculas) é mantida, e a cópia oculta (vazia) é removida
+    assert erros_msg == {}
+    assert email == {
+        'remetente': 'remetente@teste.com',
+        'destinatarios': ['A@teste.com'],
+        'dest_copia': ['B@teste.com']
+    }
+
+
+def test_listas_vazias_mantidas_sem_remover_vazios():
+    email = {'destinatarios': ['a@teste.com'], 'dest_copia': ['A@teste.com'], 'dest_copia_oculta': ['a@teste.com']}
+
+    validar_enderecos(0, email, {}, remover_vazios=False)
+
+    assert email == {'destinatarios': ['a@teste.com'], 'dest_copia': [], 'dest_copia_oculta': []}
+
+
+def test_enderecos_invalidos_registrados_pelo_indice():
+    email = {
+        'remetente': 'remetente invalido',
+        'destinatarios': ['a@teste.com, sem_arroba', 'a@teste.com'],
+        'dest_copia': 'c@teste.com'
+    }
+    original = {chave: valor for chave, valor in email.items()}
+    erros_msg = {}
+
+    validar_enderecos(3, email, erros_msg)
+
+    # Com erros, o e-mail não é alterado
+    assert list(erros_msg) == [3]
+    assert [erro.split(':')[0] for erro in erros_msg[3]] == [
+        'Parâmetro remetente inválido',
+        'Endereço inválido no parâmetro destinatarios',
+        'Parâmetro dest_copia inválido (deveria ser uma lista de endereços)'
+    ]
+    assert email == original
+
+
+def test_entrada_sem_mensagens_validas_nao_conecta(servidor_smtp):
+    servidor = servidor_smtp()
+    emails = [
+        criar_email(0, remetente='remetente invalido'),
+        criar_email(1, destinatarios=['sem_arroba']),
+        criar_email(2, anexos=[{'file_name': 'nao_existe.bin', 'path': '/caminho/inexistente/nao_existe.bin'}])
+    ]
+
+    erros_msg = processar_entrada(criar_entrada(servidor, emails))
+
+    # Apenas os erros de validação de cada mensagem (sem conexão, nem erros gerais)
+    assert sorted(erros_msg) == [0, 1, 2]
+    assert servidor.contadores['conexoes'] == 0
+
+
+def test_todas_invalidas():
+    assert todas_invalidas({'emails': [{}, {}]}, {0: ['erro'], 1: ['erro']})
+    assert not todas_invalidas({'emails': [{}, {}]}, {1: ['erro']})
+    assert not todas_invalidas({'emails': []}, {})
+    assert todas_invalidas({'mala_direta': {'destinos': [{}]}}, {0: ['erro']})
+    assert not todas_invalidas({'mala_direta': {'destinos': [{}, {}]}}, {0: ['erro']})
+
+
+@pytest.mark.parametrize('path', [1, 0, 2.5, None, ['anexo.bin'], {'path': 'anexo.bin'}])
+def test_path_de_anexo_nao_textual(servidor_smtp, arquivo, path):
+    servidor = servidor_smtp()
+    emails = [
+        criar_email(0, anexos=[{'file_name': 'anexo.bin', 'path': path}]),
+        criar_email(1, imagens=[{'id': 'imagem', 'path': path}]),
+        criar_email(2, anexos=[{'file_name': 'anexo.bin', 'path': arquivo('anexo.bin', 100)}])
+    ]
+
+    erros_msg = processar_entrada(criar_entrada(servidor, emails))
+
+    # Um inteiro não é interpretado como descritor de arquivo (nem um valor não "hashable" interrompe a validação)
+    assert sorted(erros_msg) == [0, 1]
+    assert erros_msg[0] == [
+        f'Parâmetro anexos inválido ("path" deveria ser um texto): {emails[0]["anexos"][0]}']
+    assert erros_msg[1] == [
+        f'Parâmetro imagens inválido ("path" deveria ser um texto): {emails[1]["imagens"][0]}']
+    assert servidor.contadores['mensagens'] == 1
+
+
+def test_verificar_arquivo(tmp_path, arquivo):
+    assert verificar_arquivo(arquivo('anexo.bin', 10)) is None
+    assert isinstance(verificar_arquivo(str(tmp_path)), IsADirectoryError)
+    assert isinstance(verificar_arquivo(str(tmp_path / 'nao_existe.bin')), FileNotFoundError)
+    assert isinstance(verificar_arquivo(1), TypeError)
@@ -0,0 +1,191 @@
+import copy
+import json
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from conftest import TEMPO_MAXIMO_ENVIO, criar_email
+from mail_sender_util.mail_cmd import formata_erros, processar_entrada
+from mail_sender_util.mail_daemon import MailDaemon, criar_arquivo_token
+
+TOKEN = 'token-de-teste'
+
+
+@pytest.fixture
+def mail_daemon():
+    """
+    Retorna uma função que inicia um MailDaemon (numa porta livre, com o token TOKEN), finalizado ao término do teste.
+    """
+
+    daemons = []
+
+    def iniciar(tempo_ocioso: float = 60) -> MailDaemon:
+        daemon = MailDaemon(0, tempo_ocioso, TOKEN)
+        threading.Thread(target=daemon.executar, daemon=True).start()
+        assert daemon.aguardar_inicio(TEMPO_MAXIMO_ENVIO), 'Daemon não iniciado'
+        daemons.append(daemon)
+        return daemon
+
+    yield iniciar
+
+    for daemon in daemons:
+        daemon.parar()
+
+
+def criar_entrada(servidor, emails):
+    return {
+        'host': '127.0.0.1',
+        'port': servidor.porta,
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': 'null',
+        'tempo_espera_tentativa': 0.01,
+        'emails': emails
+    }
+
+
+def requisitar(daemon, *linhas):
+    """
+    Envia as linhas ao daemon (numa mesma conexão), retornando as respostas recebidas até o fim da conexão.
+    """
+
+    with socket.create_connection(('127.0.0.1', daemon.porta), timeout=TEMPO_MAXIMO_ENVIO) as conexao:
+        arquivo = conexao.makefile('rwb')
+        for linha in linhas:
+            arquivo.write(linha + b'\n')
+        arquivo.flush()
+        conexao.shutdown(socket.SHUT_WR)
+
+        return [resposta.decode('utf-8').rstrip('\n') for resposta in arquivo]
+
+
+def linha_envio(entrada, token=TOKEN):
+    return token.encode('utf-8') + b' ' + json.dumps(entrada).encode('utf-8')
+
+
+def test_envio_com_token_valido(servidor_smtp, mail_daemon):
+    servidor = servidor_smtp()
+    daemon = mail_daemon()
+
+    assert requisitar(daemon, linha_envio(criar_entrada(servidor, [criar_email(0)]))) == ['ok']
+    assert servidor.contadores['mensagens'] == 1
+
+
+@pytest.mark.parametrize('token', ['token-errado', TOKEN + 'x', TOKEN[:-1], None], ids=['errado', 'sufixo', 'prefixo', 'ausente'])
+def test_envio_sem_token_valido_e_recusado(servidor_smtp, mail_daemon, token):
+    servidor = servidor_smtp()
+    daemon = mail_daemon()
+
+    entrada = criar_entrada(servidor, [criar_email(0)])
+    if token is None:
+        linha = json.dumps(entrada).encode('utf-8')
+    else:
+        linha = linha_envio(entrada, token)
+
+    # A conexão é encerrada na primeira linha com token inválido (a linha seguinte, mesmo válida, não é processada)
+    respostas = requisitar(daemon, linha, linha_envio(entrada))
+
+    assert respostas == [formata_erros({-1: ['Token de autenticação do daemon inválido']})]
+    assert servidor.contadores.get('mensagens', 0) == 0
+    assert servidor.contadores['conexoes'] == 0
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='Permissões POSIX')
+def test_arquivo_de_token_legivel_apenas_pelo_usuario(tmp_path):
+    path = tmp_path / 'config' / 'daemon.token'
+
+    token = criar_arquivo_token(str(path))
+    assert path.read_text(encoding='ascii') == token
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    # Um arquivo já existente (com permissões mais amplas) é restringido, e recebe um novo token
+    os.chmod(path, 0o644)
+    novo_token = criar_arquivo_token(str(path))
+    assert novo_token != token
+    assert path.read_text(encoding='ascii') == novo_token
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_resposta_identica_a_do_comando(servidor_smtp, mail_daemon):
+    servidor = servidor_smtp(recusar=['destinatario1@teste.com'])
+    daemon = mail_daemon()
+
+    emails = [
+        criar_email(0),
+        criar_email(1),
+        criar_email(2, remetente='remetente invalido'),
+        criar_email(3, destinatarios=[])
+    ]
+    entrada = criar_entrada(servidor, emails)
+
+    # A validação da entrada converte os e-mails (cada execução recebe a sua cópia)
+    esperado = formata_erros(processar_entrada(copy.deepcopy(entrada)))
+    assert json.loads(esperado)['erros_mensagens'].keys() == {'1', '2', '3'}
+
+    assert requisitar(daemon, linha_envio(entrada)) == [esperado]
+
+    # JSON inválido: erro geral, sem encerrar a conexão
+    respostas = requisitar(daemon, TOKEN.encode('utf-8') + b' {"host"', linha_envio(criar_entrada(servidor, [criar_email(0)])))
+    assert len(respostas) == 2
+    assert list(json.loads(respostas[0])) == ['erros_gerais']
+    assert respostas[1] == 'ok'
+
+
+def test_sender_reaproveitado_entre_envios(servidor_smtp, mail_daemon):
+    servidor = servidor_smtp()
+    daemon = mail_daemon()
+
+    assert requisitar(daemon, linha_envio(criar_entrada(servidor, [criar_email(0)]))) == ['ok']
+    sender = daemon.obter_sender(criar_entrada(servidor, []))
+
+    # Mesmos parâmetros de conexão (e-mails distintos): o mesmo MailSender, e a mesma conexão SMTP
+    assert requisitar(daemon, linha_envio(criar_entrada(servidor, [criar_email(1), criar_email(2)]))) == ['ok']
+    assert daemon.obter_sender(criar_entrada(servidor, [criar_email(3)])) is sender
+    assert len(daemon._senders) == 1
+    assert servidor.contadores['conexoes'] == 1
+    assert servidor.contadores['mensagens'] == 3
+
+    # Parâmetros de conexão distintos: um novo MailSender
+    entrada = criar_entrada(servidor, [criar_email(4)])
+    entrada['user'] = 'outro_usuario'
+    assert requisitar(daemon, linha_envio(entrada)) == ['ok']
+    assert len(daemon._senders) == 2
+    assert servidor.contadores['conexoes'] == 2
+
+
+def test_senders_ociosos_descartados(servidor_smtp, mail_daemon):
+    servidor = servidor_smtp()
+    daemon = mail_daemon(tempo_ocioso=0.2)
+
+    ocioso = criar_entrada(servidor, [criar_email(0)])
+    assert requisitar(daemon, linha_envio(ocioso)) == ['ok']
+    sender_ocioso = daemon.obter_sender(ocioso)
+
+    # Um envio em andamento (marcado como em uso) não é descartado, mesmo sem uso há mais que o tempo ocioso
+    em_andamento = criar_entrada(servidor, [])
+    em_andamento['user'] = 'outro_usuario'
+    em_uso = []
+    sender_em_uso = daemon.obter_sender(em_andamento, em_uso)
+
+    time.sleep(0.3)
+    daemon._descartar_ociosos()
+
+    assert [mantido.sender for mantido in daemon._senders.values()] == [sender_em_uso]
+
+    # Liberado, o mesmo é descartado ao fim do tempo ocioso
+    daemon._liberar_senders(em_uso)
+    daemon._descartar_ociosos()
+    assert len(daemon._senders) == 1
+
+    time.sleep(0.3)
+    daemon._descartar_ociosos()
+    assert daemon._senders == {}
+
+    # Um novo envio recria o MailSender (com uma nova conexão)
+    assert requisitar(daemon, linha_envio(ocioso)) == ['ok']
+    assert daemon.obter_sender(ocioso) is not sender_ocioso
+    assert servidor.contadores['conexoes'] == 2
@@ -0,0 +1,188 @@
+import email
+import email.policy
+import inspect
+import threading
+
+import pytest
+
+from conftest import criar_email, criar_sender, enviar
+from mail_sender_util.mail_sender import ERRO_SEM_CONEXAO, TAMANHO_BLOCO_PROCESSOS, MailSender
+
+
+def destinatarios_recebidos(servidor):
+    return [destinatario for _, destinatarios, _ in servidor.mensagens for destinatario in destinatarios]
+
+
+@pytest.mark.parametrize('pipelining', [True, False])
+@pytest.mark.parametrize('num_conexoes', [1, 3])
+def test_erros_registrados_pelo_indice_da_mensagem(servidor_smtp, pipelining, num_conexoes):
+    servidor = servidor_smtp(
+        pipelining=pipelining, recusar=['destinatario1@teste.com', 'destinatario4@teste.com', 'recusado@teste.com'])
+    emails = [criar_email(i) for i in range(8)]
+    emails[6]['remetente'] = 'recusado@teste.com'
+
+    resultados = {}
+    erros_msgs = enviar(
+        criar_sender(servidor, num_conexoes=num_conexoes), emails, lambda i, erros: resultados.setdefault(i, erros))
+
+    assert sorted(erros_msgs) == [1, 4, 6]
+    assert 'destinatario1@teste.com' in erros_msgs[1][0]
+    assert 'destinatario4@teste.com' in erros_msgs[4][0]
+    assert 'recusado@teste.com' in erros_msgs[6][0]
+
+    # Um resultado por mensagem, e as demais mensagens entregues
+    assert sorted(resultados) == list(range(8))
+    assert all(resultados[i] is None for i in [0, 2, 3, 5, 7])
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(
+        f'destinatario{i}@teste.com' for i in [0, 2, 3, 5, 7])
+
+
+def test_erros_de_validacao_sao_preservados(servidor_smtp):
+    servidor = servidor_smtp()
+    emails = [criar_email(i) for i in range(3)]
+
+    erros_msgs = {1: ['Erro de validação']}
+    criar_sender(servidor).enviar_lista(emails, erros_msgs)
+
+    assert erros_msgs == {1: ['Erro de validação']}
+    assert sorted(destinatarios_recebidos(servidor)) == ['destinatario0@teste.com', 'destinatario2@teste.com']
+
+
+def test_falhas_transitorias_sao_repetidas(servidor_smtp):
+    servidor = servidor_smtp(falha_transitoria_a_cada=3)
+
+    erros_msgs = enviar(criar_sender(servidor), [criar_email(i) for i in range(9)])
+
+    assert erros_msgs == {}
+    assert servidor.contadores['falhas_transitorias'] > 0
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(f'destinatario{i}@teste.com' for i in range(9))
+
+
+@pytest.mark.parametrize('parametros', [{}, {'num_conexoes': 3}, {'max_msgs_por_conexao': 2}])
+def test_conexao_derrubada_no_meio_do_lote_e_retomada(servidor_smtp, parametros):
+    servidor = servidor_smtp(derrubar_a_cada=4)
+
+    erros_msgs = enviar(criar_sender(servidor, **parametros), [criar_email(i) for i in range(12)])
+
+    assert erros_msgs == {}
+    assert servidor.contadores['derrubadas'] > 0
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(f'destinatario{i}@teste.com' for i in range(12))
+
+
+@pytest.mark.parametrize(
+    'parametros', [{}, {'num_conexoes': 3}, {'max_msgs_por_conexao': 1}, {'num_conexoes': 2, 'max_msgs_por_conexao': 1}])
+def test_perda_do_servidor_no_meio_do_lote(servidor_smtp, parametros):
+    # O servidor é finalizado após a primeira mensagem, e a conexão derrubada na segunda (impedindo a reconexão)
+    servidor = servidor_smtp(derrubar_a_cada=2)
+
+    resultados = []
+
+    def callback(i, erros):
+        resultados.append(i)
+        if i == 0:
+            threading.Thread(target=servidor.parar).start()
+
+    erros_msgs = enviar(criar_sender(servidor, **parametros), [criar_email(i) for i in range(10)], callback)
+
+    # Cada mensagem recebe exatamente um resultado, e as não entregues são registradas com erro
+    assert sorted(resultados) == list(range(10))
+    recebidos = set(destinatarios_recebidos(servidor))
+    for i in range(10):
+        if f'destinatario{i}@teste.com' in recebidos:
+            assert not i in erros_msgs
+        else:
+            assert len(erros_msgs[i]) > 0
+
+    assert ERRO_SEM_CONEXAO in [erro for i, erros in erros_msgs.items() if i >= 0 for erro in erros]
+    assert len(erros_msgs[-1]) > 0
+
+
+def test_servidor_indisponivel(servidor_smtp):
+    servidor = servidor_smtp()
+    sender = criar_sender(servidor, num_conexoes=2)
+    servidor.parar()
+
+    resultados = []
+    erros_msgs = enviar(sender, [criar_email(i) for i in range(5)], lambda i, erros: resultados.append(i))
+
+    assert sorted(resultados) == list(range(5))
+    assert sorted(erros_msgs) == [-1, 0, 1, 2, 3, 4]
+    assert all(erros_msgs[i] == [ERRO_SEM_CONEXAO] for i in range(5))
+
+
+def test_enviar_com_a_assinatura_original(servidor_smtp, arquivo):
+    # O método "enviar" mantém a assinatura anterior (inclusive os nomes dos parâmetros, usados por chave)
+    assert list(inspect.signature(MailSender.enviar).parameters) == [
+        'self', 'erros_msgs', 'assunto', 'remetente', 'destinatarios', 'msg_html', 'dest_copia', 'dest_copia_oculta',
+        'imagens', 'anexos']
+
+    servidor = servidor_smtp(registrar_conteudo=True)
+    sender = criar_sender(servidor)
+
+    imagem = arquivo('logo.png', 1024)
+    with open(imagem, 'r+b') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+    anexo = arquivo('relatorio.bin', 10 * 1024)
+
+    erros_msgs = {}
+    sender.enviar(
+        erros_msgs=erros_msgs,
+        assunto='Assunto',
+        remetente='remetente@teste.com',
+        destinatarios=['destinatario@teste.com'],
+        msg_html='<p>Mensagem</p><img src="cid:logo">',
+        dest_copia=['copia@teste.com'],
+        dest_copia_oculta=['oculta@teste.com'],
+        imagens=[('logo', imagem)],
+        anexos=[('relatorio.bin', anexo)])
+    sender.enviar(erros_msgs, 'Outro assunto', 'remetente@teste.com', ['outro@teste.com'], '<p>Outra mensagem</p>')
+
+    assert erros_msgs == {}
+    assert [destinatarios for _, destinatarios, _ in servidor.mensagens] == [
+        ['destinatario@teste.com', 'copia@teste.com', 'oculta@teste.com'], ['outro@teste.com']]
+
+    msg = email.message_from_bytes(servidor.conteudos[0], policy=email.policy.default)
+    assert msg['Subject'] == 'Assunto'
+    assert msg['Cc'] == 'copia@teste.com'
+    assert msg['Bcc'] is None
+
+    partes = {parte.get_filename() or parte['Content-ID']: parte for parte in msg.walk() if not parte.is_multipart()}
+    with open(anexo, 'rb') as file:
+        assert partes['relatorio.bin'].get_payload(decode=True) == file.read()
+    with open(imagem, 'rb') as file:
+        assert partes['<logo>'].get_payload(decode=True) == file.read()
+
+
+def test_erros_do_enviar_registrados_no_indice_zero(servidor_smtp):
+    servidor = servidor_smtp(recusar=['recusado@teste.com'])
+
+    erros_msgs = {}
+    criar_sender(servidor).enviar(
+        erros_msgs, assunto='Assunto', remetente='remetente@teste.com', destinatarios=['recusado@teste.com'],
+        msg_html='<p>Mensagem</p>')
+
+    assert list(erros_msgs) == [0]
+    assert 'recusado@teste.com' in erros_msgs[0][0]
+
+
+def test_erros_reindexados_entre_os_processos_de_envio(servidor_smtp):
+    # Mensagens recusadas em blocos distintos (inclusive no primeiro e no último item de um bloco)
+    qtd = 2 * TAMANHO_BLOCO_PROCESSOS + 7
+    recusados = [3, TAMANHO_BLOCO_PROCESSOS - 1, TAMANHO_BLOCO_PROCESSOS, 2 * TAMANHO_BLOCO_PROCESSOS + 5]
+    servidor = servidor_smtp(recusar=[f'destinatario{i}@teste.com' for i in recusados])
+
+    # Erros de validação já conhecidos (pulados pelos processos, e mantidos pelo índice original)
+    emails = [criar_email(i) for i in range(qtd)]
+    erros_msgs = {TAMANHO_BLOCO_PROCESSOS + 1: ['Erro de validação']}
+
+    resultados = {}
+    criar_sender(servidor, num_processos=2).enviar_lista(
+        emails, erros_msgs, lambda i, erros: resultados.setdefault(i, erros))
+
+    assert sorted(erros_msgs) == sorted(recusados + [TAMANHO_BLOCO_PROCESSOS + 1])
+    assert all(f'destinatario{i}@teste.com' in erros_msgs[i][0] for i in recusados)
+    assert erros_msgs[TAMANHO_BLOCO_PROCESSOS + 1] == ['Erro de validação']
+
+    assert sorted(resultados) == list(range(qtd))
+    assert sorted(destinatarios_recebidos(servidor)) == sorted(
+        f'destinatario{i}@teste.com' for i in range(qtd) if not i in erros_msgs)
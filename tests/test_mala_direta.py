@@ -0,0 +1,233 @@
+import concurrent.futures
+import email
+import email.policy
+import pickle
+import threading
+
+import pytest
+
+from conftest import TEMPO_MAXIMO_ENVIO, criar_sender
+from mail_sender_util.mail_sender import TAMANHO_BLOCO_PROCESSOS
+from mail_sender_util.mala_direta import ModeloTexto
+
+
+def enviar_mala_direta(sender, modelo, destinos):
+    """
+    Envia a mala direta numa thread separada (tal qual a função "enviar" do conftest), retornando os erros registrados.
+    """
+
+    erros_msgs = {}
+    resultados = {}
+    excecoes = []
+
+    def executar():
+        try:
+            sender.enviar_mala_direta(modelo, destinos, erros_msgs, lambda i, erros: resultados.setdefault(i, erros))
+        except Exception as e:
+            excecoes.append(e)
+
+    thread = threading.Thread(target=executar, daemon=True)
+    thread.start()
+    thread.join(TEMPO_MAXIMO_ENVIO)
+
+    assert not thread.is_alive(), f'Envio não concluído em {TEMPO_MAXIMO_ENVIO} segundos'
+    if excecoes:
+        raise excecoes[0]
+
+    return erros_msgs, resultados
+
+
+def mensagens_recebidas(servidor):
+    """
+    Retorna as mensagens recebidas pelo servidor (registradas com "registrar_conteudo"), indexadas pelo destinatário.
+    """
+
+    # Com a política padrão, os cabeçalhos (inclusive o nome dos anexos) são decodificados
+    mensagens = [email.message_from_bytes(conteudo, policy=email.policy.default) for conteudo in servidor.conteudos]
+    return {str(msg['To']): msg for msg in mensagens}
+
+
+def corpo_html(msg):
+    partes = [parte for parte in msg.walk() if parte.get_content_type() == 'text/html']
+    return partes[0].get_payload(decode=True).decode('utf-8')
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('Olá $nome, ${saudacao}!', 'Olá Maria, bom dia!'),
+    ('$$nome custa $$10', '$nome custa $10'),
+    ('Total: R$ 10,00 para $nome', 'Total: R$ 10,00 para Maria'),
+    ('R$10 e US$ 5, $', 'R$10 e US$ 5, $'),
+    ('${nome}s', 'Marias'),
+    ('', '')
+])
+def test_modelo_texto(texto, esperado):
+    assert ModeloTexto(texto).renderizar({'nome': 'Maria', 'saudacao': 'bom dia'}) == esperado
+
+
+def test_modelo_texto_variaveis():
+    modelo = ModeloTexto('$a $$b ${c} R$ 1 $a')
+
+    assert modelo.variaveis == ['a', 'c', 'a']
+
+
+def test_modelo_texto_variavel_nao_informada():
+    with pytest.raises(KeyError) as excecao:
+        ModeloTexto('Olá $nome, seu código é $codigo').renderizar({'nome': 'Maria'})
+
+    assert excecao.value.args[0] == 'codigo'
+
+
+def test_modelo_texto_escapa_apenas_os_valores():
+    modelo = ModeloTexto('<p title="$nome">$nome & cia</p>', escapar_html=True)
+
+    # O HTML do próprio modelo é mantido, e os valores são escapados (exceto as aspas, desnecessárias no texto)
+    assert modelo.renderizar({'nome': '<b>Tom & "Jerry"</b>'}) == (
+        '<p title="&lt;b&gt;Tom &amp; "Jerry"&lt;/b&gt;">&lt;b&gt;Tom &amp; "Jerry"&lt;/b&gt; & cia</p>')
+    assert ModeloTexto('$nome').renderizar({'nome': 42}) == '42'
+
+
+def test_mala_direta_personalizada_por_destino(servidor_smtp):
+    servidor = servidor_smtp(registrar_conteudo=True)
+
+    modelo = {
+        'assunto': 'Fatura de $nome: R$ $valor',
+        'remetente': 'remetente@teste.com',
+        'msg_html': '<p>Olá $nome, o valor é R$ ${valor} ($$ em reais)</p>'
+    }
+    destinos = [
+        {'destinatarios': ['maria@teste.com'], 'variaveis': {'nome': 'Maria', 'valor': '10,00'}},
+        {'destinatarios': ['jose@teste.com'], 'variaveis': {'nome': 'José'}},
+        {'destinatarios': ['tom@teste.com'], 'variaveis': {'nome': '<b>Tom & Jerry</b>', 'valor': 5}},
+        {'variaveis': {'nome': 'Sem destinatário', 'valor': 1}}
+    ]
+
+    erros_msgs, resultados = enviar_mala_direta(criar_sender(servidor), modelo, destinos)
+
+    # Os erros de cada destino são registrados pela posição do mesmo
+    assert erros_msgs == {1: ['Variável não informada: valor'], 3: ['Faltando parâmetro: destinatarios']}
+    assert sorted(resultados) == [0, 1, 2, 3]
+    assert resultados[0] is None and resultados[2] is None
+
+    mensagens = mensagens_recebidas(servidor)
+    assert sorted(mensagens) == ['maria@teste.com', 'tom@teste.com']
+
+    assert mensagens['maria@teste.com']['Subject'] == 'Fatura de Maria: R$ 10,00'
+    assert corpo_html(mensagens['maria@teste.com']) == '<p>Olá Maria, o valor é R$ 10,00 ($ em reais)</p>'
+
+    # Os valores são escapados apenas no HTML (o assunto é texto puro)
+    assert mensagens['tom@teste.com']['Subject'] == 'Fatura de <b>Tom & Jerry</b>: R$ 5'
+    assert corpo_html(mensagens['tom@teste.com']) == (
+        '<p>Olá &lt;b&gt;Tom &amp; Jerry&lt;/b&gt;, o valor é R$ 5 ($ em reais)</p>')
+
+
+def test_mala_direta_sem_parametros_no_modelo(servidor_smtp):
+    servidor = servidor_smtp()
+
+    erros_msgs, resultados = enviar_mala_direta(
+        criar_sender(servidor), {'remetente': 'remetente@teste.com'}, [{'destinatarios': ['maria@teste.com']}])
+
+    assert erros_msgs == {-1: [
+        'Faltando parâmetro no modelo da mala direta: assunto',
+        'Faltando parâmetro no modelo da mala direta: msg_html'
+    ]}
+    assert resultados == {}
+    assert servidor.contadores['conexoes'] == 0
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_anexos_do_modelo_identicos_em_todas_as_mensagens(servidor_smtp, arquivo, streaming):
+    servidor = servidor_smtp(registrar_conteudo=True)
+
+    anexos = {
+        'relatorio.bin': arquivo('relatorio.bin', 100 * 1024 + 3),
+        'resumo.bin': arquivo('resumo.bin', 57)
+    }
+    # Imagem com a assinatura PNG (de onde o subtipo MIME é identificado)
+    imagem = arquivo('logo.png', 2 * 1024)
+    with open(imagem, 'r+b') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+    modelo = {
+        'assunto': 'Relatório de $nome',
+        'remetente': 'remetente@teste.com',
+        'msg_html': '<p>Olá $nome</p><img src="cid:logo">',
+        'imagens': [{'id': 'logo', 'path': imagem}],
+        'anexos': [{'file_name': nome, 'path': path} for nome, path in anexos.items()]
+    }
+    destinos = [{'destinatarios': [f'destinatario{i}@teste.com'], 'variaveis': {'nome': f'Nome {i}'}} for i in range(5)]
+
+    erros_msgs, _ = enviar_mala_direta(criar_sender(servidor, streaming=streaming), modelo, destinos)
+    assert erros_msgs == {}
+
+    mensagens = mensagens_recebidas(servidor)
+    assert len(mensagens) == 5
+
+    conteudos = {}
+    for nome, path in list(anexos.items()) + [('logo', imagem)]:
+        with open(path, 'rb') as file:
+            conteudos[nome] = file.read()
+
+    codificados = None
+    for i in range(5):
+        msg = mensagens[f'destinatario{i}@teste.com']
+        assert corpo_html(msg) == f'<p>Olá Nome {i}</p><img src="cid:logo">'
+
+        partes = {}
+        for parte in msg.walk():
+            if parte.get_content_disposition() == 'attachment':
+                partes[parte.get_filename()] = parte
+            elif parte['Content-ID'] is not None:
+                partes[parte['Content-ID'].strip('<>')] = parte
+
+        # Conteúdo decodificado idêntico ao arquivo, e codificação idêntica em todas as mensagens
+        assert {nome: parte.get_payload(decode=True) for nome, parte in partes.items()} == conteudos
+        if codificados is None:
+            codificados = {nome: parte.get_payload() for nome, parte in partes.items()}
+        assert {nome: parte.get_payload() for nome, parte in partes.items()} == codificados
+
+
+def test_mala_direta_nos_processos_de_envio(servidor_smtp, arquivo, monkeypatch):
+    qtd = 2 * TAMANHO_BLOCO_PROCESSOS + 3
+    recusados = [1, TAMANHO_BLOCO_PROCESSOS + 2, 2 * TAMANHO_BLOCO_PROCESSOS]
+    servidor = servidor_smtp(registrar_conteudo=True, recusar=[f'destinatario{i}@teste.com' for i in recusados])
+
+    tamanho_anexo = 200 * 1024
+    anexo = arquivo('relatorio.bin', tamanho_anexo)
+    modelo = {
+        'assunto': 'Relatório de $nome',
+        'remetente': 'remetente@teste.com',
+        'msg_html': '<p>Olá $nome</p>',
+        'anexos': [{'file_name': 'relatorio.bin', 'path': anexo}]
+    }
+    destinos = [{'destinatarios': [f'destinatario{i}@teste.com'], 'variaveis': {'nome': f'Nome {i}'}} for i in range(qtd)]
+    sem_variavel = TAMANHO_BLOCO_PROCESSOS + 4
+    del destinos[sem_variavel]['variaveis']
+
+    # Registrando o tamanho dos argumentos de cada bloco repassado aos processos
+    tamanhos_blocos = []
+    submit = concurrent.futures.ProcessPoolExecutor.submit
+
+    def registrar_submit(executor, funcao, *args, **kwargs):
+        tamanhos_blocos.append(len(pickle.dumps(args)))
+        return submit(executor, funcao, *args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures.ProcessPoolExecutor, 'submit', registrar_submit)
+
+    erros_msgs, resultados = enviar_mala_direta(criar_sender(servidor, num_processos=2), modelo, destinos)
+
+    # Os erros de cada bloco são registrados pelo índice do destino na lista completa
+    assert sorted(erros_msgs) == sorted(recusados + [sem_variavel])
+    assert all(f'destinatario{i}@teste.com' in erros_msgs[i][0] for i in recusados)
+    assert erros_msgs[sem_variavel] == ['Variável não informada: nome']
+    assert sorted(resultados) == list(range(qtd))
+
+    # O anexo (já codificado) é repassado apenas na inicialização de cada processo, e não em cada bloco
+    assert len(tamanhos_blocos) == 3
+    assert all(tamanho < tamanho_anexo / 4 for tamanho in tamanhos_blocos)
+
+    mensagens = mensagens_recebidas(servidor)
+    assert sorted(mensagens) == sorted(f'destinatario{i}@teste.com' for i in range(qtd) if not i in erros_msgs)
+    with open(anexo, 'rb') as file:
+        conteudo = file.read()
+    for msg in mensagens.values():
+        partes = [parte for parte in msg.walk() if parte.get_content_disposition() == 'attachment']
+        assert [parte.get_payload(decode=True) for parte in partes] == [conteudo]
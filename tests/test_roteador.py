@@ -0,0 +1,137 @@
+import copy
+
+import pytest
+
+from conftest import criar_email, criar_sender, enviar
+from mail_sender_util.exception import RotaNaoEncontradaException
+from mail_sender_util.mail_cmd import processar_entrada
+from mail_sender_util.mail_sender import ERRO_SEM_CONEXAO
+from mail_sender_util.roteador import RoteadorMailSender, nome_rota_valido
+
+
+def destinatarios_recebidos(servidor):
+    return [destinatario for _, destinatarios, _ in servidor.mensagens for destinatario in destinatarios]
+
+
+def test_indices_convertidos_para_a_lista_completa(servidor_smtp):
+    servidor_a = servidor_smtp(recusar=['destinatario4@teste.com'])
+    servidor_b = servidor_smtp(recusar=['destinatario3@teste.com'])
+    roteador = RoteadorMailSender(
+        {'a': criar_sender(servidor_a), 'b': criar_sender(servidor_b)}, dominios={'b.com': 'b'}, rota_padrao='a')
+
+    emails = [
+        criar_email(0),
+        criar_email(1, rota='b'),
+        criar_email(2, remetente='remetente@b.com'),
+        criar_email(3, rota='b'),
+        criar_email(4),
+        criar_email(5, rota='c'),
+        criar_email(6, remetente='remetente@B.COM')
+    ]
+
+    resultados = {}
+    erros_msgs = enviar(roteador, emails, lambda i, erros: resultados.setdefault(i, erros))
+
+    # As recusas (posição 2 da rota "b", e posição 1 da rota "a") são registradas pelos índices da lista completa
+    assert sorted(erros_msgs) == [3, 4, 5]
+    assert 'destinatario3@teste.com' in erros_msgs[3][0]
+    assert 'destinatario4@teste.com' in erros_msgs[4][0]
+    assert erros_msgs[5] == ['Rota não configurada: c']
+
+    assert sorted(resultados) == list(range(7))
+    assert all(resultados[i] is None for i in (0, 1, 2, 6))
+
+    assert sorted(destinatarios_recebidos(servidor_a)) == ['destinatario0@teste.com']
+    assert sorted(destinatarios_recebidos(servidor_b)) == [
+        'destinatario1@teste.com', 'destinatario2@teste.com', 'destinatario6@teste.com']
+
+
+def test_falha_de_uma_rota_nao_afeta_as_demais(servidor_smtp):
+    servidor_a = servidor_smtp()
+    servidor_b = servidor_smtp()
+    roteador = RoteadorMailSender({'a': criar_sender(servidor_a), 'b': criar_sender(servidor_b, num_conexoes=2)})
+    servidor_b.parar()
+
+    rotas = ['a', 'b', 'b', 'a', 'b', 'a', 'a', 'b']
+    emails = [criar_email(i, rota=rota) for i, rota in enumerate(rotas)]
+
+    resultados = {}
+    erros_msgs = enviar(roteador, emails, lambda i, erros: resultados.setdefault(i, erros))
+
+    indices_b = [i for i, rota in enumerate(rotas) if rota == 'b']
+    assert sorted(erros_msgs) == [-1] + indices_b
+    assert all(erros_msgs[i] == [ERRO_SEM_CONEXAO] for i in indices_b)
+    assert all(resultados[i] == [ERRO_SEM_CONEXAO] for i in indices_b)
+
+    # Os erros gerais (de conexão) identificam a rota
+    assert len(erros_msgs[-1]) > 0
+    assert all(erro.startswith('Rota "b": ') for erro in erros_msgs[-1])
+
+    assert sorted(destinatarios_recebidos(servidor_a)) == sorted(
+        f'destinatario{i}@teste.com' for i, rota in enumerate(rotas) if rota == 'a')
+
+
+def test_falha_de_uma_rota_pela_linha_de_comando(servidor_smtp):
+    servidor_a = servidor_smtp()
+    servidor_b = servidor_smtp()
+    porta_b = servidor_b.porta
+    servidor_b.parar()
+
+    entrada = {
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': 'null',
+        'tempo_espera_tentativa': 0.01,
+        'rotas': {
+            'a': {'host': '127.0.0.1', 'port': servidor_a.porta},
+            'b': {'host': '127.0.0.1', 'port': porta_b}
+        },
+        'dominios': {'a.com': 'a', 'b.com': 'b'},
+        'emails': [
+            criar_email(0),
+            criar_email(1, remetente='remetente@b.com'),
+            criar_email(2, rota='a'),
+            criar_email(3, rota='b'),
+            criar_email(4, remetente='remetente@a.com')
+        ]
+    }
+
+    erros_msgs = processar_entrada(copy.deepcopy(entrada))
+
+    # O e-mail 0 não tem rota correspondente (sem rota padrão), e a rota "b" está indisponível
+    assert sorted(erros_msgs) == [-1, 0, 1, 3]
+    assert erros_msgs[0] == ['Nenhuma rota configurada para o remetente: remetente@teste.com']
+    assert erros_msgs[1] == erros_msgs[3] == [ERRO_SEM_CONEXAO]
+    assert all(erro.startswith('Rota "b": ') for erro in erros_msgs[-1])
+    assert sorted(destinatarios_recebidos(servidor_a)) == ['destinatario2@teste.com', 'destinatario4@teste.com']
+
+
+@pytest.mark.parametrize('nome', ['', ' ', '.', '..', 'a/b', '../rota', 'a\\b', 'c:', 'c:rota', None, 1])
+def test_nome_de_rota_invalido(servidor_smtp, nome):
+    assert not nome_rota_valido(nome)
+
+    servidor = servidor_smtp()
+    with pytest.raises(RotaNaoEncontradaException):
+        RoteadorMailSender({'a': criar_sender(servidor), nome: criar_sender(servidor)})
+
+
+@pytest.mark.parametrize('nome', ['a', 'rota.principal', 'b.com', '...', 'rota com espaço'])
+def test_nome_de_rota_valido(nome):
+    assert nome_rota_valido(nome)
+
+
+def test_nome_de_rota_invalido_na_entrada(servidor_smtp):
+    servidor = servidor_smtp()
+    entrada = {
+        'user': 'usuario',
+        'password': 'senha',
+        'crypt_method': 'null',
+        'rotas': {'../fora': {'host': '127.0.0.1', 'port': servidor.porta}},
+        'rota_padrao': '../fora',
+        'emails': [criar_email(0)]
+    }
+
+    erros_msgs = processar_entrada(entrada)
+
+    assert 'Nome de rota inválido (não pode conter separadores de diretório): ../fora' in erros_msgs[-1]
+    assert servidor.contadores['conexoes'] == 0